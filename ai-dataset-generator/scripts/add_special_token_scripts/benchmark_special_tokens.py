@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the Special Token Processors
+------------------------------------------
+This script times the process_* functions of translations_phrases_special_tokens
+on inputs rebuilt from the tagged corpora in output/. Tags are turned back into
+the quoting of the raw dataset (<WORD>x</WORD> -> 'x', <YANOMAMI>x</YANOMAMI> ->
+"x") so the processors take their normal extraction paths.
+
+The raw generated files in output/.../Initial outputs are run too, with their
+"//" comment header lines left out. Their answers keep the layouts the rebuilt
+inputs lose (multi-word parts of speech, blank lines between examples, merged
+senses), so diffing their outputs shows changes in extraction as well.
+
+Run it once per version of the processors (e.g. from a checkout of an older
+commit via --module_dir) and compare the timings; with --output_dir the processed
+files are kept so the outputs of two versions can be diffed.
+
+Usage:
+    python benchmark_special_tokens.py [--corpus_dir DIR] [--raw_dir DIR] [--repeat N] [--module_dir DIR]
+                                       [--output_dir DIR] [--workers N]
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import tempfile
+import importlib
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler()]
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                  '..', '..', 'output', 'yanomami_dataset_with_tokens')
+
+# Tagged corpus -> processor that handles the raw version of its records
+CORPORA = [
+    ('combined-ok-phrases-yanomami-to-english.jsonl', 'process_yanomami_to_english_file'),
+    ('combined-ok-phrases-english-to-yanomami.jsonl', 'process_phrases_file'),
+    ('comparison.jsonl', 'process_comparison_file'),
+    ('combined-ok-how-to-p1.jsonl', 'process_how_to_file'),
+    ('combined-ok-how-to-p2.jsonl', 'process_how_to_file'),
+    ('grammar-plural.jsonl', 'process_grammar_file'),
+    ('grammar-verb.jsonl', 'process_grammar_file'),
+]
+
+DEFAULT_RAW_DIR = os.path.join(DEFAULT_CORPUS_DIR, 'Initial outputs')
+
+# Raw generated file -> processor for its records
+RAW_CORPORA = [
+    ('12_phrases_Yanomami_to_English.jsonl', 'process_yanomami_to_english_file'),
+    ('8_phrases_English_to_Yanomami.jsonl', 'process_phrases_file'),
+    ('10_comparison_queries.jsonl', 'process_comparison_file'),
+    ('9_contextual_usage_examples.jsonl', 'process_how_to_file'),
+    ('11_grammar_queries.jsonl', 'process_grammar_file'),
+    ('2_3k_prompts_generated_dataset_contains_duplicated_lines.jsonl', 'process_translations_file'),
+    ('4_cleaned_dataset_merging_duplicated_prompts.jsonl', 'process_translations_file'),
+]
+
+_SINGLE_QUOTED_TAG = re.compile(r'<(WORD)>(.*?)</\1>', re.DOTALL)
+_DOUBLE_QUOTED_TAG = re.compile(r'<(YANOMAMI|TRANSLATION)>(.*?)</\1>', re.DOTALL)
+_ANY_TAG = re.compile(r'</?[A-Z_]+>')
+
+def untag(content, user):
+    """Turn a tagged message back into the raw dataset's quoting."""
+    content = _SINGLE_QUOTED_TAG.sub(lambda match: f"'{match.group(2)}'", content)
+    if user:
+        content = _DOUBLE_QUOTED_TAG.sub(lambda match: f'"{match.group(2)}"', content)
+    return _ANY_TAG.sub('', content)
+
+def build_raw_input(corpus_file, raw_file):
+    """
+    Write the untagged version of every JSONL record of a corpus.
+
+    Returns:
+        int: Number of records written (lines that are not JSON objects are skipped)
+    """
+    count = 0
+    with open(corpus_file, 'r', encoding='utf-8') as f_in, open(raw_file, 'w', encoding='utf-8') as f_out:
+        for line in f_in:
+            try:
+                data = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(data, dict) or len(data.get('messages', ())) < 2:
+                continue
+            for message in data['messages']:
+                message['content'] = untag(message['content'], message['role'] == 'user')
+            f_out.write(json.dumps(data, ensure_ascii=False) + '\n')
+            count += 1
+    return count
+
+def strip_comment_lines(raw_file, clean_file):
+    """
+    Copy the JSON object lines of a raw generated file, leaving out its comment
+    header and blank lines.
+
+    Returns:
+        int: Number of records written
+    """
+    count = 0
+    with open(raw_file, 'r', encoding='utf-8') as f_in, open(clean_file, 'w', encoding='utf-8') as f_out:
+        for line in f_in:
+            if line.startswith('{'):
+                f_out.write(line if line.endswith('\n') else line + '\n')
+                count += 1
+    return count
+
+class _NoProgress:
+    """Stand-in for a tqdm progress bar created without an iterable."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def update(self, n=1):
+        pass
+
+def main():
+    """Main function to handle command line arguments."""
+    parser = argparse.ArgumentParser(description='Benchmark the special token processors.')
+    parser.add_argument('--corpus_dir', type=str, default=DEFAULT_CORPUS_DIR,
+                        help='Directory containing the tagged corpora')
+    parser.add_argument('--raw_dir', type=str, default=DEFAULT_RAW_DIR,
+                        help='Directory containing the raw generated files (skipped when missing)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Runs per corpus; the fastest is reported')
+    parser.add_argument('--module_dir', type=str, default=None,
+                        help='Import translations_phrases_special_tokens from this directory instead')
+    parser.add_argument('--output_dir', type=str, default=None,
+                        help='Keep the processed files in this directory (outside the corpus directories)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes per processor call (versions with the parallel engine only)')
+    args = parser.parse_args()
+
+    # The outputs are named after their corpora, so they must not land in the dataset tree
+    if args.output_dir:
+        output_dir = os.path.realpath(args.output_dir)
+        for corpus_dir in (args.corpus_dir, args.raw_dir):
+            corpus_dir = os.path.realpath(corpus_dir)
+            if os.path.commonpath([output_dir, corpus_dir]) == corpus_dir:
+                parser.error(f"--output_dir must be outside {corpus_dir}; use a temporary directory")
+
+    if args.module_dir:
+        sys.path.insert(0, os.path.abspath(args.module_dir))
+    processors = importlib.import_module('translations_phrases_special_tokens')
+    logger.info(f"Benchmarking {processors.__file__}")
+
+    # tqdm progress bars would dominate the timings of the small corpora
+    processors.tqdm = lambda iterable, **kwargs: iterable
+    if 'jsonl_parallel' in sys.modules:
+        sys.modules['jsonl_parallel'].tqdm = lambda iterable=None, **kwargs: iterable if iterable is not None else _NoProgress()
+    options = {'workers': args.workers} if args.workers > 1 else {}
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        output_dir = args.output_dir or work_dir
+        os.makedirs(output_dir, exist_ok=True)
+        # (name, input builder, path the input is built from, processor)
+        jobs = [(corpus, build_raw_input, os.path.join(args.corpus_dir, corpus), processor_name)
+                for corpus, processor_name in CORPORA]
+        jobs += [(corpus, strip_comment_lines, os.path.join(args.raw_dir, corpus), processor_name)
+                 for corpus, processor_name in RAW_CORPORA]
+        total = 0.0
+        for corpus, build_input, source_file, processor_name in jobs:
+            if not os.path.exists(source_file):
+                logger.warning(f"Skipping missing corpus {source_file}")
+                continue
+            raw_file = os.path.join(work_dir, 'raw-' + corpus)
+            records = build_input(source_file, raw_file)
+            processor = getattr(processors, processor_name)
+            output_file = os.path.join(output_dir, corpus)
+
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                processed = processor(raw_file, output_file, **options)
+                timings.append(time.perf_counter() - start)
+            best = min(timings)
+            total += best
+            print(f"{corpus[:50]:50s} {processor_name:34s} {records:6d} records "
+                  f"{processed:6d} processed {best * 1000:9.1f} ms")
+        print(f"{'total':50s} {'':34s} {'':30s} {total * 1000:9.1f} ms")
+
+if __name__ == "__main__":
+    main()
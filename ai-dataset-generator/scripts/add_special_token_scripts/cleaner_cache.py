@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Clean-File Cache for the File Cleaners
+--------------------------------------
+This module remembers which files a cleaner (replace_infinity_with_i,
+symbol_repair) already found clean, so later runs over an unchanged tree skip
+them without opening them.
+
+Entries are keyed by path and hold the size, mtime and SHA-256 of the file
+when it was found clean. A file whose size and mtime still match is skipped
+from its directory entry alone. If only the mtime changed (e.g. after a copy
+or checkout), the content hash decides. The whole cache is tied to a
+fingerprint of the replacement table, so changing the table invalidates it.
+"""
+
+import os
+import json
+import hashlib
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler()]
+)
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 1
+
+def table_fingerprint(table):
+    """Return a stable fingerprint of a replacement table."""
+    encoded = json.dumps(sorted(table.items()), ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+def file_sha256(file_path):
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class CleanCache:
+    """Persistent set of files known to contain nothing to repair."""
+
+    def __init__(self, cache_file, fingerprint):
+        self.cache_file = cache_file
+        self.fingerprint = fingerprint
+        self.entries = {}
+        self.changed = False
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache {cache_file}: {e}")
+            return
+        if data.get('version') == CACHE_VERSION and data.get('fingerprint') == fingerprint:
+            self.entries = data.get('files', {})
+        else:
+            logger.info(f"Cache {cache_file} was built for another table, starting afresh")
+
+    def is_clean(self, file_path, stat):
+        """
+        Check whether a file is known to be clean.
+
+        Args:
+            file_path (str): Path to the file
+            stat (os.stat_result): The file's current stat, e.g. from os.scandir
+
+        Returns:
+            bool: True if the file can be skipped
+        """
+        entry = self.entries.get(os.path.abspath(file_path))
+        if entry is None or entry[0] != stat.st_size:
+            return False
+        if entry[1] == stat.st_mtime_ns:
+            return True
+        # Same size but touched: only the content can tell
+        if file_sha256(file_path) == entry[2]:
+            entry[1] = stat.st_mtime_ns
+            self.changed = True
+            return True
+        return False
+
+    def mark_clean(self, file_path, digest=None):
+        """Record a file as clean with its current size, mtime and content hash."""
+        stat = os.stat(file_path)
+        self.entries[os.path.abspath(file_path)] = [stat.st_size, stat.st_mtime_ns,
+                                                    digest or file_sha256(file_path)]
+        self.changed = True
+
+    def forget(self, file_path):
+        if self.entries.pop(os.path.abspath(file_path), None) is not None:
+            self.changed = True
+
+    def save(self):
+        """Write the cache if it changed, replacing the previous file atomically."""
+        if not self.changed:
+            return
+        data = {'version': CACHE_VERSION, 'fingerprint': self.fingerprint, 'files': self.entries}
+        tmp_file = f"{self.cache_file}.tmp{os.getpid()}"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_file, self.cache_file)
+        self.changed = False
+
+def write_hit_report(report_file, file_counts, table, dry_run):
+    """
+    Write per-file hit counts of a cleaner run to a JSON report.
+
+    Args:
+        report_file (str): Path to the report
+        file_counts (dict): Hits per symbol by file, for files that had any
+        table (dict): The replacement table that was applied
+        dry_run (bool): Whether the files were left untouched
+    """
+    totals = {}
+    for counts in file_counts.values():
+        for symbol, count in counts.items():
+            totals[symbol] = totals.get(symbol, 0) + count
+    report = {
+        'dry_run': dry_run,
+        'table': table,
+        'totals': dict(sorted(totals.items(), key=lambda item: -item[1])),
+        'files': {path: dict(sorted(counts.items(), key=lambda item: -item[1]))
+                  for path, counts in sorted(file_counts.items())},
+    }
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Saved report to {report_file}")
@@ -1,80 +1,227 @@
-import unicodedata
 import json
 import os
-import re
+import glob
+import argparse
+import shutil
+import hashlib
+import tempfile
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from orthography import compile_profiles
+from special_tokens import replace_tag_texts
+
+# Output orders supported by process_dataset
+ORDER_ORIGINALS_FIRST = 'originals_first'
+ORDER_INTERLEAVED = 'interleaved'
+
+# Variants kept in memory before process_dataset spools them to disk
+SPOOL_MAX_SIZE = 16 * 1024 * 1024
+
+# Orthography profiles applied by normalize_yanomami_text. The tilde vowels
+# (ã, ẽ, ĩ, õ, ũ) lose their tilde with the other nonspacing marks.
+YANOMAMI_TEXT_PROFILES = ('strip_marks', 'i_bar_to_i')
 
 def normalize_yanomami_text(text):
     """Remove diacritical marks and replace special Yanomami characters."""
-    # First remove standard diacritics
-    text = ''.join(c for c in unicodedata.normalize('NFD', text)
-                  if unicodedata.category(c) != 'Mn')
-    
-    # Then replace special Yanomami characters
-    replacements = {
-        'ɨ': 'i',  # Latin Small Letter I with Stroke → i
-        'Ɨ': 'I',  # Latin Capital Letter I with Stroke → I
-        'ã': 'a',  # a with tilde
-        'ẽ': 'e',  # e with tilde
-        'ĩ': 'i',  # i with tilde
-        'õ': 'o',  # o with tilde
-        'ũ': 'u',  # u with tilde
-    }
-    
-    for char, replacement in replacements.items():
-        text = text.replace(char, replacement)
-    
-    return text
-
-def process_dataset(input_file, output_file):
-    """Process the dataset to create a version with and without diacritics."""
-    try:
-        # Load the original data
-        with open(input_file, 'r', encoding='utf-8') as f:
-            original_data = [json.loads(line) for line in f]
-        
-        print(f"Loaded {len(original_data)} items from {input_file}")
+    return compile_profiles(YANOMAMI_TEXT_PROFILES).apply(text)
+
+def normalize_word_tags(content):
+    """Normalize the text inside every <WORD> tag of a message, keeping the tags."""
+    return replace_tag_texts(content, ('WORD',), lambda tag, text: normalize_yanomami_text(text))
+
+class RecordVariant:
+    """A copy-on-write variant of a dataset record.
+
+    The variant keeps a reference to the original record and only the message
+    contents it changes, keyed by message index; every other message is shared
+    with the original, which is never modified.
+    """
+
+    __slots__ = ('base', 'contents')
+
+    def __init__(self, base, contents=None):
+        self.base = base
+        self.contents = contents or {}
+
+    def to_dict(self):
+        """Build the variant record, copying only the changed messages (shallowly)."""
+        if not self.contents:
+            return self.base
+        messages = list(self.base['messages'])
+        for position, content in self.contents.items():
+            messages[position] = dict(messages[position], content=content)
+        return dict(self.base, messages=messages)
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+def _tag_variant(item, tags, profiles):
+    """Return a RecordVariant of a record with the given tags of its user messages rewritten."""
+    orthography = compile_profiles(profiles)
+    contents = {}
+    for position, message in enumerate(item.get('messages', ())):
+        # Only normalize the user's query, not the assistant's response
+        if 'content' in message and message['role'] == 'user':
+            # Normalize the text inside the tags, keeping the tags
+            content = replace_tag_texts(message['content'], tags, lambda tag, text: orthography.apply(text))
+            if content != message['content']:
+                contents[position] = content
+    return RecordVariant(item, contents)
+
+def no_diacritics_variant(item):
+    """Return a RecordVariant of a record with the <WORD> tags of its user messages normalized."""
+    return _tag_variant(item, ('WORD',), YANOMAMI_TEXT_PROFILES)
+
+def i_bar_variant(item):
+    """Return a RecordVariant of a record with ɨ written as i in the <WORD> tags of its user messages."""
+    return _tag_variant(item, ('WORD',), ('i_bar_to_i',))
+
+def lowercase_variant(item):
+    """Return a RecordVariant of a record with the <WORD> tags of its user messages lowercased."""
+    return _tag_variant(item, ('WORD',), ('lowercase',))
+
+def yanomami_phrase_variant(item):
+    """Return a RecordVariant of a record with the <YANOMAMI> phrases of its user messages normalized."""
+    return _tag_variant(item, ('YANOMAMI',), YANOMAMI_TEXT_PROFILES)
+
+# Variant kinds process_dataset can emit, by name
+VARIANT_KINDS = {
+    'no_diacritics': no_diacritics_variant,
+    'i_bar': i_bar_variant,
+    'lowercase': lowercase_variant,
+    'yanomami_phrase': yanomami_phrase_variant,
+}
+
+DEFAULT_VARIANTS = ('no_diacritics',)
+
+# Records sent to a worker process at a time when process_dataset runs with workers > 1
+AUGMENT_CHUNK_SIZE = 2000
+
+def augment_record(item, variants=DEFAULT_VARIANTS):
+    """
+    Build the requested variants of a record, dropping duplicates.
+    
+    A variant is dropped when its serialized record hashes the same as the
+    original or as a variant already kept for this record.
+    
+    Args:
+        item (dict): The original record
+        variants (tuple): Names from VARIANT_KINDS, in output order
         
-        # Create versions without diacritics
-        no_diacritics_data = []
-        for item in original_data:
-            # Create a copy of the item
-            new_item = item.copy()
+    Returns:
+        tuple: (original JSON line, list of (variant name, JSON line) pairs kept,
+            list of names of the variants dropped as duplicates)
+    """
+    original = json.dumps(item, ensure_ascii=False)
+    seen = {hashlib.blake2b(original.encode('utf-8'), digest_size=16).digest()}
+    kept = []
+    duplicates = []
+    for name in variants:
+        variant = VARIANT_KINDS[name](item)
+        if not variant.contents:
+            continue
+        line = variant.to_json()
+        digest = hashlib.blake2b(line.encode('utf-8'), digest_size=16).digest()
+        if digest in seen:
+            duplicates.append(name)
+            continue
+        seen.add(digest)
+        kept.append((name, line))
+    return original, kept, duplicates
+
+def _augment_lines(lines, variants):
+    """Worker entry point: augment a chunk of JSONL lines."""
+    return [augment_record(json.loads(line), variants) for line in lines]
+
+def _chunks(lines, size):
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _augmented_records(f_in, variants, workers):
+    """Yield augment_record results for every line of f_in, in input order."""
+    if workers <= 1:
+        for line in f_in:
+            yield augment_record(json.loads(line), variants)
+        return
+    
+    # Keep a bounded number of chunks in flight so memory does not grow with the input
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in _chunks(f_in, AUGMENT_CHUNK_SIZE):
+            pending.append(executor.submit(_augment_lines, chunk, variants))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+def process_dataset(input_file, output_file, order=ORDER_ORIGINALS_FIRST, variants=DEFAULT_VARIANTS, workers=1):
+    """
+    Process the dataset to create a version with and without diacritics.
+    
+    Records are streamed: each one is read, written and turned into its variants
+    before the next is read, so memory use does not grow with the dataset.
+    Variants identical to the original record, or to another variant of the
+    same record, are not written.
+    
+    Args:
+        input_file (str): Path to the input JSONL file
+        output_file (str): Path to the combined JSONL file
+        order (str): ORDER_ORIGINALS_FIRST writes every original record and then
+            every variant (variants are spooled to a temporary file and copied
+            after the first pass); ORDER_INTERLEAVED writes each variant right
+            after its original
+        variants (tuple): Names from VARIANT_KINDS to emit for every record
+        workers (int): Number of worker processes building variants
+    
+    Returns:
+        dict: Number of variants written per variant kind
+    """
+    if order not in (ORDER_ORIGINALS_FIRST, ORDER_INTERLEAVED):
+        raise ValueError(f"Unknown output order: {order}")
+    unknown = [name for name in variants if name not in VARIANT_KINDS]
+    if unknown:
+        raise ValueError(f"Unknown variant kinds: {', '.join(unknown)}")
+    
+    written = Counter({name: 0 for name in variants})
+    dropped = Counter()
+    try:
+        original_count = 0
+        with open(input_file, 'r', encoding='utf-8') as f_in, \
+                open(output_file, 'w', encoding='utf-8') as f_out, \
+                tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE, mode='w+', encoding='utf-8') as spool:
+            variants_out = f_out if order == ORDER_INTERLEAVED else spool
             
-            # Process all text in the messages
-            if 'messages' in new_item:
-                for message in new_item['messages']:
-                    if 'content' in message:
-                        # Only normalize the user's query, not the assistant's response
-                        if message['role'] == 'user':
-                            # Extract the word inside <WORD> tags to normalize it
-                            content = message['content']
-                            # Find all words inside <WORD> tags
-                            word_pattern = re.compile(r'<WORD>([^<]+)</WORD>')
-                            matches = word_pattern.findall(content)
-                            
-                            for match in matches:
-                                normalized = normalize_yanomami_text(match)
-                                if normalized != match:
-                                    # Replace only the word, keeping the tags
-                                    content = content.replace(f"<WORD>{match}</WORD>", 
-                                                             f"<WORD>{normalized}</WORD>")
-                            
-                            message['content'] = content
+            for original, kept, duplicates in _augmented_records(f_in, tuple(variants), workers):
+                f_out.write(original + '\n')
+                for name, line in kept:
+                    variants_out.write(line + '\n')
+                    written[name] += 1
+                dropped.update(duplicates)
+                original_count += 1
             
-            no_diacritics_data.append(new_item)
-        
-        # Combine both datasets
-        combined_data = original_data + no_diacritics_data
+            if order == ORDER_ORIGINALS_FIRST:
+                spool.seek(0)
+                shutil.copyfileobj(spool, f_out)
         
-        # Save the combined dataset
-        with open(output_file, 'w', encoding='utf-8') as f:
-            for item in combined_data:
-                f.write(json.dumps(item, ensure_ascii=False) + '\n')
-        
-        print(f"Original data count: {len(original_data)}")
-        print(f"Combined data count: {len(combined_data)}")
+        print(f"Loaded {original_count} items from {input_file}")
+        print(f"Original data count: {original_count}")
+        print(f"Combined data count: {original_count + sum(written.values())}")
         print(f"Saved combined dataset to {output_file}")
         
+        # Show how many records each variant kind actually changed
+        print("\n=== VARIANT YIELD ===")
+        for name in variants:
+            rate = written[name] / original_count if original_count else 0
+            print(f"{name}: {written[name]} variants ({rate:.1%} of records), "
+                  f"{dropped[name]} duplicates dropped")
+        
         # Show examples of normalization
         print("\n=== EXAMPLES OF TEXT NORMALIZATION ===")
         examples = ["pë", "napë", "hëtëmou", "Yanomamɨ", "Watorikɨ", "hãrõ", "ĩhĩ"]
@@ -84,26 +231,80 @@ def process_dataset(input_file, output_file):
         
     except Exception as e:
         print(f"Error: {e}")
+    
+    return dict(written)
+
+def find_translations_file(data_dir=None):
+    """
+    Find the first ok-translations.jsonl under data_dir.
+    
+    Args:
+        data_dir (str, optional): Directory to search, defaults to the parent of
+            this script's directory
+        
+    Returns:
+        str: Path to the file, or None if there is none
+    """
+    if data_dir is None:
+        data_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for root, dirs, files in os.walk(data_dir):
+        if 'ok-translations.jsonl' in files:
+            return os.path.join(root, 'ok-translations.jsonl')
+    return None
 
-# Find the translations file
-data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-translations_file = None
-
-for root, dirs, files in os.walk(data_dir):
-    for file in files:
-        if file == 'ok-translations.jsonl':
-            translations_file = os.path.join(root, file)
-            break
-
-if translations_file:
-    output_file = os.path.join(os.path.dirname(translations_file), 'combined-translations.jsonl')
-    print(f"Found translations file: {translations_file}")
-    process_dataset(translations_file, output_file)
-else:
-    print("Could not find ok-translations.jsonl file. Please specify the correct path.")
-
-# Demo with sample data if file not found
-if not translations_file:
+def combined_output_file(input_file, output_dir=None):
+    """Return the combined output path for an input, e.g. ok-translations.jsonl -> combined-translations.jsonl."""
+    name = os.path.basename(input_file)
+    if name.startswith('ok-'):
+        name = name[len('ok-'):]
+    return os.path.join(output_dir or os.path.dirname(input_file), 'combined-' + name)
+
+def _process_one(input_file, output_file, order, variants, workers=1):
+    """Worker entry point for process_files."""
+    return input_file, process_dataset(input_file, output_file, order, variants, workers)
+
+def process_files(input_files, output_dir=None, order=ORDER_ORIGINALS_FIRST, variants=DEFAULT_VARIANTS, workers=1):
+    """
+    Run process_dataset on several inputs, each written to its own combined output.
+    
+    Args:
+        input_files (list): Paths to the input JSONL files
+        output_dir (str, optional): Directory for the outputs, defaults to each input's directory
+        order (str): Output order passed to process_dataset
+        variants (tuple): Variant kinds passed to process_dataset
+        workers (int): Number of worker processes. With at least as many files as
+            workers, files are processed concurrently; otherwise the files are
+            processed one after the other, each with workers building its variants
+        
+    Returns:
+        dict: Variants written per kind, by input file
+    
+    Raises:
+        ValueError: If two inputs would be written to the same combined output,
+            e.g. ok-translations.jsonl and translations.jsonl
+    """
+    jobs = [(input_file, combined_output_file(input_file, output_dir)) for input_file in input_files]
+    sources = {}
+    for input_file, output_file in jobs:
+        key = os.path.normcase(os.path.abspath(output_file))
+        if key in sources:
+            raise ValueError(f"{sources[key]} and {input_file} would both be written to {output_file}")
+        sources[key] = input_file
+    if workers <= 1 or len(jobs) < workers:
+        return dict(_process_one(input_file, output_file, order, variants, workers)
+                    for input_file, output_file in jobs)
+    
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_process_one, input_file, output_file, order, variants)
+                   for input_file, output_file in jobs]
+        for future in as_completed(futures):
+            input_file, written = future.result()
+            results[input_file] = written
+    return results
+
+def demo():
+    """Show the no-diacritics variant of a few sample records."""
     print("\n=== DEMO WITH SAMPLE DATA ===")
     sample_data = [
         {"messages": [{"role": "user", "content": "<QUERY>What does <WORD>pë</WORD> mean in Yanomami?</QUERY>"}, 
@@ -115,36 +316,57 @@ if not translations_file:
     ]
     
     # Create versions without diacritics
-    no_diacritics_data = []
-    for item in sample_data:
-        # Create a copy of the item
-        new_item = item.copy()
-        
-        # Process all text in the messages
-        if 'messages' in new_item:
-            for message in new_item['messages']:
-                if 'content' in message and message['role'] == 'user':
-                    # Extract the word inside <WORD> tags to normalize it
-                    content = message['content']
-                    # Find all words inside <WORD> tags
-                    word_pattern = re.compile(r'<WORD>([^<]+)</WORD>')
-                    matches = word_pattern.findall(content)
-                    
-                    for match in matches:
-                        normalized = normalize_yanomami_text(match)
-                        if normalized != match:
-                            # Replace only the word, keeping the tags
-                            content = content.replace(f"<WORD>{match}</WORD>", 
-                                                     f"<WORD>{normalized}</WORD>")
-                    
-                    message['content'] = content
-        
-        no_diacritics_data.append(new_item)
+    no_diacritics_data = [no_diacritics_variant(item) for item in sample_data]
     
     print("\n=== ORIGINAL SAMPLE DATA ===")
     for item in sample_data:
         print(json.dumps(item, ensure_ascii=False))
     
     print("\n=== NORMALIZED SAMPLE DATA ===")
-    for item in no_diacritics_data:
-        print(json.dumps(item, ensure_ascii=False))
+    for variant in no_diacritics_data:
+        print(variant.to_json())
+
+def main():
+    """Main function to handle command line arguments."""
+    parser = argparse.ArgumentParser(description='Create combined datasets with normalized variants of each record.')
+    parser.add_argument('--inputs', type=str, nargs='+', default=None,
+                        help='Glob patterns of input JSONL files, e.g. "output/*/ok-*.jsonl" '
+                             '(defaults to the first ok-translations.jsonl found)')
+    parser.add_argument('--output_dir', type=str, default=None,
+                        help='Directory for the combined files (defaults to each input\'s directory)')
+    parser.add_argument('--variants', type=str, nargs='+', default=list(DEFAULT_VARIANTS),
+                        choices=sorted(VARIANT_KINDS), help='Variant kinds to emit for every record')
+    parser.add_argument('--order', type=str, default=ORDER_ORIGINALS_FIRST,
+                        choices=[ORDER_ORIGINALS_FIRST, ORDER_INTERLEAVED], help='Output order')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Number of worker processes: input files are processed concurrently, or '
+                             'records within each file when there are fewer files than workers')
+    args = parser.parse_args()
+    
+    if args.inputs:
+        # Outputs of an earlier run are never inputs
+        input_files = sorted({path for pattern in args.inputs for path in glob.glob(pattern, recursive=True)
+                              if not os.path.basename(path).startswith('combined-')})
+        if not input_files:
+            print(f"No input files match {' '.join(args.inputs)}")
+            return
+    else:
+        translations_file = find_translations_file()
+        if not translations_file:
+            print("Could not find ok-translations.jsonl file. Please specify the correct path.")
+            demo()
+            return
+        print(f"Found translations file: {translations_file}")
+        input_files = [translations_file]
+    
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    try:
+        results = process_files(input_files, args.output_dir, args.order, tuple(args.variants), args.workers)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    print(f"\nProcessed {len(results)} files")
+
+if __name__ == "__main__":
+    main()
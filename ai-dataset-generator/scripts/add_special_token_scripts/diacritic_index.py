@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Binary Diacritic Mapping Index
+------------------------------
+This script provides a compact on-disk format for the normalized -> diacritical
+word mapping built by text_normalization, and a reader that memory-maps it.
+
+Layout (little endian):
+    header        magic, version, key count, variant count
+    key table     (key offset, key length, first variant, variant count) per key,
+                  sorted by the UTF-8 bytes of the key
+    variant table (offset, length, count) per diacritical variant, ranked by
+                  corpus frequency within each key
+    string heap   UTF-8 bytes of every key and variant
+
+Lookups binary-search the key table directly in the mapped pages, so opening an
+index costs one mmap call and processes that open the same file share its pages.
+
+Usage:
+    python diacritic_index.py <mapping.json> <mapping.idx>
+"""
+
+import os
+import sys
+import json
+import mmap
+import struct
+import logging
+from array import array
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler()]
+)
+logger = logging.getLogger(__name__)
+
+INDEX_MAGIC = b'YDIX'
+INDEX_VERSION = 2
+INDEX_SUFFIX = '.idx'
+
+_HEADER = struct.Struct('<4sIII')
+_KEY_ENTRY = struct.Struct('<IIII')
+_VARIANT_ENTRY = struct.Struct('<III')
+# Version 1 indexes have no per-variant counts
+_VARIANT_ENTRY_V1 = struct.Struct('<II')
+
+class RankedVariants:
+    """Diacritical variants of one normalized word, most frequent first.
+
+    Behaves like a read-only sequence of the variant words; the corpus count of
+    each variant is kept alongside in an array.
+    """
+
+    __slots__ = ('words', 'counts')
+
+    def __init__(self, words, counts=None):
+        self.words = tuple(words)
+        self.counts = array('L', counts if counts is not None else [0] * len(self.words))
+
+    @classmethod
+    def from_counts(cls, word_counts):
+        """Rank (word, count) pairs by descending count, then by word."""
+        ranked = sorted(word_counts, key=lambda item: (-item[1], item[0]))
+        return cls([word for word, _ in ranked], [count for _, count in ranked])
+
+    def top_k(self, k):
+        """Return the k most frequent variants as (word, count) pairs."""
+        return list(zip(self.words[:k], self.counts[:k]))
+
+    def __getitem__(self, position):
+        return self.words[position]
+
+    def __len__(self):
+        return len(self.words)
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __eq__(self, other):
+        if not isinstance(other, RankedVariants):
+            return NotImplemented
+        return self.words == other.words and self.counts == other.counts
+
+    def __repr__(self):
+        return f"RankedVariants({list(zip(self.words, self.counts))!r})"
+
+def write_index(mapping, index_file):
+    """
+    Write a normalized -> diacritical mapping to a binary index file.
+
+    The file is written next to its destination and moved into place with
+    os.replace, so readers that still have the old index mapped are not affected.
+
+    Args:
+        mapping (dict): Mapping from non-diacritical words to RankedVariants (or plain
+            lists of diacritical words, stored with a count of 0)
+        index_file (str): Path to save the index to
+    """
+    heap = bytearray()
+    key_table = bytearray()
+    variant_table = bytearray()
+    variant_count = 0
+
+    # Sort by encoded bytes so the reader can compare raw slices of the heap
+    entries = sorted((key.encode('utf-8'), variants) for key, variants in mapping.items())
+    for key_bytes, variants in entries:
+        key_table += _KEY_ENTRY.pack(len(heap), len(key_bytes), variant_count, len(variants))
+        heap += key_bytes
+        counts = getattr(variants, 'counts', None) or [0] * len(variants)
+        for variant, count in zip(variants, counts):
+            variant_bytes = variant.encode('utf-8')
+            variant_table += _VARIANT_ENTRY.pack(len(heap), len(variant_bytes), count)
+            heap += variant_bytes
+            variant_count += 1
+
+    tmp_file = f"{index_file}.tmp{os.getpid()}"
+    with open(tmp_file, 'wb') as f:
+        f.write(_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(entries), variant_count))
+        f.write(key_table)
+        f.write(variant_table)
+        f.write(heap)
+    os.replace(tmp_file, index_file)
+    logger.info(f"Saved index with {len(entries)} entries to {index_file}")
+
+def convert_json_to_index(json_file, index_file):
+    """
+    Convert a JSON mapping saved by text_normalization.save_mapping to a binary index.
+
+    Args:
+        json_file (str): Path to the JSON mapping
+        index_file (str): Path to save the index to
+    """
+    with open(json_file, 'r', encoding='utf-8') as f:
+        mapping = json.load(f)
+    write_index({key: variants_from_json(value) for key, value in mapping.items()}, index_file)
+
+def variants_from_json(value):
+    """
+    Build RankedVariants from a JSON mapping value: a list of [word, count] pairs,
+    or a plain list of words as written before counts were recorded.
+    """
+    if value and isinstance(value[0], str):
+        return RankedVariants(value)
+    return RankedVariants([word for word, _ in value], [count for _, count in value])
+
+class DiacriticIndex:
+    """Read-only, memory-mapped view of a binary diacritic mapping index.
+
+    Supports the parts of the dict interface used by normalize_query
+    (get, in, [], len, iteration over keys) without deserializing the file.
+    """
+
+    def __init__(self, index_file):
+        self.index_file = index_file
+        with open(index_file, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            self._read_header()
+        except Exception:
+            self._mm.close()
+            raise
+
+    def _read_header(self):
+        """Read the header and check that the tables and the heap fit in the file."""
+        index_file, size = self.index_file, len(self._mm)
+        if size < _HEADER.size:
+            raise ValueError(f"{index_file} is too short for a diacritic mapping index")
+        magic, version, self._key_count, self._variant_count = _HEADER.unpack_from(self._mm, 0)
+        if magic != INDEX_MAGIC:
+            raise ValueError(f"{index_file} is not a diacritic mapping index")
+        if version not in (1, INDEX_VERSION):
+            raise ValueError(f"Unsupported index version {version} in {index_file}")
+        self._variant_entry = _VARIANT_ENTRY if version == INDEX_VERSION else _VARIANT_ENTRY_V1
+
+        self._keys_start = _HEADER.size
+        self._variants_start = self._keys_start + self._key_count * _KEY_ENTRY.size
+        self._heap_start = self._variants_start + self._variant_count * self._variant_entry.size
+        if self._heap_start > size:
+            raise ValueError(f"{index_file} is truncated: its tables need {self._heap_start} bytes, "
+                             f"the file has {size}")
+
+        # The heap is written in table order, so the last key and the last
+        # variant end its two tables' strings
+        heap_size = size - self._heap_start
+        last_strings = []
+        if self._key_count:
+            last_strings.append(self._key_entry(self._key_count - 1)[:2])
+        if self._variant_count:
+            last_strings.append(self._variant_entry.unpack_from(
+                self._mm, self._variants_start + (self._variant_count - 1) * self._variant_entry.size)[:2])
+        if any(offset + length > heap_size for offset, length in last_strings):
+            raise ValueError(f"{index_file} is truncated: its string heap is incomplete")
+
+    def _key_entry(self, position):
+        return _KEY_ENTRY.unpack_from(self._mm, self._keys_start + position * _KEY_ENTRY.size)
+
+    def _heap_bytes(self, offset, length):
+        start = self._heap_start + offset
+        return self._mm[start:start + length]
+
+    def _find(self, key):
+        """Return the key table entry for key, or None if it is not in the index."""
+        key_bytes = key.encode('utf-8')
+        low, high = 0, self._key_count
+        while low < high:
+            middle = (low + high) // 2
+            entry = self._key_entry(middle)
+            candidate = self._heap_bytes(entry[0], entry[1])
+            if candidate < key_bytes:
+                low = middle + 1
+            elif candidate > key_bytes:
+                high = middle
+            else:
+                return entry
+        return None
+
+    def _variants(self, entry):
+        words = []
+        counts = []
+        for position in range(entry[2], entry[2] + entry[3]):
+            offset, length, *count = self._variant_entry.unpack_from(
+                self._mm, self._variants_start + position * self._variant_entry.size)
+            words.append(self._heap_bytes(offset, length).decode('utf-8'))
+            counts.append(count[0] if count else 0)
+        return RankedVariants(words, counts)
+
+    def top_k(self, key, k):
+        """Return the k most frequent variants of key as (word, count) pairs."""
+        entry = self._find(key)
+        if entry is None:
+            return []
+        return self._variants(entry).top_k(k)
+
+    def get(self, key, default=None):
+        entry = self._find(key)
+        if entry is None:
+            return default
+        return self._variants(entry)
+
+    def __getitem__(self, key):
+        entry = self._find(key)
+        if entry is None:
+            raise KeyError(key)
+        return self._variants(entry)
+
+    def __contains__(self, key):
+        return self._find(key) is not None
+
+    def __len__(self):
+        return self._key_count
+
+    def __iter__(self):
+        for position in range(self._key_count):
+            entry = self._key_entry(position)
+            yield self._heap_bytes(entry[0], entry[1]).decode('utf-8')
+
+    def keys(self):
+        return iter(self)
+
+    def items(self):
+        for position in range(self._key_count):
+            entry = self._key_entry(position)
+            yield self._heap_bytes(entry[0], entry[1]).decode('utf-8'), self._variants(entry)
+
+    def close(self):
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def main():
+    """Main function to handle command line arguments."""
+    if len(sys.argv) != 3:
+        print("Usage:")
+        print("    python diacritic_index.py <mapping.json> <mapping.idx>")
+        return
+
+    json_file, index_file = sys.argv[1], sys.argv[2]
+    if not os.path.isfile(json_file):
+        print(f"Error: {json_file} is not a valid file")
+        return
+
+    convert_json_to_index(json_file, index_file)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Fuzzy Lookup Index for Yanomami Words
+-------------------------------------
+This script provides a symmetric-delete (SymSpell-style) index over the
+diacritic-free words of the tagged vocabulary, so misspelled query words
+(a dropped h, a doubled vowel) can still be resolved to a known word.
+
+Every vocabulary word is indexed under all strings obtained by deleting up to
+max_distance characters from its first prefix_length characters. A lookup
+generates the same deletes for the query word and only verifies the handful of
+words that share one, so its cost does not depend on the vocabulary size.
+Shorter prefixes use less memory at the cost of recall for edits near the end
+of long words.
+"""
+
+import json
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler()]
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_DISTANCE = 2
+DEFAULT_PREFIX_LENGTH = 7
+
+def _deletes(word, max_distance):
+    """Return word and every string obtained by deleting up to max_distance characters."""
+    results = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        next_frontier = set()
+        for candidate in frontier:
+            for position in range(len(candidate)):
+                next_frontier.add(candidate[:position] + candidate[position + 1:])
+        next_frontier -= results
+        results |= next_frontier
+        frontier = next_frontier
+    return results
+
+def edit_distance(source, target, max_distance):
+    """
+    Optimal string alignment distance (Levenshtein plus adjacent transpositions).
+
+    Returns max_distance + 1 as soon as the distance is known to exceed max_distance.
+    """
+    if abs(len(source) - len(target)) > max_distance:
+        return max_distance + 1
+
+    previous_previous = None
+    previous = list(range(len(target) + 1))
+    for i in range(1, len(source) + 1):
+        current = [i] + [0] * len(target)
+        for j in range(1, len(target) + 1):
+            cost = 0 if source[i - 1] == target[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and j > 1
+                    and source[i - 1] == target[j - 2] and source[i - 2] == target[j - 1]):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+class SymSpellIndex:
+    """Symmetric-delete index returning vocabulary words within a small edit distance."""
+
+    def __init__(self, max_distance=DEFAULT_MAX_DISTANCE, prefix_length=DEFAULT_PREFIX_LENGTH):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.words = {}
+        self.deletes = {}
+        # Words that are never corrected, e.g. the English words of the corpus
+        self.stop_words = set()
+
+    def add_word(self, word, count=1):
+        """Add a word (or more occurrences of it) to the index."""
+        if word in self.words:
+            self.words[word] += count
+            return
+        self.words[word] = count
+        for delete in _deletes(word[:self.prefix_length], self.max_distance):
+            self.deletes.setdefault(delete, []).append(word)
+
+    def lookup(self, term, max_distance=None):
+        """
+        Find vocabulary words close to term.
+
+        Args:
+            term (str): The (possibly misspelled) word
+            max_distance (int, optional): Maximum edit distance, at most the index's max_distance
+
+        Returns:
+            list: (word, distance, count) tuples, closest and most frequent first
+        """
+        if max_distance is None or max_distance > self.max_distance:
+            max_distance = self.max_distance
+
+        if term in self.words:
+            return [(term, 0, self.words[term])]
+
+        candidates = set()
+        for delete in _deletes(term[:self.prefix_length], max_distance):
+            candidates.update(self.deletes.get(delete, ()))
+
+        suggestions = []
+        for word in candidates:
+            distance = edit_distance(term, word, max_distance)
+            if distance <= max_distance:
+                suggestions.append((word, distance, self.words[word]))
+        suggestions.sort(key=lambda suggestion: (suggestion[1], -suggestion[2], suggestion[0]))
+        return suggestions
+
+    def save(self, index_file):
+        """Save the index, including its delete table, to a JSON file."""
+        words = sorted(self.words)
+        positions = {word: position for position, word in enumerate(words)}
+        data = {
+            'max_distance': self.max_distance,
+            'prefix_length': self.prefix_length,
+            'words': [[word, self.words[word]] for word in words],
+            'stop_words': sorted(self.stop_words),
+            'deletes': {delete: [positions[word] for word in entries]
+                        for delete, entries in self.deletes.items()},
+        }
+        with open(index_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        logger.info(f"Saved fuzzy index with {len(words)} words and {len(self.deletes)} deletes to {index_file}")
+
+    @classmethod
+    def load(cls, index_file):
+        """Load an index saved by save() without regenerating its deletes."""
+        with open(index_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        index = cls(data['max_distance'], data['prefix_length'])
+        words = [word for word, _ in data['words']]
+        index.words = {word: count for word, count in data['words']}
+        index.stop_words = set(data.get('stop_words', ()))
+        index.deletes = {delete: [words[position] for position in positions]
+                         for delete, positions in data['deletes'].items()}
+        logger.info(f"Loaded fuzzy index with {len(words)} words from {index_file}")
+        return index
+
+def build_fuzzy_index(mapping, max_distance=DEFAULT_MAX_DISTANCE, prefix_length=DEFAULT_PREFIX_LENGTH,
+                      plain_words=None, stop_words=None):
+    """
+    Build a fuzzy index over the diacritic-free words of the tagged vocabulary.
+
+    The mapping keys cover the words that have diacritical variants; plain_words
+    adds the tagged words written without diacritics, so that a correctly typed
+    plain word is found as itself instead of as a nearby mapping key. The
+    stop_words are kept with the index and never corrected. Only
+    lowercase words are indexed, since normalize_query looks words up in
+    lowercase. Each word is weighted by its total corpus count.
+
+    Args:
+        mapping (dict): Mapping built by text_normalization.build_diacritic_mapping
+        max_distance (int): Maximum edit distance supported by lookups
+        prefix_length (int): Number of leading characters used to generate deletes
+        plain_words (dict, optional): Occurrences of the tagged words without diacritics
+            (see text_normalization.plain_words)
+        stop_words (set, optional): Words never corrected, e.g. the English words of
+            the corpus (see text_normalization.collect_stop_words)
+
+    Returns:
+        SymSpellIndex: The index
+    """
+    index = SymSpellIndex(max_distance, prefix_length)
+    for normalized, variants in mapping.items():
+        if normalized == normalized.lower():
+            index.add_word(normalized, sum(getattr(variants, 'counts', ())) or 1)
+    for word, count in (plain_words or {}).items():
+        if word == word.lower():
+            index.add_word(word, count)
+    index.stop_words = set(stop_words or ())
+    return index
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Parallel Record Mapping for JSONL Files
+---------------------------------------
+This module runs a per-record transform over JSONL files, either serially or in
+a process pool. Each input file is split into byte ranges that start and end on
+a newline, the ranges of all files are interleaved so independent files are
+processed concurrently, and every output file is written in the original record
+order, so the result is byte-identical to a serial run.
+
+A transform takes one line of the input (as text, with its line ending) and
+returns (output_text, processed) where output_text is written as is ('' drops
+the record) and processed is added to the file's processed count. Transforms
+must be module-level functions so the worker processes can pickle them.
+"""
+
+import io
+import os
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from tqdm import tqdm
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler()]
+)
+logger = logging.getLogger(__name__)
+
+# Smallest byte range handed to a worker
+MIN_RANGE_SIZE = 256 * 1024
+# Ranges per worker and file, so a slow range does not leave the other workers idle
+RANGES_PER_WORKER = 4
+
+def newline_ranges(input_file, range_size):
+    """
+    Split a file into byte ranges of about range_size that end after a newline.
+
+    Returns:
+        list: (start, end) byte offsets covering the whole file
+    """
+    size = os.path.getsize(input_file)
+    ranges = []
+    start = 0
+    with open(input_file, 'rb') as f:
+        while start < size:
+            end = start + range_size
+            if end >= size:
+                end = size
+            else:
+                f.seek(end)
+                f.readline()
+                end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+def _map_range(transform, input_file, start, end):
+    """Worker entry point: apply transform to every line of one byte range."""
+    with open(input_file, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    outputs = []
+    processed = 0
+    # Universal newlines, like iterating over the file in text mode
+    for line in io.StringIO(data.decode('utf-8'), newline=None):
+        output, count = transform(line)
+        outputs.append(output)
+        processed += count
+    return ''.join(outputs), processed
+
+def _map_serial(transform, input_file, output_file):
+    processed = 0
+    with open(input_file, 'r', encoding='utf-8') as f_in, open(output_file, 'w', encoding='utf-8') as f_out:
+        for line in tqdm(f_in, desc=f"Processing {os.path.basename(input_file)}"):
+            output, count = transform(line)
+            f_out.write(output)
+            processed += count
+    return processed
+
+def map_jsonl_files(jobs, workers=None):
+    """
+    Run transforms over several JSONL files.
+
+    Args:
+        jobs (list): (transform, input_file, output_file) tuples
+        workers (int, optional): Number of worker processes. With None or 1 the
+            files are processed one after another in this process.
+
+    Returns:
+        list: Processed count of each job
+    """
+    if not workers or workers <= 1:
+        return [_map_serial(transform, input_file, output_file) for transform, input_file, output_file in jobs]
+
+    # Interleave the ranges of all files so they are processed concurrently
+    per_file = []
+    for transform, input_file, _ in jobs:
+        range_size = max(MIN_RANGE_SIZE, os.path.getsize(input_file) // (workers * RANGES_PER_WORKER) + 1)
+        per_file.append(newline_ranges(input_file, range_size))
+    tasks = []
+    for position in range(max((len(ranges) for ranges in per_file), default=0)):
+        for job_index, ranges in enumerate(per_file):
+            if position < len(ranges):
+                tasks.append((job_index, ranges[position]))
+
+    processed = [0] * len(jobs)
+    outputs = [open(output_file, 'w', encoding='utf-8') for _, _, output_file in jobs]
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Bounded window of ranges in flight, written back in task order
+            pending = deque()
+            task_iter = iter(tasks)
+            with tqdm(total=len(tasks), desc="Processing ranges") as progress:
+                while True:
+                    while len(pending) < workers * 2:
+                        task = next(task_iter, None)
+                        if task is None:
+                            break
+                        job_index, (start, end) = task
+                        transform, input_file, _ = jobs[job_index]
+                        pending.append((job_index, executor.submit(_map_range, transform, input_file, start, end)))
+                    if not pending:
+                        break
+                    job_index, future = pending.popleft()
+                    text, count = future.result()
+                    outputs[job_index].write(text)
+                    processed[job_index] += count
+                    progress.update(1)
+    finally:
+        for f in outputs:
+            f.close()
+    return processed
+
+def map_jsonl_records(transform, input_file, output_file, workers=None):
+    """
+    Run a transform over every record of a JSONL file.
+
+    Args:
+        transform (callable): Maps a line to (output_text, processed)
+        input_file (str): Path to the input file
+        output_file (str): Path to the output file
+        workers (int, optional): Number of worker processes, serial when None or 1
+
+    Returns:
+        int: Number of processed records
+    """
+    return map_jsonl_files([(transform, input_file, output_file)], workers)[0]
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Keyword Automaton
+-----------------
+This module finds which of a fixed set of keywords occur in a text in a single
+left-to-right pass (Aho-Corasick). The keywords are compiled once into a trie
+with failure links, so the cost of a search depends on the length of the text
+and not on the number of keywords; overlapping keywords ("how" and "how do you
+say") are all found. Transitions that follow failure links are remembered, so
+each character of a search costs one dictionary lookup.
+"""
+
+from collections import deque
+
+class KeywordAutomaton:
+    """A compiled set of keywords."""
+
+    def __init__(self, keywords):
+        self.keywords = tuple(dict.fromkeys(keywords))
+        if not self.keywords or '' in self.keywords:
+            raise ValueError("The automaton needs at least one non-empty keyword")
+        # Trie: transitions, failure link and keywords ending at each state
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [()]
+        for keyword in self.keywords:
+            state = 0
+            for char in keyword:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(())
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state] += (keyword,)
+
+        # Breadth-first, so the failure state of every parent is already known
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] += self.output[self.fail[child]]
+        # Transition of each state on each character seen so far, failure links resolved
+        self.delta = [{} for _ in self.goto]
+
+    def _next(self, state, char):
+        """Follow failure links from state until char has a transition, and remember the result."""
+        fallback = state
+        while fallback and char not in self.goto[fallback]:
+            fallback = self.fail[fallback]
+        target = self.goto[fallback].get(char, 0)
+        self.delta[state][char] = target
+        return target
+
+    def find(self, text):
+        """
+        Find the keywords that occur in text.
+
+        Args:
+            text (str): Text to search (matching is case-sensitive)
+
+        Returns:
+            set: The keywords found, each at least once
+        """
+        delta, output = self.delta, self.output
+        found = set()
+        state = 0
+        for char in text:
+            target = delta[state].get(char)
+            state = self._next(state, char) if target is None else target
+            if output[state]:
+                found.update(output[state])
+        return found
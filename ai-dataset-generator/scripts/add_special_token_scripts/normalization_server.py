@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Yanomami Query Normalization Server
+-----------------------------------
+This script keeps a diacritic mapping (and optionally a fuzzy index) loaded in a
+long-lived local process and serves query normalization over HTTP, either on a
+loopback TCP port or on a Unix socket. The mapping file is watched and reloaded
+atomically when it changes, so inference workers never pay the load cost.
+
+Endpoints:
+    POST /normalize   {"queries": ["...", ...]}  ->  {"results": ["...", ...]}
+    GET  /health      mapping size and load time
+
+Usage:
+    python normalization_server.py --mapping diacritic_mapping.idx [--port 8765 | --unix_socket PATH]
+"""
+
+import os
+import json
+import time
+import socket
+import argparse
+import threading
+import http.client
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import logging
+
+from text_normalization import load_mapping, normalize_queries
+from fuzzy_index import SymSpellIndex
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler()]
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Seconds between checks of the mapping file for changes
+RELOAD_INTERVAL = 2.0
+
+# Number of cached token replacements kept before the cache is started afresh
+TOKEN_CACHE_SIZE = 200000
+
+class _LoadedState:
+    """Everything derived from one version of the mapping files."""
+
+    def __init__(self, mapping, fuzzy_index, signature):
+        self.mapping = mapping
+        self.fuzzy_index = fuzzy_index
+        self.signature = signature
+        self.loaded_at = time.time()
+        self.cache = {}
+
+class NormalizationService:
+    """Holds the current mapping and swaps in a new one when its files change.
+
+    Requests take a reference to the current state once, so a reload never
+    mixes two mapping versions within one batch.
+    """
+
+    def __init__(self, mapping_file, fuzzy_index_file=None):
+        self.mapping_file = mapping_file
+        self.fuzzy_index_file = fuzzy_index_file
+        self._reload_lock = threading.Lock()
+        self.state = self._load()
+
+    def _signature(self):
+        files = [self.mapping_file] + ([self.fuzzy_index_file] if self.fuzzy_index_file else [])
+        signature = []
+        for path in files:
+            stat = os.stat(path)
+            signature.append((stat.st_size, stat.st_mtime_ns, stat.st_ino))
+        return tuple(signature)
+
+    def _load(self):
+        signature = self._signature()
+        mapping = load_mapping(self.mapping_file)
+        fuzzy_index = SymSpellIndex.load(self.fuzzy_index_file) if self.fuzzy_index_file else None
+        return _LoadedState(mapping, fuzzy_index, signature)
+
+    def reload_if_changed(self):
+        """Reload the mapping if its files changed; returns True if it was reloaded."""
+        with self._reload_lock:
+            try:
+                if self._signature() == self.state.signature:
+                    return False
+                state = self._load()
+            except (OSError, ValueError) as e:
+                # Keep serving the previous version, e.g. while a file is being replaced
+                logger.warning(f"Could not reload mapping: {e}")
+                return False
+            self.state = state
+            logger.info(f"Reloaded mapping with {len(state.mapping)} entries")
+            return True
+
+    def watch(self, interval=RELOAD_INTERVAL):
+        """Start a daemon thread that reloads the mapping when it changes."""
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.reload_if_changed()
+                except Exception:
+                    # A watcher that dies would silently stop all future reloads
+                    logger.exception("Unexpected error while checking the mapping for changes")
+        thread = threading.Thread(target=run, name='mapping-watcher', daemon=True)
+        thread.start()
+        return thread
+
+    def normalize(self, queries):
+        state = self.state
+        if len(state.cache) > TOKEN_CACHE_SIZE:
+            state.cache = {}
+        return normalize_queries(queries, state.mapping, fuzzy_index=state.fuzzy_index, cache=state.cache)
+
+    def health(self):
+        state = self.state
+        return {
+            'status': 'ok',
+            'mapping_file': self.mapping_file,
+            'entries': len(state.mapping),
+            'fuzzy_index': self.fuzzy_index_file,
+            'loaded_at': state.loaded_at,
+        }
+
+class NormalizationRequestHandler(BaseHTTPRequestHandler):
+    """HTTP handler for the normalization endpoints."""
+
+    server_version = 'YanomamiNormalization/1.0'
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, self.server.service.health())
+        else:
+            self._send_json(404, {'error': f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != '/normalize':
+            self._send_json(404, {'error': f"Unknown path {self.path}"})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length).decode('utf-8'))
+            queries = request.get('queries')
+            if not isinstance(queries, list) or not all(isinstance(query, str) for query in queries):
+                raise ValueError("'queries' must be a list of strings")
+        except (AttributeError, ValueError) as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        self._send_json(200, {'results': self.server.service.normalize(queries)})
+
+    def address_string(self):
+        # Unix socket clients have no host address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} - {format % args}")
+
+class UnixNormalizationServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Threaded HTTP server listening on a Unix socket."""
+
+    daemon_threads = True
+
+def create_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_socket=None):
+    """
+    Create (but do not start) a server for a NormalizationService.
+
+    Args:
+        service (NormalizationService): The service to expose
+        host (str): Interface to bind; keep it on loopback
+        port (int): TCP port, 0 to pick a free one
+        unix_socket (str, optional): Listen on this Unix socket instead of TCP
+
+    Returns:
+        socketserver.BaseServer: The server, with the service attached
+    """
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        server = UnixNormalizationServer(unix_socket, NormalizationRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), NormalizationRequestHandler)
+    server.service = service
+    return server
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, unix_socket, timeout):
+        super().__init__('localhost', timeout=timeout)
+        self.unix_socket = unix_socket
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_socket)
+
+class NormalizationClient:
+    """Minimal stdlib client for a running normalization server."""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_socket=None, timeout=30):
+        self.host = host
+        self.port = port
+        self.unix_socket = unix_socket
+        self.timeout = timeout
+
+    def _request(self, method, path, payload=None):
+        if self.unix_socket:
+            connection = _UnixHTTPConnection(self.unix_socket, self.timeout)
+        else:
+            connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8') if payload is not None else None
+            headers = {'Content-Type': 'application/json'} if body is not None else {}
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            result = json.loads(response.read().decode('utf-8'))
+            if response.status != 200:
+                raise RuntimeError(f"Normalization server returned {response.status}: {result.get('error')}")
+            return result
+        finally:
+            connection.close()
+
+    def normalize_queries(self, queries):
+        """Normalize a batch of queries, returning the results in order."""
+        return self._request('POST', '/normalize', {'queries': list(queries)})['results']
+
+    def normalize_query(self, query):
+        """Normalize a single query."""
+        return self.normalize_queries([query])[0]
+
+    def health(self):
+        return self._request('GET', '/health')
+
+def main():
+    """Main function to handle command line arguments."""
+    parser = argparse.ArgumentParser(description='Serve Yanomami query normalization locally.')
+    parser.add_argument('--mapping', type=str, required=True,
+                        help='Diacritic mapping file (.json or .idx)')
+    parser.add_argument('--fuzzy_index', type=str, default=None,
+                        help='Optional fuzzy index file built by text_normalization.py')
+    parser.add_argument('--host', type=str, default=DEFAULT_HOST,
+                        help='Interface to listen on')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help='TCP port to listen on')
+    parser.add_argument('--unix_socket', type=str, default=None,
+                        help='Listen on this Unix socket instead of a TCP port')
+    parser.add_argument('--reload_interval', type=float, default=RELOAD_INTERVAL,
+                        help='Seconds between checks of the mapping file for changes')
+    args = parser.parse_args()
+
+    service = NormalizationService(args.mapping, args.fuzzy_index)
+    service.watch(args.reload_interval)
+    server = create_server(service, args.host, args.port, args.unix_socket)
+    logger.info(f"Serving normalization on {args.unix_socket or f'http://{args.host}:{args.port}'}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
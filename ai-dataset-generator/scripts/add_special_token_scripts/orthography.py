@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Orthography Profiles for Yanomami Text
+--------------------------------------
+This module declares the text normalizations used across the scripts (stripping
+diacritics, ɨ -> i, ∞ -> i repair, lowercase folding) as data, and compiles any
+combination of them into a single str.translate table applied in one pass.
+
+Each profile is a list of steps:
+    {'step': 'strip_marks', 'recompose': bool}   NFD, drop nonspacing marks (Mn),
+                                                 optionally NFC the result
+    {'step': 'map', 'table': {char: replacement}}
+    {'step': 'lower'}
+
+Compiling precomputes the result of all steps for every code point in
+TABLE_RANGES (and every mapped character). Text containing a character whose
+result cannot be computed one character at a time falls back to running the
+steps on the whole string, so the output is always the same.
+"""
+
+import re
+import unicodedata
+
+# Code point blocks precomputed for profiles that strip marks or fold case:
+# Latin-1 through Latin Extended-B, IPA extensions (ɨ), combining marks, Greek,
+# Latin Extended Additional (ẽ, ỹ), general punctuation, letterlike symbols,
+# math operators and the Latin ligatures that show up in the dictionary sources.
+TABLE_RANGES = [
+    (0x0000, 0x03FF),
+    (0x1E00, 0x1EFF),
+    (0x2000, 0x22FF),
+    (0xFB00, 0xFB06),
+]
+
+ORTHOGRAPHY_PROFILES = {
+    # Remove diacritical marks and recompose (text_normalization.remove_diacritics)
+    'strip_diacritics': [{'step': 'strip_marks', 'recompose': True}],
+    # Remove diacritical marks, leaving the text decomposed
+    'strip_marks': [{'step': 'strip_marks', 'recompose': False}],
+    # Latin letter i with stroke, written as a plain i
+    'i_bar_to_i': [{'step': 'map', 'table': {'ɨ': 'i', 'Ɨ': 'I'}}],
+    # ∞ is how the PDF extraction renders ɨ
+    'infinity_repair': [{'step': 'map', 'table': {'∞': 'i'}}],
+    'lowercase': [{'step': 'lower'}],
+}
+
+# Characters whose lowercase form depends on their neighbours (final sigma)
+_CONTEXT_SENSITIVE_LOWER = {'Σ'}
+
+def _apply_step(step, text):
+    kind = step['step']
+    if kind == 'strip_marks':
+        text = ''.join(c for c in unicodedata.normalize('NFD', text)
+                       if unicodedata.category(c) != 'Mn')
+        if step['recompose']:
+            text = unicodedata.normalize('NFC', text)
+        return text
+    if kind == 'map':
+        for char, replacement in step['table'].items():
+            text = text.replace(char, replacement)
+        return text
+    if kind == 'lower':
+        return text.lower()
+    raise ValueError(f"Unknown orthography step: {kind}")
+
+def _is_inert(char):
+    """True for characters NFC never combines with a neighbour."""
+    return (char.isascii()
+            or (unicodedata.combining(char) == 0
+                and unicodedata.category(char) not in ('Mn', 'Mc', 'Me', 'Cn')
+                and unicodedata.normalize('NFD', char) == char))
+
+def _char_result(steps, char):
+    """
+    Run the steps on a single character.
+
+    Returns the result, or None if the result for this character inside a longer
+    string could differ (so it must not go into the translate table).
+    """
+    text = char
+    for step in steps:
+        if step['step'] == 'strip_marks':
+            # Canonical reordering only moves marks that are dropped anyway
+            if any(unicodedata.combining(d) and unicodedata.category(d) != 'Mn'
+                   for d in unicodedata.normalize('NFD', text)):
+                return None
+        elif step['step'] == 'lower':
+            if any(c in _CONTEXT_SENSITIVE_LOWER for c in text):
+                return None
+        text = _apply_step(step, text)
+        if step['step'] == 'strip_marks' and step['recompose']:
+            # Recomposition must not be able to join this result with its neighbours
+            if not all(_is_inert(c) for c in text):
+                return None
+    return text
+
+class Orthography:
+    """A compiled combination of orthography profiles."""
+
+    def __init__(self, profiles):
+        self.profiles = tuple(profiles)
+        self.steps = [step for name in self.profiles for step in ORTHOGRAPHY_PROFILES[name]]
+        self.table = {}
+        self._uncovered = None
+
+        mapped = {char for step in self.steps if step['step'] == 'map' for char in step['table']}
+        if all(step['step'] == 'map' for step in self.steps):
+            # Single-character maps are applied one character at a time anyway
+            candidates = mapped
+        else:
+            candidates = {chr(cp) for start, end in TABLE_RANGES for cp in range(start, end + 1)} | mapped
+
+        covered = []
+        for char in sorted(candidates):
+            if unicodedata.category(char) == 'Cn':
+                continue
+            result = _char_result(self.steps, char)
+            if result is None:
+                continue
+            covered.append(char)
+            if result != char:
+                self.table[ord(char)] = result
+
+        if candidates is not mapped:
+            self._uncovered = re.compile('[^' + re.escape(''.join(covered)) + ']')
+
+        # ASCII text can be returned as is unless some step changes ASCII characters
+        self._ascii_unchanged = not any(cp < 0x80 for cp in self.table)
+
+    def reference(self, text):
+        """Run every step on the whole string (the behaviour the table reproduces)."""
+        for step in self.steps:
+            text = _apply_step(step, text)
+        return text
+
+    def apply(self, text):
+        """Apply the profiles to text in a single pass."""
+        if self._ascii_unchanged and text.isascii():
+            return text
+        if self._uncovered is not None and self._uncovered.search(text):
+            return self.reference(text)
+        return text.translate(self.table)
+
+_compiled = {}
+
+def compile_profiles(profiles):
+    """
+    Return the compiled Orthography for a sequence of profile names (cached).
+
+    Args:
+        profiles (iterable): Names from ORTHOGRAPHY_PROFILES, applied in order
+
+    Returns:
+        Orthography: The compiled profiles
+    """
+    profiles = tuple(profiles)
+    if profiles not in _compiled:
+        _compiled[profiles] = Orthography(profiles)
+    return _compiled[profiles]
@@ -4,49 +4,155 @@ Script to replace the infinity character (∞) with the letter 'i' in text files
 
 Usage:
     python replace_infinity_with_i.py <input_file> [<output_file>]
+    python replace_infinity_with_i.py --dir <directory_path> [--recursive] [--include GLOB] [--exclude GLOB] [--workers N]
+                                      [--dry-run] [--report REPORT.json] [--cache CACHE.json]
     
-    If output_file is not provided, the input file will be modified in-place.
+    If output_file is not provided, the input file will be modified in-place. With
+    --cache, files found clean are remembered and skipped on later runs.
 """
 
-import sys
 import os
+import time
+import mmap
+import codecs
+import shutil
+import fnmatch
+import argparse
+import tempfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-def replace_infinity_with_i(input_file, output_file=None):
+from orthography import compile_profiles
+from cleaner_cache import CleanCache, file_sha256, table_fingerprint, write_hit_report
+
+# Orthography profile that maps ∞ back to i
+INFINITY_REPAIR = compile_profiles(['infinity_repair'])
+
+# Bytes read from a file at a time
+CHUNK_SIZE = 1024 * 1024
+
+# Symbols INFINITY_REPAIR replaces, and their UTF-8 encodings (∞ is E2 88 9E)
+REPAIR_TABLE = {char: replacement for step in INFINITY_REPAIR.steps for char, replacement in step['table'].items()}
+TARGET_BYTES = tuple(char.encode('utf-8') for char in REPAIR_TABLE)
+
+def contains_any(input_file, targets=TARGET_BYTES):
+    """
+    Check whether a file contains any of the target byte sequences.
+    
+    The file is memory-mapped and searched with mmap.find, without decoding it,
+    so files that need no repair cost little more than reading them.
+    
+    Args:
+        input_file (str): Path to the file
+        targets (tuple): Byte sequences to look for
+        
+    Returns:
+        bool: True if at least one target occurs in the file
+    """
+    with open(input_file, 'rb') as f:
+        # mmap cannot map an empty file
+        if os.fstat(f.fileno()).st_size == 0:
+            return False
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return any(mm.find(target) != -1 for target in targets)
+
+def read_text_chunks(input_file, chunk_size=CHUNK_SIZE):
+    """
+    Yield the decoded text of a UTF-8 file chunk by chunk.
+    
+    An incremental decoder carries multi-byte sequences that straddle chunk
+    boundaries over to the next chunk, so memory use is bounded by chunk_size.
+    
+    Raises:
+        UnicodeDecodeError: If the file is not valid UTF-8
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    with open(input_file, 'rb') as f:
+        while True:
+            data = f.read(chunk_size)
+            text = decoder.decode(data, final=not data)
+            if text:
+                yield text
+            if not data:
+                return
+
+def count_infinity(input_file, chunk_size=CHUNK_SIZE):
+    """Count the infinity characters (∞) in a UTF-8 file without loading it into memory."""
+    return sum(text.count('∞') for text in read_text_chunks(input_file, chunk_size))
+
+def rewrite_atomically(input_file, output_file, transform, chunk_size=CHUNK_SIZE):
+    """
+    Stream input_file through transform into output_file.
+    
+    transform is called with an iterator over the decoded text chunks of
+    input_file and returns an iterator over the text to write.
+    
+    The result is written to a temporary file in the destination directory and
+    moved into place with os.replace, so a crash never leaves a truncated file.
+    A symlinked output_file is resolved first, so its target is rewritten and
+    the link is kept.
+    """
+    output_file = os.path.realpath(output_file)
+    output_dir = os.path.dirname(output_file)
+    fd, tmp_file = tempfile.mkstemp(dir=output_dir, prefix=f".{os.path.basename(output_file)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f_out:
+            for text in transform(read_text_chunks(input_file, chunk_size)):
+                f_out.write(text)
+        if os.path.exists(output_file):
+            shutil.copymode(output_file, tmp_file)
+        else:
+            # mkstemp creates the file as 0600; give new files the usual permissions
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp_file, 0o666 & ~umask)
+        os.replace(tmp_file, output_file)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+
+def _repair_chunks(chunks):
+    # ∞ is a single character, so chunks can be repaired independently
+    return map(INFINITY_REPAIR.apply, chunks)
+
+def replace_infinity_with_i(input_file, output_file=None, dry_run=False):
     """Replace all occurrences of the infinity character (∞) with 'i'.
     
+    Files are first searched for the UTF-8 bytes of ∞ without decoding them.
+    Files with a hit are streamed in chunks and rewritten, replacing the
+    destination atomically.
+    
     Args:
         input_file (str): Path to the input file
         output_file (str, optional): Path to the output file. If None, input file will be modified in-place.
+        dry_run (bool): Only count the infinity characters, leaving the files untouched
     
     Returns:
-        int: Number of replacements made
+        int: Number of replacements made (or found, for a dry run)
     """
-    # Read the input file
+    # Count the infinity characters, decoding only files that contain one
     try:
-        with open(input_file, 'r', encoding='utf-8') as f:
-            content = f.read()
+        replacement_count = count_infinity(input_file) if contains_any(input_file) else 0
     except Exception as e:
         print(f"Error reading file {input_file}: {e}")
         return 0
     
-    # Count and replace the infinity character
-    replacement_count = content.count('∞')
-    new_content = content.replace('∞', 'i')
-    
     # If no replacements were made, inform and exit
     if replacement_count == 0:
         print(f"No infinity characters (∞) found in {input_file}")
         return 0
     
+    if dry_run:
+        print(f"Would replace {replacement_count} infinity characters in {input_file}")
+        return replacement_count
+    
     # Write to output file or overwrite input file
     try:
+        rewrite_atomically(input_file, output_file or input_file, _repair_chunks)
         if output_file:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(new_content)
             print(f"Replaced {replacement_count} infinity characters in {input_file} and saved to {output_file}")
         else:
-            with open(input_file, 'w', encoding='utf-8') as f:
-                f.write(new_content)
             print(f"Replaced {replacement_count} infinity characters in {input_file} (in-place)")
         
         return replacement_count
@@ -54,77 +160,219 @@ def replace_infinity_with_i(input_file, output_file=None):
         print(f"Error writing to file: {e}")
         return 0
 
-def process_directory(directory_path, recursive=False):
+def iter_files(directory_path, recursive=False, include=None, exclude=None):
+    """
+    Walk a directory with os.scandir and yield the files to process.
+    
+    Patterns are shell globs matched against both the file name and the path
+    relative to directory_path; hidden directories are not entered. Symlinked
+    files are followed, but a file reached through several paths (a link and
+    its target, or hard links) is yielded once, so it is never rewritten by two
+    workers at a time.
+    
+    Args:
+        directory_path (str): Path to the directory
+        recursive (bool): Whether to walk subdirectories
+        include (list, optional): Only yield files matching one of these patterns
+        exclude (list, optional): Skip files matching any of these patterns
+        
+    Yields:
+        tuple: (path, os.stat_result)
+    """
+    def matches(patterns, name, relative_path):
+        return any(fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(relative_path, pattern)
+                   for pattern in patterns)
+    
+    seen = set()
+    pending = [directory_path]
+    while pending:
+        current = pending.pop()
+        try:
+            entries = list(os.scandir(current))
+        except OSError as e:
+            print(f"Error reading directory {current}: {e}")
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if recursive and not entry.name.startswith('.'):
+                    pending.append(entry.path)
+                continue
+            if not entry.is_file():
+                continue
+            relative_path = os.path.relpath(entry.path, directory_path)
+            if include and not matches(include, entry.name, relative_path):
+                continue
+            if exclude and matches(exclude, entry.name, relative_path):
+                continue
+            stat = entry.stat()
+            if (stat.st_dev, stat.st_ino) in seen:
+                continue
+            seen.add((stat.st_dev, stat.st_ino))
+            yield entry.path, stat
+
+def _process_file(input_file, dry_run=False, with_digest=False):
+    """
+    Worker entry point for process_directory.
+    
+    Returns:
+        tuple: (path, replacement count, status, digest) where status is
+            'replaced', 'found' (dry run), 'clean', 'skipped' for files that are
+            not UTF-8 text, or 'error: ...'; digest is the SHA-256 of files that
+            end up clean when with_digest is set, else None
+    """
+    try:
+        replacement_count = count_infinity(input_file) if contains_any(input_file) else 0
+        if replacement_count and dry_run:
+            return input_file, replacement_count, 'found', None
+        if replacement_count:
+            rewrite_atomically(input_file, input_file, _repair_chunks)
+        digest = file_sha256(input_file) if with_digest else None
+        return input_file, replacement_count, 'replaced' if replacement_count else 'clean', digest
+    except UnicodeDecodeError:
+        return input_file, 0, 'skipped', None
+    except Exception as e:
+        return input_file, 0, f"error: {e}", None
+
+def process_directory(directory_path, recursive=False, include=None, exclude=None, workers=None,
+                      dry_run=False, cache_file=None, report_file=None):
     """Process all files in a directory.
     
+    Files are processed in a process pool, largest first so one big file does
+    not hold up the end of the run, and a summary is printed at the end.
+    
     Args:
         directory_path (str): Path to the directory
         recursive (bool): Whether to process subdirectories recursively
+        include (list, optional): Glob patterns of files to process
+        exclude (list, optional): Glob patterns of files to leave alone
+        workers (int, optional): Number of worker processes, defaults to the CPU count
+        dry_run (bool): Only count the infinity characters, leaving files untouched
+        cache_file (str, optional): Clean-file cache; files it knows are clean are
+            skipped without being opened
+        report_file (str, optional): Write per-file counts to this JSON file
         
     Returns:
-        int: Total number of replacements made
+        int: Total number of replacements made (or found, for a dry run)
     """
+    start_time = time.time()
+    cache = CleanCache(cache_file, table_fingerprint(REPAIR_TABLE)) if cache_file else None
+    
+    statuses = Counter()
+    files = []
+    for path, stat in iter_files(directory_path, recursive, include, exclude):
+        if cache is not None and cache.is_clean(path, stat):
+            statuses['cached'] += 1
+        else:
+            files.append((path, stat.st_size))
+    files.sort(key=lambda item: -item[1])
+    workers = workers or os.cpu_count() or 1
+    
     total_replacements = 0
+    total_bytes = sum(size for _, size in files)
+    file_counts = {}
     
-    for item in os.listdir(directory_path):
-        item_path = os.path.join(directory_path, item)
-        
-        if os.path.isfile(item_path):
-            # Skip binary files or non-text files
-            try:
-                with open(item_path, 'r', encoding='utf-8') as f:
-                    f.read(1024)  # Try to read a bit of the file
-                replacements = replace_infinity_with_i(item_path)
-                total_replacements += replacements
-            except UnicodeDecodeError:
-                print(f"Skipping binary or non-UTF-8 file: {item_path}")
-            except Exception as e:
-                print(f"Error processing file {item_path}: {e}")
-        
-        elif recursive and os.path.isdir(item_path):
-            # Process subdirectory recursively
-            subdirectory_replacements = process_directory(item_path, recursive=True)
-            total_replacements += subdirectory_replacements
+    if workers <= 1 or len(files) <= 1:
+        results = (_process_file(path, dry_run, cache is not None) for path, _ in files)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=min(workers, len(files)))
+        results = (future.result() for future in as_completed(
+            [executor.submit(_process_file, path, dry_run, cache is not None) for path, _ in files]))
+    
+    try:
+        for path, replacement_count, status, digest in results:
+            if status == 'replaced':
+                print(f"Replaced {replacement_count} infinity characters in {path} (in-place)")
+            elif status == 'found':
+                print(f"Would replace {replacement_count} infinity characters in {path}")
+            elif status == 'skipped':
+                print(f"Skipping binary or non-UTF-8 file: {path}")
+            elif status != 'clean':
+                print(f"Error processing file {path}: {status[len('error: '):]}")
+                status = 'error'
+            statuses[status] += 1
+            total_replacements += replacement_count
+            if replacement_count:
+                file_counts[path] = {'∞': replacement_count}
+            if cache is not None:
+                if digest:
+                    cache.mark_clean(path, digest)
+                else:
+                    cache.forget(path)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if cache is not None:
+            cache.save()
+    
+    print("\n=== SUMMARY ===")
+    print(f"Files scanned: {len(files)} ({total_bytes / (1024 * 1024):.1f} MiB)")
+    if cache is not None:
+        print(f"Files skipped as known clean: {statuses['cached']}")
+    if dry_run:
+        print(f"Files that would change: {statuses['found']}")
+    else:
+        print(f"Files changed: {statuses['replaced']}")
+    print(f"Files already clean: {statuses['clean']}")
+    print(f"Files skipped (not UTF-8): {statuses['skipped']}")
+    print(f"Errors: {statuses['error']}")
+    print(f"Elapsed: {time.time() - start_time:.2f}s with {min(workers, max(len(files), 1))} workers")
+    
+    if report_file:
+        write_hit_report(report_file, file_counts, REPAIR_TABLE, dry_run)
     
     return total_replacements
 
 def main():
     """Main function to handle command line arguments."""
-    if len(sys.argv) < 2:
-        print("Usage:")
-        print("  For a single file:")
-        print("    python replace_infinity_with_i.py <input_file> [<output_file>]")
-        print("  For a directory:")
-        print("    python replace_infinity_with_i.py --dir <directory_path> [--recursive]")
-        return
+    parser = argparse.ArgumentParser(
+        description='Replace the infinity character (∞) with the letter i.',
+        usage='%(prog)s <input_file> [<output_file>]\n'
+              '       %(prog)s --dir <directory_path> [--recursive] [--include GLOB] [--exclude GLOB] [--workers N]\n'
+              '       [--dry-run] [--report REPORT.json] [--cache CACHE.json]')
+    parser.add_argument('input_file', nargs='?', help='File to fix')
+    parser.add_argument('output_file', nargs='?', help='Where to save the result (defaults to in-place)')
+    parser.add_argument('--dir', dest='directory_path', help='Fix every file in this directory in-place')
+    parser.add_argument('--recursive', action='store_true', help='Also process subdirectories')
+    parser.add_argument('--include', action='append', default=None,
+                        help='Only process files matching this glob (repeatable), e.g. "*.jsonl"')
+    parser.add_argument('--exclude', action='append', default=None,
+                        help='Skip files matching this glob (repeatable)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of worker processes (defaults to the CPU count)')
+    parser.add_argument('--dry-run', '--dry_run', dest='dry_run', action='store_true',
+                        help='Only report what would change, leaving the files untouched')
+    parser.add_argument('--report', type=str, default=None,
+                        help='Write per-file counts to this JSON file')
+    parser.add_argument('--cache', type=str, default=None,
+                        help='Clean-file cache; files it knows are clean are skipped without being opened')
+    args = parser.parse_args()
     
     # Process directory
-    if sys.argv[1] == "--dir":
-        if len(sys.argv) < 3:
-            print("Error: Directory path is required with --dir option")
-            return
-        
-        directory_path = sys.argv[2]
-        recursive = "--recursive" in sys.argv
-        
+    if args.directory_path:
+        directory_path = args.directory_path
         if not os.path.isdir(directory_path):
             print(f"Error: {directory_path} is not a valid directory")
             return
         
-        print(f"Processing directory: {directory_path} {'(recursively)' if recursive else ''}")
-        total_replacements = process_directory(directory_path, recursive)
-        print(f"Total replacements made: {total_replacements}")
+        print(f"Processing directory: {directory_path} {'(recursively)' if args.recursive else ''}")
+        total_replacements = process_directory(directory_path, args.recursive, args.include, args.exclude,
+                                               args.workers, args.dry_run, args.cache, args.report)
+        print(f"Total replacements {'found' if args.dry_run else 'made'}: {total_replacements}")
     
     # Process single file
-    else:
-        input_file = sys.argv[1]
-        output_file = sys.argv[2] if len(sys.argv) > 2 else None
-        
-        if not os.path.isfile(input_file):
-            print(f"Error: {input_file} is not a valid file")
+    elif args.input_file:
+        if not os.path.isfile(args.input_file):
+            print(f"Error: {args.input_file} is not a valid file")
             return
         
-        replace_infinity_with_i(input_file, output_file)
+        replacement_count = replace_infinity_with_i(args.input_file, args.output_file, args.dry_run)
+        if args.report:
+            file_counts = {args.input_file: {'∞': replacement_count}} if replacement_count else {}
+            write_hit_report(args.report, file_counts, REPAIR_TABLE, args.dry_run)
+    
+    else:
+        parser.print_usage()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Special Tokens for the Yanomami Dataset
+---------------------------------------
+This module holds the special tokens used to structure the dataset and a scanner
+that finds every tagged span of a message in a single pass.
+"""
+
+import re
+from functools import lru_cache
+
+# Special tokens to add
+SPECIAL_TOKENS = [
+    '<WORD>', '</WORD>',
+    '<POS>', '</POS>',
+    '<DEFINITION>', '</DEFINITION>',
+    '<EXAMPLES>', '</EXAMPLES>',
+    '<EXAMPLE_YANOMAMI>', '</EXAMPLE_YANOMAMI>',
+    '<EXAMPLE_TRANSLATION>', '</EXAMPLE_TRANSLATION>',
+    '<QUERY>', '</QUERY>',
+    '<YANOMAMI>', '</YANOMAMI>',
+    '<TRANSLATION>', '</TRANSLATION>',
+    '<LITERAL>', '</LITERAL>',
+    '<RELATED_FORMS>', '</RELATED_FORMS>',
+    '<USAGE>', '</USAGE>',
+    '<GRAMMATICAL>', '</GRAMMATICAL>'
+]
+
+# Tag names without angle brackets, e.g. 'WORD'
+TAG_NAMES = tuple(token[1:-1] for token in SPECIAL_TOKENS if not token.startswith('</'))
+
+@lru_cache(maxsize=None)
+def _tag_pattern(tags):
+    """Compile one alternation matching the opening and closing token of every tag."""
+    return re.compile('<(/?)(' + '|'.join(re.escape(tag) for tag in tags) + ')>')
+
+def iter_tag_spans(content, tags=TAG_NAMES):
+    """
+    Scan a message once and yield every closed tag span.
+
+    Opening tokens are kept on a stack; a closing token closes the nearest open tag
+    of the same name (dropping any unclosed tags opened inside it), and stray
+    closing tokens are ignored. Nested spans are yielded before the span that
+    contains them.
+
+    Args:
+        content (str): Message content
+        tags (tuple): Tag names to look for, defaults to every special token
+
+    Yields:
+        tuple: (tag, start, end, text) where content[start:end] == text is the
+            text between the opening and closing token
+    """
+    stack = []
+    for match in _tag_pattern(tuple(tags)).finditer(content):
+        tag = match.group(2)
+        if not match.group(1):
+            stack.append((tag, match.end()))
+            continue
+        for depth in range(len(stack) - 1, -1, -1):
+            if stack[depth][0] == tag:
+                start = stack[depth][1]
+                del stack[depth:]
+                yield tag, start, match.start(), content[start:match.start()]
+                break
+
+def iter_leaf_spans(content, tags=TAG_NAMES):
+    """
+    Yield the tag spans whose text is non-empty and contains no '<', in document
+    order. For a single tag this matches re.finditer(r'<TAG>([^<]+)</TAG>').
+    """
+    for span in iter_tag_spans(content, tags):
+        if span[3] and '<' not in span[3]:
+            yield span
+
+def replace_tag_texts(content, tags, replace):
+    """
+    Rewrite the text of every leaf span of the given tags, keeping the tokens.
+
+    Args:
+        content (str): Message content
+        tags (tuple): Tag names whose text is rewritten
+        replace (callable): Called with (tag, text), returns the new text
+
+    Returns:
+        str: The rewritten content
+    """
+    parts = []
+    last = 0
+    for tag, start, end, text in iter_leaf_spans(content, tags):
+        parts.append(content[last:start])
+        parts.append(replace(tag, text))
+        last = end
+    if not parts:
+        return content
+    parts.append(content[last:])
+    return ''.join(parts)
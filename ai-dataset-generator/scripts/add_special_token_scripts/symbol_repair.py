@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Symbol Repair for Extracted Text
+--------------------------------
+This script repairs symbols that PDF extraction renders incorrectly (∞ for ɨ,
+√ for –, Latin ligatures such as ﬁ) using a single replacement table. Every
+symbol of the table is repaired in one pass over each file: the keys, which may
+be several characters long, are compiled into one alternation tried longest
+first, and per-symbol replacement counts can be written to a JSON report.
+
+Usage:
+    python symbol_repair.py <input_file> [<output_file>] [--table TABLE.json] [--report REPORT.json]
+    python symbol_repair.py --dir <directory_path> [--recursive] [--include GLOB] [--exclude GLOB]
+                            [--workers N] [--table TABLE.json] [--report REPORT.json]
+                            [--dry-run] [--cache CACHE.json]
+
+    A table file is a JSON object mapping each symbol (or sequence) to its replacement.
+"""
+
+import os
+import re
+import json
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from replace_infinity_with_i import contains_any, iter_files, read_text_chunks, rewrite_atomically
+from cleaner_cache import CleanCache, file_sha256, table_fingerprint, write_hit_report
+
+# Symbols repaired by default
+DEFAULT_REPAIR_TABLE = {
+    '∞': 'i',   # ɨ rendered as infinity by the PDF extraction
+    '√': '–',   # en dash rendered as a square root
+    'ﬀ': 'ff',
+    'ﬁ': 'fi',
+    'ﬂ': 'fl',
+    'ﬃ': 'ffi',
+    'ﬄ': 'ffl',
+    '\u00ad': '',  # soft hyphen left over from line breaks
+}
+
+class SymbolRepair:
+    """A compiled replacement table."""
+
+    def __init__(self, table=None):
+        self.table = dict(DEFAULT_REPAIR_TABLE if table is None else table)
+        if not self.table or '' in self.table:
+            raise ValueError("The replacement table needs at least one non-empty symbol")
+        # Longest keys first, so a sequence wins over any symbol it starts with
+        keys = sorted(self.table, key=lambda key: (-len(key), key))
+        self.pattern = re.compile('|'.join(re.escape(key) for key in keys))
+        self.max_key_length = len(keys[0])
+        self.targets = tuple(key.encode('utf-8') for key in keys)
+
+    def repair(self, text, counts=None):
+        """
+        Repair every symbol in text.
+
+        Args:
+            text (str): Text to repair
+            counts (Counter, optional): Incremented by one per replaced symbol
+
+        Returns:
+            str: The repaired text
+        """
+        def replace(match):
+            symbol = match.group()
+            if counts is not None:
+                counts[symbol] += 1
+            return self.table[symbol]
+        return self.pattern.sub(replace, text)
+
+    def repair_chunks(self, chunks, counts=None):
+        """
+        Repair a stream of text chunks, yielding the repaired text.
+
+        The last max_key_length - 1 characters of each chunk are held back until
+        the next chunk arrives unless a match already covers them, so a sequence
+        split across two chunks is still found and the output is the same as
+        repairing the whole text at once.
+        """
+        carry = ''
+        hold = self.max_key_length - 1
+        for chunk in chunks:
+            text = carry + chunk
+            cut = len(text) - hold
+            parts = []
+            position = 0
+            for match in self.pattern.finditer(text):
+                if match.start() >= cut:
+                    break
+                parts.append(text[position:match.start()])
+                parts.append(self.table[match.group()])
+                if counts is not None:
+                    counts[match.group()] += 1
+                position = match.end()
+            end = max(position, cut, 0)
+            parts.append(text[position:end])
+            carry = text[end:]
+            if any(parts):
+                yield ''.join(parts)
+        if carry:
+            yield self.repair(carry, counts)
+
+_compiled = {}
+
+def _compile(table):
+    key = tuple(table.items())
+    if key not in _compiled:
+        _compiled[key] = SymbolRepair(table)
+    return _compiled[key]
+
+def repair_file(input_file, output_file=None, table=None, dry_run=False):
+    """
+    Repair every symbol of a file in one streaming pass.
+
+    The file is only decoded and rewritten when the UTF-8 bytes of at least one
+    symbol occur in it; the rewrite replaces the destination atomically.
+
+    Args:
+        input_file (str): Path to the input file
+        output_file (str, optional): Path to the output file. If None, input file will be modified in-place.
+        table (dict, optional): Replacement table, defaults to DEFAULT_REPAIR_TABLE
+        dry_run (bool): Only count the symbols, leaving the files untouched
+
+    Returns:
+        Counter: Number of replacements (or hits, for a dry run) per symbol
+    """
+    repair = _compile(DEFAULT_REPAIR_TABLE if table is None else table)
+    counts = Counter()
+    if dry_run:
+        if contains_any(input_file, repair.targets):
+            for _ in repair.repair_chunks(read_text_chunks(input_file), counts):
+                pass
+    elif contains_any(input_file, repair.targets):
+        rewrite_atomically(input_file, output_file or input_file,
+                           lambda chunks: repair.repair_chunks(chunks, counts))
+    elif output_file:
+        rewrite_atomically(input_file, output_file, lambda chunks: chunks)
+    return counts
+
+def _repair_file_task(input_file, table, dry_run, with_digest):
+    """Worker entry point for repair_directory."""
+    try:
+        counts = repair_file(input_file, table=table, dry_run=dry_run)
+        digest = file_sha256(input_file) if with_digest and not (dry_run and counts) else None
+        return input_file, counts, None, digest
+    except UnicodeDecodeError:
+        return input_file, Counter(), 'skipped', None
+    except Exception as e:
+        return input_file, Counter(), str(e), None
+
+def repair_directory(directory_path, recursive=False, include=None, exclude=None, workers=None, table=None,
+                     dry_run=False, cache_file=None):
+    """
+    Repair every file in a directory in-place, largest files first.
+
+    Args:
+        directory_path (str): Path to the directory
+        recursive (bool): Whether to process subdirectories recursively
+        include (list, optional): Glob patterns of files to process
+        exclude (list, optional): Glob patterns of files to leave alone
+        workers (int, optional): Number of worker processes, defaults to the CPU count
+        table (dict, optional): Replacement table, defaults to DEFAULT_REPAIR_TABLE
+        dry_run (bool): Only count the symbols, leaving the files untouched
+        cache_file (str, optional): Clean-file cache; files it knows are clean
+            for this table are skipped without being opened
+
+    Returns:
+        dict: Replacements per symbol by file, for files that had any
+    """
+    table = DEFAULT_REPAIR_TABLE if table is None else table
+    cache = CleanCache(cache_file, table_fingerprint(table)) if cache_file else None
+
+    files = []
+    cached = 0
+    for path, stat in iter_files(directory_path, recursive, include, exclude):
+        if cache is not None and cache.is_clean(path, stat):
+            cached += 1
+        else:
+            files.append((path, stat.st_size))
+    files.sort(key=lambda item: -item[1])
+    workers = min(workers or os.cpu_count() or 1, max(len(files), 1))
+
+    if workers <= 1:
+        results = (_repair_file_task(path, table, dry_run, cache is not None) for path, _ in files)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        results = (future.result() for future in as_completed(
+            [executor.submit(_repair_file_task, path, table, dry_run, cache is not None) for path, _ in files]))
+
+    file_counts = {}
+    try:
+        for path, counts, error, digest in results:
+            if error == 'skipped':
+                print(f"Skipping binary or non-UTF-8 file: {path}")
+            elif error:
+                print(f"Error processing file {path}: {error}")
+            elif counts:
+                print(f"{'Would repair' if dry_run else 'Repaired'} {sum(counts.values())} symbols in {path}")
+                file_counts[path] = counts
+            if cache is not None:
+                if digest:
+                    cache.mark_clean(path, digest)
+                else:
+                    cache.forget(path)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if cache is not None:
+            cache.save()
+    skipped = f", skipped {cached} known clean" if cache is not None else ''
+    print(f"Scanned {len(files)} files{skipped}, {'would repair' if dry_run else 'repaired'} {len(file_counts)}")
+    return file_counts
+
+def load_table(table_file):
+    """Load a replacement table from a JSON object of symbol -> replacement."""
+    with open(table_file, 'r', encoding='utf-8') as f:
+        table = json.load(f)
+    if not isinstance(table, dict) or not all(isinstance(value, str) for value in table.values()):
+        raise ValueError(f"{table_file} must contain a JSON object of symbol -> replacement strings")
+    return table
+
+def main():
+    """Main function to handle command line arguments."""
+    parser = argparse.ArgumentParser(description='Repair symbols mangled by PDF extraction in one pass.')
+    parser.add_argument('input_file', nargs='?', help='File to repair')
+    parser.add_argument('output_file', nargs='?', help='Where to save the result (defaults to in-place)')
+    parser.add_argument('--dir', dest='directory_path', help='Repair every file in this directory in-place')
+    parser.add_argument('--recursive', action='store_true', help='Also process subdirectories')
+    parser.add_argument('--include', action='append', default=None,
+                        help='Only process files matching this glob (repeatable), e.g. "*.jsonl"')
+    parser.add_argument('--exclude', action='append', default=None,
+                        help='Skip files matching this glob (repeatable)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of worker processes (defaults to the CPU count)')
+    parser.add_argument('--table', type=str, default=None,
+                        help='JSON replacement table (defaults to the built-in table)')
+    parser.add_argument('--report', type=str, default=None,
+                        help='Write per-symbol replacement counts to this JSON file')
+    parser.add_argument('--dry-run', '--dry_run', dest='dry_run', action='store_true',
+                        help='Only report what would change, leaving the files untouched')
+    parser.add_argument('--cache', type=str, default=None,
+                        help='Clean-file cache; files it knows are clean are skipped without being opened')
+    args = parser.parse_args()
+
+    table = load_table(args.table) if args.table else DEFAULT_REPAIR_TABLE
+
+    if args.directory_path:
+        if not os.path.isdir(args.directory_path):
+            print(f"Error: {args.directory_path} is not a valid directory")
+            return
+        file_counts = repair_directory(args.directory_path, args.recursive, args.include, args.exclude,
+                                       args.workers, table, args.dry_run, args.cache)
+    elif args.input_file:
+        if not os.path.isfile(args.input_file):
+            print(f"Error: {args.input_file} is not a valid file")
+            return
+        counts = repair_file(args.input_file, args.output_file, table, args.dry_run)
+        print(f"{'Would repair' if args.dry_run else 'Repaired'} {sum(counts.values())} symbols in {args.input_file}")
+        file_counts = {args.input_file: counts} if counts else {}
+    else:
+        parser.print_usage()
+        return
+
+    if args.report:
+        write_hit_report(args.report, file_counts, table, args.dry_run)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests for the create_combined_dataset.py command line
+----------------------------------------------------
+Run with: python -m pytest test_create_combined_dataset.py
+"""
+
+import json
+import sys
+
+import create_combined_dataset
+
+RECORDS = [
+    {"messages": [{"role": "user", "content": f"<QUERY>What does <WORD>napë{i}</WORD> mean?</QUERY>"},
+                  {"role": "assistant", "content": f"<WORD>napë{i}</WORD> <DEFINITION>foreigner</DEFINITION>"}]}
+    for i in range(7)
+]
+
+def _write_input(path):
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in RECORDS:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+def _run_cli(monkeypatch, *args):
+    monkeypatch.setattr(sys, 'argv', ['create_combined_dataset.py', *args])
+    create_combined_dataset.main()
+
+def test_single_file_uses_record_workers(tmp_path, monkeypatch):
+    _write_input(tmp_path / 'ok-translations.jsonl')
+    monkeypatch.setattr(create_combined_dataset, 'AUGMENT_CHUNK_SIZE', 2)
+    calls = []
+    process_dataset = create_combined_dataset.process_dataset
+    def spy(input_file, output_file, order, variants, workers=1):
+        calls.append(workers)
+        return process_dataset(input_file, output_file, order, variants, workers)
+    monkeypatch.setattr(create_combined_dataset, 'process_dataset', spy)
+
+    _run_cli(monkeypatch, '--inputs', str(tmp_path / 'ok-*.jsonl'),
+             '--output_dir', str(tmp_path / 'serial'), '--workers', '1')
+    _run_cli(monkeypatch, '--inputs', str(tmp_path / 'ok-*.jsonl'),
+             '--output_dir', str(tmp_path / 'parallel'), '--workers', '2')
+
+    assert calls == [1, 2]
+    serial = (tmp_path / 'serial' / 'combined-translations.jsonl').read_text(encoding='utf-8')
+    parallel = (tmp_path / 'parallel' / 'combined-translations.jsonl').read_text(encoding='utf-8')
+    assert parallel == serial
+    assert len(serial.splitlines()) == 2 * len(RECORDS)
+
+def test_rerun_skips_combined_outputs(tmp_path, monkeypatch):
+    _write_input(tmp_path / 'ok-translations.jsonl')
+    for _ in range(2):
+        _run_cli(monkeypatch, '--inputs', str(tmp_path / '*.jsonl'), '--workers', '1')
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['combined-translations.jsonl', 'ok-translations.jsonl']
+    assert len((tmp_path / 'combined-translations.jsonl').read_text(encoding='utf-8').splitlines()) == 2 * len(RECORDS)
+
+def test_duplicate_outputs_are_rejected(tmp_path, monkeypatch, capsys):
+    _write_input(tmp_path / 'ok-translations.jsonl')
+    _write_input(tmp_path / 'translations.jsonl')
+    _run_cli(monkeypatch, '--inputs', str(tmp_path / '*.jsonl'), '--workers', '1')
+    assert 'would both be written to' in capsys.readouterr().out
+    assert not (tmp_path / 'combined-translations.jsonl').exists()
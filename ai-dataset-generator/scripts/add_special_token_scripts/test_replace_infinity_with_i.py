@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-place rewrites of replace_infinity_with_i.py
+-------------------------------------------------------------
+Run with: python -m pytest test_replace_infinity_with_i.py
+"""
+
+import os
+
+from replace_infinity_with_i import iter_files, process_directory, replace_infinity_with_i
+
+def test_symlink_target_is_rewritten(tmp_path):
+    target = tmp_path / 'x.txt'
+    target.write_text('y∞nomam∞\n', encoding='utf-8')
+    link = tmp_path / 'link.txt'
+    link.symlink_to(target)
+
+    assert replace_infinity_with_i(str(link)) == 2
+    assert link.is_symlink()
+    assert target.read_text(encoding='utf-8') == 'yinomami\n'
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+
+def test_linked_files_are_processed_once(tmp_path):
+    target = tmp_path / 'x.txt'
+    target.write_text('∞\n', encoding='utf-8')
+    (tmp_path / 'link.txt').symlink_to(target)
+    os.link(target, tmp_path / 'hard.txt')
+
+    assert len(list(iter_files(str(tmp_path)))) == 1
+    assert process_directory(str(tmp_path), workers=2) == 1
+    assert target.read_text(encoding='utf-8') == 'i\n'
+    assert (tmp_path / 'link.txt').is_symlink()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests for the query normalization of text_normalization.py
+---------------------------------------------------------
+Run with: python -m pytest test_text_normalization.py
+"""
+
+import json
+from collections import Counter
+
+from fuzzy_index import SymSpellIndex, build_fuzzy_index
+from text_normalization import (collect_stop_words, collect_tagged_words, mapping_from_words, normalize_query,
+                                plain_words)
+
+# Tagged words of a small corpus: ahetou and aheai are only written without diacritics
+TAGGED_WORDS = Counter({'hëtou': 5, 'shëai': 3, 'ahetou': 2, 'aheai': 1, 'wayoapi': 4, 'wãyoapi': 1})
+
+def _build():
+    mapping = mapping_from_words(TAGGED_WORDS)
+    return mapping, build_fuzzy_index(mapping, plain_words=plain_words(TAGGED_WORDS))
+
+def test_known_plain_words_pass_through_unchanged():
+    mapping, fuzzy_index = _build()
+    assert normalize_query("ahetou aheai", mapping, fuzzy_index) == "ahetou aheai"
+    assert normalize_query("Ahetou", mapping, fuzzy_index) == "Ahetou"
+
+def test_misspelled_words_are_still_corrected():
+    mapping, fuzzy_index = _build()
+    assert normalize_query("hetouu", mapping, fuzzy_index) == "hëtou"
+    assert normalize_query("wayoapi", mapping, fuzzy_index) == "wãyoapi"
+
+def test_plain_words_are_indexed():
+    _, fuzzy_index = _build()
+    assert fuzzy_index.lookup('ahetou') == [('ahetou', 0, 2)]
+
+# Tagged records whose Yanomami words are one edit away from common English words
+DATASET_RECORDS = [
+    ("thëri", "inhabitant of a place", "the people who live there"),
+    ("hërë", "to paddle", "where their river is near"),
+    ("shokë", "smoke", "we bathe in the smoke of the fire"),
+    ("wathë", "to bathe", "there is a period of heavy rain"),
+]
+
+def _write_dataset(dataset_dir):
+    with open(dataset_dir / 'dataset.jsonl', 'w', encoding='utf-8') as f:
+        for word, definition, translation in DATASET_RECORDS:
+            record = {"messages": [
+                {"role": "user", "content": f"<QUERY>What does <WORD>{word}</WORD> mean in Yanomami?</QUERY>"},
+                {"role": "assistant", "content": f"<WORD>{word}</WORD> <DEFINITION>{definition}</DEFINITION> "
+                                                 f"<EXAMPLES><EXAMPLE_YANOMAMI>{word} ya</EXAMPLE_YANOMAMI> "
+                                                 f"<EXAMPLE_TRANSLATION>{translation}</EXAMPLE_TRANSLATION></EXAMPLES>"}]}
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+def test_english_prompts_pass_through_unchanged(tmp_path):
+    _write_dataset(tmp_path)
+    yanomami_words = collect_tagged_words(tmp_path)
+    mapping = mapping_from_words(yanomami_words)
+    fuzzy_index = build_fuzzy_index(mapping, plain_words=plain_words(yanomami_words),
+                                    stop_words=collect_stop_words(tmp_path))
+    # Saved and loaded, as the normalization server uses it
+    fuzzy_index.save(tmp_path / 'fuzzy.json')
+    fuzzy_index = SymSpellIndex.load(tmp_path / 'fuzzy.json')
+
+    for prompt in ["Where is there a river? Their village is near.",
+                   "Write about the smoke", "How do I bathe during this period?"]:
+        assert normalize_query(prompt, mapping, fuzzy_index) == prompt
+    # Misspelled Yanomami words are still corrected, words typed with diacritics kept
+    assert normalize_query("therri", mapping, fuzzy_index) == "thëri"
+    assert normalize_query("shökë", mapping, fuzzy_index) == "shökë"
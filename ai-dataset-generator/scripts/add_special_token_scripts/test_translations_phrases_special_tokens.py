@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Tests for translations_phrases_special_tokens.py
+------------------------------------------------
+Run with: python -m pytest test_translations_phrases_special_tokens.py
+"""
+
+import json
+import sys
+
+import translations_phrases_special_tokens as special_tokens
+
+def _record(prompt, answer):
+    return {'messages': [{'role': 'user', 'content': prompt},
+                         {'role': 'assistant', 'content': answer}]}
+
+def _run_main(monkeypatch, input_dir, output_dir):
+    monkeypatch.setattr(sys, 'argv', ['translations_phrases_special_tokens.py',
+                                      '--input_dir', str(input_dir), '--output_dir', str(output_dir)])
+    special_tokens.main()
+
+def test_grammar_file_records_are_tagged_without_keywords(tmp_path, monkeypatch):
+    # None of the grammar keywords (plural, conjugated, conjugation, grammar) in the prompt
+    record = _record("What is the root of 'thëri'?", "The root of 'thëri' is 'thë'.")
+    input_dir = tmp_path / 'input'
+    input_dir.mkdir()
+    for file_name in ('grammar.jsonl', 'mixed.jsonl'):
+        (input_dir / file_name).write_text(json.dumps(record, ensure_ascii=False) + '\n', encoding='utf-8')
+
+    assert special_tokens.route_record(_record(record['messages'][0]['content'], '')) is None
+    _run_main(monkeypatch, input_dir, tmp_path / 'output')
+
+    grammar = json.loads((tmp_path / 'output' / 'grammar.jsonl').read_text(encoding='utf-8'))
+    assert grammar['messages'][0]['content'] == "<QUERY>What is the root of 'thëri'?</QUERY>"
+    assert grammar['messages'][1]['content'] == "<GRAMMATICAL>The root of 'thëri' is 'thë'.</GRAMMATICAL>"
+    # Files of unknown type are still routed by prompt, which leaves this record as it is
+    assert json.loads((tmp_path / 'output' / 'mixed.jsonl').read_text(encoding='utf-8')) == record
+
+# Records of 10_comparison_queries.jsonl with the answer they were tagged with
+# before parse_comparison_answer, which kept only the first example under each
+# "With 'word':" and mistook "Translation:" lines for examples once a blank line
+# separated them
+COMPARISON_AHETOU = """Differences between 'ahetou' and 'aheai' in Yanomami:
+
+1. Meaning:
+   - 'ahetou' means '1. to approach (continuation of aheai), 2. to not be afraid of approaching (a relative, a hostile person)'
+   - 'aheai' means 'to approach (beginning of a process)'
+
+2. Grammatical category:
+   - 'ahetou' is a Verb (Intransitive)
+   - 'aheai' is a Verb (Intransitive)
+
+3. Usage:
+   - 'ahetou' is used when referring to 1. to approach (continuation of aheai)
+   - 'aheai' is used when expressing to approach (beginning of a process)
+
+4. Examples:
+
+With 'ahetou':
+- pei yoka ha a ahetou tëhë a husi koikoimoma
+  Translation: he whistled when he was near the entrance (of the south of the Orinoco)
+
+- pë yesi kë iha a ahetou
+  Translation: he is not afraid to approach his mother-in-law
+
+With 'aheai':
+- thë aheai
+  Translation: that is approaching
+
+- ya aheai
+  Translation: I am approaching"""
+
+COMPARISON_AHETOU_BEFORE = """<WORD>ahetou</WORD> <POS>Verb (Intransitive)</POS> <DEFINITION>1. to approach (continuation of aheai), 2. to not be afraid of approaching (a relative, a hostile person)</DEFINITION> <USAGE>when referring to 1. to approach (continuation of aheai)</USAGE>
+<WORD>aheai</WORD> <POS>Verb (Intransitive)</POS> <DEFINITION>to approach (beginning of a process)</DEFINITION> <USAGE>when expressing to approach (beginning of a process)</USAGE>
+<EXAMPLES><EXAMPLE_YANOMAMI>pei yoka ha a ahetou tëhë a husi koikoimoma</EXAMPLE_YANOMAMI> <EXAMPLE_TRANSLATION>he whistled when he was near the entrance (of the south of the Orinoco)</EXAMPLE_TRANSLATION>
+<EXAMPLE_YANOMAMI>thë aheai</EXAMPLE_YANOMAMI> <EXAMPLE_TRANSLATION>that is approaching</EXAMPLE_TRANSLATION></EXAMPLES>"""
+
+COMPARISON_PARO = """Differences between 'paro' and 'paro' in Yanomami:
+
+1. Meaning:
+   - 'paro' means 'lanzar por encima de'
+   - 'paro' means 'lanzar por encima de'
+
+2. Grammatical category:
+   - 'paro' is a Verb (Transitive)
+   - 'paro' is a Verb (Transitive)
+
+3. Usage:
+   - 'paro' is used when expressing lanzar por encima de
+   - 'paro' is used when expressing lanzar por encima de
+
+4. Examples:
+
+With 'paro':
+- he paromai : lanzar por encima de [he paromakei, perf.]
+  Translation: to throw over [he paromakei, perfective]
+
+With 'paro':
+- he paromai : lanzar por encima de [he paromakei, perf.]
+  Translation: to throw over [he paromakei, perfective]"""
+
+COMPARISON_PARO_BEFORE = """<WORD>paro</WORD> <POS>Verb (Transitive)</POS> <DEFINITION>lanzar por encima de</DEFINITION> <USAGE>when expressing lanzar por encima de</USAGE>
+<WORD>paro</WORD> <POS>Verb (Transitive)</POS> <DEFINITION>lanzar por encima de</DEFINITION> <USAGE>when expressing lanzar por encima de</USAGE>
+<EXAMPLES><EXAMPLE_YANOMAMI>he paromai : lanzar por encima de [he paromakei, perf.]</EXAMPLE_YANOMAMI> <EXAMPLE_TRANSLATION>to throw over [he paromakei, perfective]</EXAMPLE_TRANSLATION>
+<EXAMPLE_YANOMAMI>he paromai : lanzar por encima de [he paromakei, perf.]</EXAMPLE_YANOMAMI> <EXAMPLE_TRANSLATION>to throw over [he paromakei, perfective]</EXAMPLE_TRANSLATION>
+<EXAMPLE_YANOMAMI>he paromai : lanzar por encima de [he paromakei, perf.]</EXAMPLE_YANOMAMI> <EXAMPLE_TRANSLATION>to throw over [he paromakei, perfective]</EXAMPLE_TRANSLATION></EXAMPLES>"""
+
+def _tag_comparison_answer(word1, word2, answer):
+    record = _record(f"What is the difference between '{word1}' and '{word2}' in Yanomami?", answer)
+    assert special_tokens._tag_comparison(record) == 1
+    return record['messages'][1]['content']
+
+def test_comparison_keeps_every_example_of_each_word():
+    tagged = _tag_comparison_answer('ahetou', 'aheai', COMPARISON_AHETOU)
+
+    before_examples = COMPARISON_AHETOU_BEFORE.split('<EXAMPLES>')
+    assert tagged.split('<EXAMPLES>')[0] == before_examples[0]
+    assert tagged.endswith(
+        "<EXAMPLES><EXAMPLE_YANOMAMI>pei yoka ha a ahetou tëhë a husi koikoimoma</EXAMPLE_YANOMAMI> "
+        "<EXAMPLE_TRANSLATION>he whistled when he was near the entrance (of the south of the Orinoco)</EXAMPLE_TRANSLATION>\n"
+        "<EXAMPLE_YANOMAMI>pë yesi kë iha a ahetou</EXAMPLE_YANOMAMI> "
+        "<EXAMPLE_TRANSLATION>he is not afraid to approach his mother-in-law</EXAMPLE_TRANSLATION>\n"
+        "<EXAMPLE_YANOMAMI>thë aheai</EXAMPLE_YANOMAMI> <EXAMPLE_TRANSLATION>that is approaching</EXAMPLE_TRANSLATION>\n"
+        "<EXAMPLE_YANOMAMI>ya aheai</EXAMPLE_YANOMAMI> <EXAMPLE_TRANSLATION>I am approaching</EXAMPLE_TRANSLATION></EXAMPLES>")
+    assert tagged.count('<EXAMPLE_YANOMAMI>') == 4
+    assert COMPARISON_AHETOU_BEFORE.count('<EXAMPLE_YANOMAMI>') == 2
+
+def test_comparison_of_a_word_with_itself():
+    tagged = _tag_comparison_answer('paro', 'paro', COMPARISON_PARO)
+
+    # Both words keep their fields; the example repeated under each heading is
+    # no longer followed by a third copy
+    assert tagged.split('<EXAMPLES>')[0] == COMPARISON_PARO_BEFORE.split('<EXAMPLES>')[0]
+    assert tagged.count('<EXAMPLE_YANOMAMI>he paromai') == 2
+    assert COMPARISON_PARO_BEFORE.count('<EXAMPLE_YANOMAMI>he paromai') == 3
+
+def test_comparison_word_that_prefixes_the_other():
+    answer = """Differences between 'ãiãmo' and 'ãiãmo hena(ki)' in Yanomami:
+
+1. Meaning:
+   - 'ãiãmo' means 'warrior, violent, aggressive, bloodthirsty and merciless people'
+   - 'ãiãmo hena(ki)' means 'Justicia sp. (Acanthaceae), a cultivated plant'
+
+2. Grammatical category:
+   - 'ãiãmo' is a Noun
+   - 'ãiãmo hena(ki)' is a Noun
+
+3. Usage:
+   - 'ãiãmo' is used when referring to warrior
+   - 'ãiãmo hena(ki)' is used when referring to Justicia sp. (Acanthaceae)"""
+    tagged = _tag_comparison_answer('ãiãmo', 'ãiãmo hena(ki)', answer)
+
+    # Before, every clause about 'ãiãmo hena(ki)' was read as one about 'ãiãmo'
+    # and the second word was left as "<WORD>ãiãmo hena(ki)</WORD> "
+    assert tagged == (
+        "<WORD>ãiãmo</WORD> <POS>Noun</POS> "
+        "<DEFINITION>warrior, violent, aggressive, bloodthirsty and merciless people</DEFINITION> "
+        "<USAGE>when referring to warrior</USAGE>\n"
+        "<WORD>ãiãmo hena(ki)</WORD> <POS>Noun</POS> "
+        "<DEFINITION>Justicia sp. (Acanthaceae), a cultivated plant</DEFINITION> "
+        "<USAGE>when referring to Justicia sp. (Acanthaceae)</USAGE>")
@@ -6,12 +6,21 @@ This script provides functions to normalize Yanomami text by handling diacritica
 and creating mappings between words with and without diacritical marks.
 """
 
-import unicodedata
 import re
 import json
 import os
+import hashlib
 from pathlib import Path
 import logging
+from functools import lru_cache
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+
+from diacritic_index import DiacriticIndex, INDEX_SUFFIX, RankedVariants, variants_from_json, write_index
+from special_tokens import iter_leaf_spans
+from fuzzy_index import DEFAULT_MAX_DISTANCE, DEFAULT_PREFIX_LENGTH, build_fuzzy_index
+from orthography import compile_profiles
 
 # Configure logging
 logging.basicConfig(
@@ -21,92 +30,326 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Number of distinct words remembered by remove_diacritics
+DIACRITIC_CACHE_SIZE = 65536
+
+_DIACRITICS = compile_profiles(['strip_diacritics'])
+
+@lru_cache(maxsize=DIACRITIC_CACHE_SIZE)
+def _remove_diacritics_cached(text):
+    return _DIACRITICS.apply(text)
+
 def remove_diacritics(text):
     """
     Remove diacritical marks from text while preserving base characters.
     
+    Uses the 'strip_diacritics' orthography profile, whose precomputed translate
+    table covers every composed Latin vowel used in Yanomami orthography (plus
+    ɨ/Ɨ); anything else falls back to NFD/NFC normalization. ASCII text is
+    returned as is and recent words are memoized.
+    
     Args:
         text (str): Text with potential diacritical marks
         
     Returns:
         str: Text with diacritical marks removed
     """
-    # Normalize the Unicode string to decompose characters with diacritics
-    normalized = unicodedata.normalize('NFD', text)
+    if text.isascii():
+        return text
+    return _remove_diacritics_cached(text)
+
+# Tags whose contents are collected into the diacritic mapping
+MAPPING_TAGS = ('WORD', 'YANOMAMI')
+
+# Tags holding the English (or Spanish) side of a record; their words are never
+# fuzzy-corrected into Yanomami
+STOP_WORD_TAGS = ('DEFINITION', 'TRANSLATION', 'EXAMPLE_TRANSLATION', 'LITERAL', 'USAGE', 'POS')
+
+# Files larger than this are split into newline-aligned byte ranges when
+# build_diacritic_mapping runs with more than one worker
+SHARD_SIZE = 8 * 1024 * 1024
+
+# Format version of the incremental build manifest
+MANIFEST_VERSION = 1
+
+def scan_dataset_file(file_path, start=0, end=None, tags=MAPPING_TAGS):
+    """
+    Collect the Yanomami words tagged in one JSONL file, or in the lines of it
+    that start inside the byte range [start, end).
     
-    # Remove all diacritical marks (category 'Mn' = Mark, Nonspacing)
-    result = ''.join(c for c in normalized if not unicodedata.category(c).startswith('Mn'))
+    Args:
+        file_path (str): Path to the JSONL file
+        start (int): Byte offset of the shard
+        end (int, optional): End byte offset of the shard, defaults to the end of the file
+        tags (tuple): MAPPING_TAGS, or STOP_WORD_TAGS to collect the lowercased
+            words of the English side instead
+        
+    Returns:
+        Counter: Occurrences of each word
+    """
+    yanomami_words = Counter()
     
-    # Return the result normalized back to composed form
-    return unicodedata.normalize('NFC', result)
+    with open(file_path, 'rb') as f:
+        if start > 0:
+            # Skip the line that started in the previous shard
+            f.seek(start - 1)
+            f.readline()
+        
+        while end is None or f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            try:
+                data = json.loads(line.decode('utf-8'))
+                if 'messages' in data:
+                    for message in data['messages']:
+                        if 'content' in message:
+                            # Extract words between <WORD> tags and, split by spaces,
+                            # the words between <YANOMAMI> tags in one scan
+                            for tag, _, _, text in iter_leaf_spans(message['content'], tags):
+                                if tag == 'WORD':
+                                    yanomami_words[text] += 1
+                                elif tag == 'YANOMAMI':
+                                    yanomami_words.update(text.split())
+                                else:
+                                    yanomami_words.update(WORD_PATTERN.findall(text.lower()))
+            except Exception as e:
+                logger.warning(f"Error processing line in {file_path}: {e}")
+    
+    return yanomami_words
+
+def _scan_tasks(jsonl_files, shard_size):
+    """Split the dataset files into (file, start, end) scan tasks."""
+    tasks = []
+    for file_path in jsonl_files:
+        size = os.path.getsize(file_path)
+        if size <= shard_size:
+            tasks.append((str(file_path), 0, None))
+            continue
+        for start in range(0, size, shard_size):
+            tasks.append((str(file_path), start, min(start + shard_size, size)))
+    return tasks
+
+def _scan_task(task):
+    return scan_dataset_file(*task)
 
-def build_diacritic_mapping(dataset_dir):
+def _scan_files(jsonl_files, workers, tags=MAPPING_TAGS):
     """
-    Build a mapping between words with diacritical marks and their non-diacritical versions.
+    Scan dataset files, in a process pool if workers > 1.
+    
+    Returns:
+        dict: Counter of tagged words per file path
+    """
+    contributions = {str(file_path): Counter() for file_path in jsonl_files}
+    if workers > 1:
+        tasks = [task + (tags,) for task in _scan_tasks(jsonl_files, SHARD_SIZE)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for task, partial in zip(tasks, executor.map(_scan_task, tasks)):
+                contributions[task[0]].update(partial)
+    else:
+        for file_path in jsonl_files:
+            contributions[str(file_path)].update(scan_dataset_file(file_path, tags=tags))
+    return contributions
+
+def _file_sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_manifest(manifest_file):
+    """
+    Load a mapping build manifest, returning an empty one if it does not exist.
+    
+    The manifest records the size, mtime and SHA-256 of every scanned dataset file
+    together with the words it contributed, keyed by path relative to the dataset
+    directory.
+    """
+    if not os.path.exists(manifest_file):
+        return {'version': MANIFEST_VERSION, 'files': {}}
+    with open(manifest_file, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != MANIFEST_VERSION:
+        logger.info(f"Ignoring manifest {manifest_file} with an unsupported version")
+        return {'version': MANIFEST_VERSION, 'files': {}}
+    return manifest
+
+def save_manifest(manifest, manifest_file):
+    """Save a mapping build manifest atomically."""
+    tmp_file = f"{manifest_file}.tmp{os.getpid()}"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp_file, manifest_file)
+
+def _collect_words_incremental(dataset_dir, jsonl_files, workers, manifest_file):
+    """
+    Collect the tagged words of a dataset, rescanning only files whose size, mtime
+    and content hash no longer match the manifest.
+    """
+    manifest = load_manifest(manifest_file)
+    previous = manifest['files']
+    current = {}
+    changed = []
+    
+    for file_path in jsonl_files:
+        key = file_path.relative_to(dataset_dir).as_posix()
+        stat = file_path.stat()
+        entry = previous.get(key)
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            current[key] = entry
+            continue
+        
+        sha256 = _file_sha256(file_path)
+        if entry and entry['sha256'] == sha256:
+            # Touched but not modified
+            current[key] = dict(entry, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            continue
+        
+        current[key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256}
+        changed.append(file_path)
+    
+    removed = len(set(previous) - set(current))
+    logger.info(f"Manifest: {len(changed)} new or changed, {len(jsonl_files) - len(changed)} unchanged, {removed} removed files")
+    
+    for file_path, words in _scan_files(changed, workers).items():
+        current[Path(file_path).relative_to(dataset_dir).as_posix()]['words'] = dict(words)
+    
+    manifest['files'] = current
+    save_manifest(manifest, manifest_file)
+    
+    yanomami_words = Counter()
+    for key in sorted(current):
+        yanomami_words.update(current[key]['words'])
+    return yanomami_words
+
+def collect_tagged_words(dataset_dir, workers=1, manifest_file=None):
+    """
+    Count the tagged Yanomami words of a dataset directory.
+    
+    With more than one worker, files (and byte-range shards of files larger than
+    SHARD_SIZE) are scanned in a process pool. The partial results are merged in
+    task order, so the counts are identical to a serial run.
+    
+    With a manifest file, only new or changed files are rescanned and the
+    contributions of deleted files are dropped (see load_manifest).
     
     Args:
         dataset_dir (str): Directory containing the dataset files
+        workers (int): Number of worker processes
+        manifest_file (str, optional): Path of the manifest used for incremental rebuilds
         
     Returns:
-        dict: Mapping from non-diacritical to diacritical words
+        Counter: Occurrences of each tagged word
     """
-    mapping = {}
-    yanomami_words = set()
-    
     # Find all jsonl files in the dataset directory
-    jsonl_files = list(Path(dataset_dir).glob('**/*.jsonl'))
+    jsonl_files = sorted(Path(dataset_dir).glob('**/*.jsonl'))
     
-    for file_path in jsonl_files:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                try:
-                    data = json.loads(line)
-                    if 'messages' in data:
-                        for message in data['messages']:
-                            if 'content' in message:
-                                content = message['content']
-                                
-                                # Extract words between <WORD> tags
-                                word_matches = re.findall(r'<WORD>([^<]+)</WORD>', content)
-                                yanomami_words.update(word_matches)
-                                
-                                # Also extract words between <YANOMAMI> tags
-                                yanomami_matches = re.findall(r'<YANOMAMI>([^<]+)</YANOMAMI>', content)
-                                for match in yanomami_matches:
-                                    # Split by spaces to get individual words
-                                    words = match.split()
-                                    yanomami_words.update(words)
-                except Exception as e:
-                    logger.warning(f"Error processing line in {file_path}: {e}")
+    if manifest_file:
+        return _collect_words_incremental(Path(dataset_dir), jsonl_files, workers, manifest_file)
     
-    # Build the mapping
-    for word in yanomami_words:
+    yanomami_words = Counter()
+    for words in _scan_files(jsonl_files, workers).values():
+        yanomami_words.update(words)
+    return yanomami_words
+
+def mapping_from_words(yanomami_words):
+    """
+    Group tagged words with diacritical marks by their non-diacritical versions.
+    
+    Args:
+        yanomami_words (Counter): Occurrences of each tagged word
+        
+    Returns:
+        dict: Mapping from non-diacritical words to RankedVariants, most frequent first
+    """
+    mapping = {}
+    
+    # Group the diacritical words by their normalized form
+    variant_counts = {}
+    for word, count in yanomami_words.items():
         normalized = remove_diacritics(word)
         if normalized != word:
             # Only add to mapping if the word actually contains diacritics
-            if normalized not in mapping:
-                mapping[normalized] = []
-            if word not in mapping[normalized]:
-                mapping[normalized].append(word)
+            variant_counts.setdefault(normalized, []).append((word, count))
+    
+    # Rank the variants of each word by corpus frequency
+    for normalized in sorted(variant_counts):
+        mapping[normalized] = RankedVariants.from_counts(variant_counts[normalized])
     
     logger.info(f"Built mapping for {len(mapping)} unique words with diacritical marks")
     return mapping
 
+def collect_stop_words(dataset_dir, workers=1):
+    """
+    Collect the lowercased words of the English side of a dataset directory
+    (the STOP_WORD_TAGS spans), which the fuzzy index must never correct.
+    
+    Args:
+        dataset_dir (str): Directory containing the dataset files
+        workers (int): Number of worker processes
+        
+    Returns:
+        set: The words
+    """
+    jsonl_files = sorted(Path(dataset_dir).glob('**/*.jsonl'))
+    stop_words = set()
+    for words in _scan_files(jsonl_files, workers, STOP_WORD_TAGS).values():
+        stop_words.update(words)
+    logger.info(f"Collected {len(stop_words)} English words that are never fuzzy-corrected")
+    return stop_words
+
+def plain_words(yanomami_words):
+    """
+    Select the tagged words written without diacritical marks.
+    
+    Args:
+        yanomami_words (Counter): Occurrences of each tagged word
+        
+    Returns:
+        dict: Occurrences of each word that has no diacritical marks
+    """
+    return {word: count for word, count in yanomami_words.items() if remove_diacritics(word) == word}
+
+def build_diacritic_mapping(dataset_dir, workers=1, manifest_file=None):
+    """
+    Build a mapping between words with diacritical marks and their non-diacritical versions.
+    
+    See collect_tagged_words for how workers and manifest_file are used.
+    
+    Args:
+        dataset_dir (str): Directory containing the dataset files
+        workers (int): Number of worker processes
+        manifest_file (str, optional): Path of the manifest used for incremental rebuilds
+        
+    Returns:
+        dict: Mapping from non-diacritical words to RankedVariants, most frequent first
+    """
+    return mapping_from_words(collect_tagged_words(dataset_dir, workers, manifest_file))
+
 def save_mapping(mapping, output_file):
     """
-    Save the diacritic mapping to a JSON file.
+    Save the diacritic mapping to a JSON file, or to a binary index if the
+    path ends with INDEX_SUFFIX (see diacritic_index.py).
     
     Args:
         mapping (dict): The mapping to save
         output_file (str): Path to save the mapping to
     """
+    if str(output_file).endswith(INDEX_SUFFIX):
+        write_index(mapping, output_file)
+        return
+    # Each variant is stored as a [word, count] pair
+    serializable = {key: [[word, count] for word, count in zip(variants, getattr(variants, 'counts', [0] * len(variants)))]
+                    for key, variants in mapping.items()}
     with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(mapping, f, ensure_ascii=False, indent=2)
+        json.dump(serializable, f, ensure_ascii=False, indent=2)
     logger.info(f"Saved mapping to {output_file}")
 
 def load_mapping(mapping_file):
     """
-    Load a diacritic mapping from a JSON file.
+    Load a diacritic mapping from a JSON file. Binary index files (INDEX_SUFFIX)
+    are memory-mapped instead of parsed and returned as a DiacriticIndex.
     
     Args:
         mapping_file (str): Path to the mapping file
@@ -114,18 +357,91 @@ def load_mapping(mapping_file):
     Returns:
         dict: The loaded mapping
     """
-    with open(mapping_file, 'r', encoding='utf-8') as f:
-        mapping = json.load(f)
+    if str(mapping_file).endswith(INDEX_SUFFIX):
+        mapping = DiacriticIndex(mapping_file)
+    else:
+        with open(mapping_file, 'r', encoding='utf-8') as f:
+            mapping = {key: variants_from_json(value) for key, value in json.load(f).items()}
     logger.info(f"Loaded mapping with {len(mapping)} entries from {mapping_file}")
     return mapping
 
-def normalize_query(query, mapping=None):
+def top_k(mapping, normalized, k=3):
+    """
+    Return the k most frequent diacritical variants of a normalized word.
+    
+    Args:
+        mapping (dict): Mapping built by build_diacritic_mapping or loaded by load_mapping
+        normalized (str): Word without diacritical marks
+        k (int): Maximum number of variants to return
+        
+    Returns:
+        list: (variant, count) pairs, most frequent first
+    """
+    variants = mapping.get(normalized)
+    if not variants:
+        return []
+    return variants.top_k(k)
+
+# Token pattern used by normalize_query
+WORD_PATTERN = re.compile(r'\w+')
+
+# Splits text into alternating separators and tokens (tokens at odd positions)
+TOKEN_SPLIT_PATTERN = re.compile(r'(\w+)')
+
+# Joins a batch of queries for tokenization; never part of a \w+ token
+BATCH_SEPARATOR = '\x00'
+
+# Queries per process pool task in normalize_queries
+BATCH_CHUNK_SIZE = 10000
+
+# Unknown tokens shorter than this are never looked up in the fuzzy index, and
+# tokens shorter than FUZZY_TWO_EDIT_LENGTH only accept one edit. These limits
+# alone do not protect English words (there -> thëri is one edit); those are
+# kept by the stop words of the fuzzy index (see collect_stop_words)
+FUZZY_MIN_LENGTH = 5
+FUZZY_TWO_EDIT_LENGTH = 8
+
+def _match_case(word, diacritical_word):
+    """Apply the casing of the typed word to its diacritical replacement."""
+    if word.islower():
+        return diacritical_word
+    if word.isupper():
+        return diacritical_word.upper()
+    if word[0].isupper():
+        return diacritical_word.capitalize()
+    return diacritical_word
+
+def _replacement(word, mapping, fuzzy_index=None):
+    """Return the diacritical replacement for one token, or the token itself."""
+    word_lower = word.lower()
+    variants = mapping.get(word_lower)
+    if (not variants and fuzzy_index is not None and len(word) >= FUZZY_MIN_LENGTH
+            and word_lower not in fuzzy_index.words and word_lower not in fuzzy_index.stop_words
+            and remove_diacritics(word_lower) == word_lower):
+        # Fall back to the closest known word for misspellings. Known words
+        # without diacritics, English words of the corpus and words typed with
+        # diacritics are kept as typed
+        max_distance = 1 if len(word) < FUZZY_TWO_EDIT_LENGTH else None
+        suggestions = fuzzy_index.lookup(word_lower, max_distance)
+        if suggestions:
+            variants = mapping.get(suggestions[0][0])
+    if not variants:
+        return word
+    # Replace with the first diacritical version (most frequent), preserving case if possible
+    return _match_case(word, variants[0])
+
+def normalize_query(query, mapping=None, fuzzy_index=None):
     """
     Normalize a user query by attempting to replace non-diacritical words with their diacritical versions.
     
+    The query is scanned once from left to right; each token is looked up in the
+    mapping (the index keyed by diacritic-free form) and the output is written once.
+    
     Args:
         query (str): The user query
         mapping (dict, optional): A mapping from non-diacritical to diacritical words
+        fuzzy_index (SymSpellIndex, optional): Index used to resolve misspelled words
+            that are not in the mapping
         
     Returns:
         str: The normalized query
@@ -133,42 +449,119 @@ def normalize_query(query, mapping=None):
     if not mapping:
         return query
     
-    # Split the query into words
-    words = re.findall(r'\b\w+\b', query)
-    
-    # Replace each word if it exists in the mapping
-    for word in words:
-        word_lower = word.lower()
-        if word_lower in mapping:
-            # Replace with the first diacritical version (most common)
-            diacritical_word = mapping[word_lower][0]
-            # Preserve case if possible
-            if word.islower():
-                replacement = diacritical_word
-            elif word.isupper():
-                replacement = diacritical_word.upper()
-            elif word[0].isupper():
-                replacement = diacritical_word.capitalize()
-            else:
-                replacement = diacritical_word
-                
-            # Replace the word in the query
-            query = re.sub(r'\b' + re.escape(word) + r'\b', replacement, query)
-    
-    return query
+    return WORD_PATTERN.sub(lambda match: _replacement(match.group(0), mapping, fuzzy_index), query)
 
-def main():
-    # Path to the dataset directory
-    dataset_dir = "/Users/renanserrano/CascadeProjects/Yanomami/finetunning/yanomami_dataset"
+def _normalize_batch(queries, mapping, fuzzy_index=None, cache=None):
+    """
+    Normalize a list of queries with one tokenization pass and a shared lookup cache.
     
-    # Path to save the mapping
-    output_file = "/Users/renanserrano/CascadeProjects/Yanomami/finetunning/diacritic_mapping.json"
+    A cache dict passed in by the caller is filled with token -> replacement and
+    reused across calls; it must be discarded whenever the mapping changes.
+    """
+    if not queries:
+        return []
+    
+    joined = BATCH_SEPARATOR.join(queries)
+    if joined.count(BATCH_SEPARATOR) != len(queries) - 1:
+        # The separator occurs inside a query, so the batch cannot be split back
+        return [normalize_query(query, mapping, fuzzy_index) for query in queries]
+    
+    if cache is None:
+        cache = {}
+    
+    parts = TOKEN_SPLIT_PATTERN.split(joined)
+    tokens = parts[1::2]
+    # Resolve each distinct token once, then substitute them all in one step
+    for token in set(tokens).difference(cache):
+        cache[token] = _replacement(token, mapping, fuzzy_index)
+    parts[1::2] = map(cache.__getitem__, tokens)
+    
+    return ''.join(parts).split(BATCH_SEPARATOR)
+
+# Mapping and fuzzy index used by normalize_queries worker processes
+_worker_mapping = None
+_worker_fuzzy_index = None
+
+def _init_batch_worker(mapping, fuzzy_index):
+    global _worker_mapping, _worker_fuzzy_index
+    # Index files are reopened (and their pages shared) instead of pickled
+    _worker_mapping = DiacriticIndex(mapping) if isinstance(mapping, str) else mapping
+    _worker_fuzzy_index = fuzzy_index
+
+def _normalize_chunk(queries):
+    return _normalize_batch(queries, _worker_mapping, _worker_fuzzy_index)
+
+def normalize_queries(queries, mapping=None, workers=1, chunk_size=BATCH_CHUNK_SIZE, fuzzy_index=None,
+                      cache=None):
+    """
+    Normalize a batch of user queries, returning the results in order.
+    
+    Equivalent to calling normalize_query on each query, but the whole batch is
+    tokenized at once and each distinct token is looked up only once. Batches
+    larger than chunk_size can be split across a process pool.
+    
+    Args:
+        queries (iterable): The user queries
+        mapping (dict, optional): A mapping from non-diacritical to diacritical words
+        workers (int): Number of worker processes for large batches
+        chunk_size (int): Number of queries per worker task
+        fuzzy_index (SymSpellIndex, optional): Index used to resolve misspelled words
+        cache (dict, optional): Token -> replacement cache kept by the caller across
+            batches (in-process path only); discard it when the mapping changes
+        
+    Returns:
+        list: The normalized queries
+    """
+    queries = list(queries)
+    if not mapping:
+        return queries
+    
+    if workers > 1 and len(queries) > chunk_size:
+        chunks = [queries[start:start + chunk_size] for start in range(0, len(queries), chunk_size)]
+        worker_mapping = mapping.index_file if isinstance(mapping, DiacriticIndex) else mapping
+        results = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker,
+                                 initargs=(worker_mapping, fuzzy_index)) as executor:
+            for normalized in executor.map(_normalize_chunk, chunks):
+                results.extend(normalized)
+        return results
+    
+    return _normalize_batch(queries, mapping, fuzzy_index, cache)
+
+def main():
+    """Build the diacritic mapping for a dataset directory and save it."""
+    parser = argparse.ArgumentParser(description='Build the diacritic mapping for a Yanomami dataset.')
+    parser.add_argument('--dataset_dir', type=str,
+                        default="/Users/renanserrano/CascadeProjects/Yanomami/finetunning/yanomami_dataset",
+                        help='Directory containing the dataset files')
+    parser.add_argument('--output_file', type=str,
+                        default="/Users/renanserrano/CascadeProjects/Yanomami/finetunning/diacritic_mapping.json",
+                        help='Path to save the mapping to (.json, or .idx for a binary index)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of processes used to scan the dataset files')
+    parser.add_argument('--manifest', type=str, default=None,
+                        help='Manifest file for incremental rebuilds (only changed files are rescanned)')
+    parser.add_argument('--fuzzy_index', type=str, default=None,
+                        help='Also build a fuzzy lookup index for misspelled words and save it to this path')
+    parser.add_argument('--max_edit_distance', type=int, default=DEFAULT_MAX_DISTANCE,
+                        help='Maximum edit distance supported by the fuzzy index')
+    parser.add_argument('--prefix_length', type=int, default=DEFAULT_PREFIX_LENGTH,
+                        help='Characters per word used by the fuzzy index (lower uses less memory, finds fewer matches)')
+    args = parser.parse_args()
     
     # Build the mapping
-    mapping = build_diacritic_mapping(dataset_dir)
+    yanomami_words = collect_tagged_words(args.dataset_dir, workers=args.workers, manifest_file=args.manifest)
+    mapping = mapping_from_words(yanomami_words)
     
     # Save the mapping
-    save_mapping(mapping, output_file)
+    save_mapping(mapping, args.output_file)
+    
+    fuzzy_index = None
+    if args.fuzzy_index:
+        fuzzy_index = build_fuzzy_index(mapping, args.max_edit_distance, args.prefix_length,
+                                        plain_words=plain_words(yanomami_words),
+                                        stop_words=collect_stop_words(args.dataset_dir, workers=args.workers))
+        fuzzy_index.save(args.fuzzy_index)
     
     # Test the mapping with a few examples
     test_queries = [
@@ -177,7 +570,7 @@ def main():
     ]
     
     for query in test_queries:
-        normalized = normalize_query(query, mapping)
+        normalized = normalize_query(query, mapping, fuzzy_index)
         logger.info(f"Original: {query}")
         logger.info(f"Normalized: {normalized}")
         logger.info("---")
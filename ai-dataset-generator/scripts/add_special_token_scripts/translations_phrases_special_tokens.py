@@ -5,16 +5,20 @@ Add Special Tokens to Yanomami Dataset
 This script processes the Yanomami dataset files and adds special tokens to structure the data.
 These special tokens help the model better understand the different parts of the data
 (words, definitions, examples, translations, etc.)
+Each record is routed to its processor by the keywords of its user prompt, so a file
+may mix record types (e.g. a concatenation of the dataset files).
 """
 
 import os
 import json
 import re
-from tqdm import tqdm
+from functools import lru_cache, partial
 import argparse
-from pathlib import Path
 import logging
 
+from jsonl_parallel import map_jsonl_files, map_jsonl_records
+from keyword_automaton import KeywordAutomaton
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -23,906 +27,871 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Special tokens to add
-SPECIAL_TOKENS = [
-    '<WORD>', '</WORD>', 
-    '<POS>', '</POS>', 
-    '<DEFINITION>', '</DEFINITION>', 
-    '<EXAMPLES>', '</EXAMPLES>', 
-    '<EXAMPLE_YANOMAMI>', '</EXAMPLE_YANOMAMI>',
-    '<EXAMPLE_TRANSLATION>', '</EXAMPLE_TRANSLATION>',
-    '<QUERY>', '</QUERY>',
-    '<YANOMAMI>', '</YANOMAMI>', 
-    '<TRANSLATION>', '</TRANSLATION>', 
-    '<LITERAL>', '</LITERAL>',
-    '<RELATED_FORMS>', '</RELATED_FORMS>',
-    '<USAGE>', '</USAGE>',
-    '<GRAMMATICAL>', '</GRAMMATICAL>'
-]
+# Patterns used by the process_* functions, compiled once at import time
+PATTERNS = {
+    # translations.jsonl
+    'single_quoted': re.compile(r"'([^']*)'"),
+    'translation_meaning': re.compile(r"means '([^']*)'|in Yanomami means '([^']*)'|means \"([^\"]*)\""),
+    'translation_pos': re.compile(r"It is an? ([A-Za-z]+( [A-Za-z]+)?)\."),
+    'translation_examples': re.compile(r"Here are some examples:(.*?)(?:Related forms:|$)", re.DOTALL),
+    'related_forms': re.compile(r"Related forms: (.*?)$"),
+    # phrases-yanomami-to-english.jsonl
+    'double_quoted': re.compile(r"\"([^\"]*)\""),
+    'phrase_translation': re.compile(r"is '([^']*)'|is \"([^\"]*)\""),
+    'phrase_literal': re.compile(r"Literal: '([^']*)'|Literal: \"([^\"]*)\""),
+    # phrases-english-to-yanomami.jsonl
+    'english_phrase': re.compile(r"\"([^\"]*)\"|\'([^\']*)\'|how do you say ([^\s]+) in"),
+    'yanomami_phrase': [
+        re.compile(r"In Yanomami, \"([^\"]*)\""),
+        re.compile(r"In Yanomami, '([^']*)'"),
+        re.compile(r"in Yanomami is '([^']*)'"),
+        re.compile(r"in Yanomami is \"([^\"]*)\""),
+        re.compile(r"The .* in Yanomami is '([^']*)'"),
+    ],
+    'quoted': re.compile(r"'([^']*)'|\"([^\"]*)\""),
+    'phrase_examples': re.compile(r"Examples?:(.*?)(?:$|\n\n)", re.DOTALL | re.IGNORECASE),
+    # comparison.jsonl
+    'difference_between': re.compile(r"difference between\s+['\"]*([^'\"]+)['\"]*\s+and\s+['\"]*([^'\"]+)['\"]*", re.IGNORECASE),
+    # how-to.jsonl
+    'the_word': re.compile(r"the word ([^\s'\"]+)", re.IGNORECASE),
+    'when_should_i_use': re.compile(r"when should i use ['\"]*([^'\"]+)['\"]*\s+instead of\s+['\"]*([^'\"]+)['\"]*", re.IGNORECASE),
+    'how_concept': re.compile(r"how (do|does|to|can|would) ([^?]*)", re.IGNORECASE),
+    'how_to_examples': re.compile(r"Here are some examples:(.*?)$", re.DOTALL),
+    'you_should_use_when': re.compile(r"You should use ['\"]*([^'\"]+)['\"]*\s+when\s+([^\\n\.]*)", re.IGNORECASE),
+    'you_should_use': re.compile(r"You should use ['\"]*", re.IGNORECASE),
+    'response_word': re.compile(r"the word '([^']*)'|the word \"([^\"]*)\"|(The word '[^']*')"),
+    'response_word_cleanup': re.compile(r"The word '([^']*)'|The word \"([^\"]*)\"|"),
+    'response_word_means': re.compile(r"The word '([^']*)' means|The word \"([^\"]*)\" means"),
+    'how_to_pos': re.compile(r"is an? ([A-Za-z]+( \([A-Za-z]+\))?)"),
+    'how_to_definition': re.compile(r"means '([^']*)'|means \"([^\"]*)\"|\'([^']*)\'\s+and is an?|\"([^\"]*)\"\s+and is an?"),
+    'yanomami_grammar': re.compile(r"In Yanomami grammar,(.*?)(?:Here are some examples:|$)", re.DOTALL),
+    'when_using_this': re.compile(r"When using this (verb|word), remember that ([^.]*)\."),
+    # grammar.jsonl
+    'singular': re.compile(r"Singular:\s*([^\n]+)"),
+    'plural': re.compile(r"Plural:\s*([^\n]+)"),
+    'before_singular': re.compile(r"^(.*?)(?:Singular:|$)", re.DOTALL),
+    'verb': re.compile(r"verb '([^']*)'|verb \"([^\"]*)\"|"),
+    'it_is_a': re.compile(r"it is an? ([^,.]+)"),
+}
+
+class WordPattern:
+    """A precompiled pattern about one word of the record.
+
+    The template is written like the pattern it stands for, with {word} where
+    the word goes. Quoted occurrences ('{word}') become a capture group and the
+    captured text is compared with the word; a template starting with {word}
+    is matched by finding the word as literal text and matching the rest of
+    the template right after it. Either way nothing is compiled per record,
+    and the word is never interpreted as a regular expression.
+    """
+
+    def __init__(self, template, flags=0):
+        self.template = template
+        self.ignore_case = bool(flags & re.IGNORECASE)
+        self.word_first = template.startswith('{word}')
+        if self.word_first:
+            self.regex = re.compile(template[len('{word}'):], flags)
+            self.word_groups = ()
+        else:
+            parts = template.split("'{word}'")
+            if any('{word}' in part for part in parts):
+                raise ValueError(f"{{word}} must be quoted or lead the template: {template}")
+            pattern = parts[0]
+            for position, part in enumerate(parts[1:]):
+                pattern += f"'(?P<word{position}>[^']*)'" + part
+            self.regex = re.compile(pattern, flags)
+            self.word_groups = tuple(self.regex.groupindex.values())
+
+    def _same(self, found, word):
+        return found.lower() == word.lower() if self.ignore_case else found == word
+
+    def _values(self, match):
+        return tuple(group for position, group in enumerate(match.groups(), 1)
+                     if position not in self.word_groups)
+
+    def search(self, text, word):
+        """
+        Find the leftmost match for word.
+
+        Returns:
+            tuple: (start, groups) where groups are the pattern's own capture
+                groups, or None if there is no match
+        """
+        if self.word_first:
+            return _search_after_word(self.regex, text, word, self.ignore_case)
+        position = 0
+        while True:
+            match = self.regex.search(text, position)
+            if match is None:
+                return None
+            found = [match.group(group) for group in self.word_groups if match.group(group) is not None]
+            if all(self._same(value, word) for value in found):
+                return match.start(), self._values(match)
+            position = match.start() + 1
+
+@lru_cache(maxsize=256)
+def _literal_pattern(word, suffix, flags):
+    return re.compile(re.escape(word) + suffix, flags)
+
+def _search_after_word(regex, text, word, ignore_case):
+    """Leftmost occurrence of word (as literal text) followed by a match of regex."""
+    if ignore_case and (len(text.lower()) != len(text) or len(word.lower()) != len(word)):
+        # Lowercasing changes the length of some characters; match the word in the pattern instead
+        match = _literal_pattern(word, regex.pattern, regex.flags).search(text)
+        return (match.start(), match.groups()) if match else None
+    haystack = text.lower() if ignore_case else text
+    needle = word.lower() if ignore_case else word
+    position = haystack.find(needle)
+    while position != -1:
+        match = regex.match(text, position + len(needle))
+        if match:
+            return position, match.groups()
+        position = haystack.find(needle, position + 1)
+    return None
+
+def _search_words(patterns, text, word):
+    """Return the groups of the first of patterns that matches for word, or None."""
+    for pattern in patterns:
+        result = pattern.search(text, word)
+        if result:
+            return result[1]
+    return None
+
+# Meaning of a word in a "When should I use X instead of Y" answer, first match wins
+HOW_TO_MEANING = [WordPattern(template, re.IGNORECASE) for template in [
+    "'{word}' means ['\"]*([^'\"]+)['\"]*",
+    "{word} means ['\"]*([^'\"]+)['\"]*",
+    "'{word}' is used to ([^\\n,\\.]*)",
+    "{word} is used to ([^\\n,\\.]*)",
+    "'{word}' is an? ([^\\n,\\.]*)",
+    "{word} is an? ([^\\n,\\.]*)",
+]]
+HOW_TO_WORD_MEANING = HOW_TO_MEANING[:2]
+HOW_TO_USE_WHEN = re.compile("['\"]*\\s+when\\s+([^\\n\\.]*)", re.IGNORECASE)
+
+def _search_you_should_use(text, word):
+    """Usage context after "You should use <word> when" (case-insensitive), or None."""
+    for match in PATTERNS['you_should_use'].finditer(text):
+        if text[match.end():match.end() + len(word)].lower() == word.lower():
+            context = HOW_TO_USE_WHEN.match(text, match.end() + len(word))
+            if context:
+                return context.group(1)
+    return None
+
+# Comparison answers: "N. <title>:" section headers (the number is optional for
+# the sections listed below) and the field each section holds
+COMPARISON_SECTION = re.compile(r"\s*(?:\d+\.\s*([A-Za-z][A-Za-z ]{0,40}?)|(Meaning|Grammatical category|Usage|Examples))\s*:(.*)",
+                                re.IGNORECASE)
+COMPARISON_SECTION_FIELDS = {
+    'meaning': 'definition',
+    'grammatical category': 'pos',
+    'usage': 'usage',
+    'examples': 'examples',
+}
+# "<word> means ...", "<word> is a ...", "<word> is used ...", anchored at the start of the blank run
+COMPARISON_CLAUSE = re.compile(r"(?<![ \t])[ \t]+(means|is an?|is used)(?!\w)[ \t]*", re.IGNORECASE)
+COMPARISON_CLAUSE_FIELDS = {'means': 'definition', 'is a': 'pos', 'is an': 'pos', 'is used': 'usage'}
+COMPARISON_POS = re.compile(r"[A-Za-z]+(?: \([A-Za-z]+\))?")
+COMPARISON_EXAMPLES_FOR = re.compile(r"With\s+['\"]*(.*?)['\"]*\s*:")
+COMPARISON_QUOTES = "'\""
+
+def _clause_word(line, end, words):
+    """
+    Find which of words ends at line[end], quoted (even twice, as in ''word'')
+    or standing alone.
+
+    Returns:
+        tuple: (index in words, start of the word and its quotes), or None
+    """
+    word_end = end
+    while word_end > 0 and line[word_end - 1] in COMPARISON_QUOTES:
+        word_end -= 1
+    # Longest first, so 'ta sihewë' is not taken for 'sihewë'
+    for index, word in sorted(enumerate(words), key=lambda item: -len(item[1])):
+        start = word_end - len(word)
+        if start < 0 or line[start:word_end].lower() != word.lower():
+            continue
+        if word_end < end:
+            quote_start = start
+            while quote_start > 0 and line[quote_start - 1] in COMPARISON_QUOTES:
+                quote_start -= 1
+            if quote_start < start:
+                return index, quote_start
+        elif start == 0 or not line[start - 1].isalnum():
+            return index, start
+    return None
+
+def _word_index(text, words):
+    """Index in words of the word text is (ignoring case), or None."""
+    return next((index for index, word in enumerate(words) if text.lower() == word.lower()), None)
+
+def _clause_value(line, start, end, field):
+    """The value of a clause whose text is line[start:end]."""
+    rest = line[start:end]
+    if field == 'pos':
+        match = COMPARISON_POS.match(rest)
+        return match.group() if match else ""
+    if field == 'definition' and rest[:1] in ("'", '"'):
+        close = line.find(rest[0], start + 1)
+        return line[start + 1:close if close != -1 else len(line)].strip()
+    value = rest.strip()
+    return value.rstrip('.').strip() if field == 'definition' else value
+
+def _last_quoted(line):
+    """The last 'quoted' or "quoted" text on a line, or ''."""
+    quoted = PATTERNS['quoted'].findall(line)
+    return next((group for group in quoted[-1] if group), "") if quoted else ""
 
-def process_translations_file(input_file, output_file):
+def parse_comparison_answer(text, word1, word2):
+    """
+    Parse a comparison answer in one pass over its lines.
+
+    Numbered sections ("1. Meaning:", "2. Grammatical category:", "3. Usage:",
+    "4. Examples:") start at the beginning of a line. Within any line, clauses
+    such as "'word' means 'definition'", "'word' is a Noun" and "'word' is used
+    when ..." give the definition, part of speech and usage of one of the two
+    words; a clause found in its own section wins over one found elsewhere,
+    otherwise the first one wins. Under "With 'word':" in the examples section,
+    each example line is followed by its translation.
+
+    Args:
+        text (str): The assistant message
+        word1 (str): First compared word
+        word2 (str): Second compared word
+
+    Returns:
+        tuple: (entries, examples) where entries holds a dict per word with the
+            'definition', 'pos', 'usage' and 'examples' found for it, and
+            examples lists the (example, translation) pairs not listed under
+            either word
+    """
+    words = (word1, word2)
+    entries = [{'definition': "", 'pos': "", 'usage': "", 'examples': []} for _ in words]
+    # Rank of the clause each field was taken from: 0 in its own section, 1 elsewhere
+    ranks = [{}, {}]
+    shared_examples = []
+    section = None
+    examples = shared_examples
+    pending = None
+
+    for line in text.split('\n'):
+        header = COMPARISON_SECTION.match(line)
+        if header:
+            section = COMPARISON_SECTION_FIELDS.get((header.group(1) or header.group(2)).lower())
+            examples = shared_examples
+            pending = None
+            line = header.group(3)
+
+        stripped = line.strip()
+        heading = COMPARISON_EXAMPLES_FOR.fullmatch(stripped)
+        if heading and section != 'examples' and _word_index(heading.group(1), words) is not None:
+            # "With 'word':" starts the examples even where the header is missing
+            section = 'examples'
+        if section == 'examples':
+            if heading:
+                index = _word_index(heading.group(1), words)
+                examples = entries[index]['examples'] if index is not None else shared_examples
+                pending = None
+            elif not stripped:
+                continue
+            elif pending is None or stripped.startswith('-'):
+                if not stripped.startswith("Translation:"):
+                    pending = stripped.strip('- ').strip()
+            else:
+                translation = stripped[len("Translation:"):].strip() if stripped.startswith("Translation:") else stripped
+                examples.append((pending, translation))
+                pending = None
+            continue
+
+        clauses = list(COMPARISON_CLAUSE.finditer(line))
+        found_fields = set()
+        subjects = [_clause_word(line, clause.start(), words) for clause in clauses]
+        # A value stops where the next clause about either word begins
+        ends = []
+        end = len(line)
+        for subject in reversed(subjects):
+            ends.append(end)
+            if subject is not None:
+                end = subject[1]
+        ends.reverse()
+        for clause, subject, end in zip(clauses, subjects, ends):
+            if subject is None:
+                continue
+            index = subject[0]
+            field = COMPARISON_CLAUSE_FIELDS[' '.join(clause.group(1).lower().split())]
+            value = _clause_value(line, clause.end(), max(end, clause.end()), field)
+            found_fields.add(field)
+            rank = 0 if field == section else 1
+            if value and rank < ranks[index].get(field, 2):
+                entries[index][field] = value
+                ranks[index][field] = rank
+
+        # Meaning and category bullets without a clause ("- 'word' Particle"): the
+        # last quoted text, or the rest of the line, is the value
+        if section in ('definition', 'pos') and section not in found_fields and line.lstrip().startswith('-'):
+            bullet = line.lstrip()[1:].lstrip()
+            word_start = len(bullet) - len(bullet.lstrip(COMPARISON_QUOTES))
+            for index, word in enumerate(words):
+                word_end = word_start + len(word)
+                if (word_start and bullet[word_start:word_end].lower() == word.lower()
+                        and bullet[word_end:word_end + 1] in COMPARISON_QUOTES
+                        and ranks[index].get(section, 2) > 0):
+                    rest = bullet[word_end:].lstrip(COMPARISON_QUOTES)
+                    value = (_last_quoted(rest) or rest).strip()
+                    if value:
+                        entries[index][section] = value
+                        ranks[index][section] = 0
+                    break
+
+    if _word_index(word2, words) == 0:
+        # A word compared with itself: every clause was read as the first word's
+        for field in ('definition', 'pos', 'usage'):
+            entries[1][field] = entries[0][field]
+
+    return entries, shared_examples
+
+def _tag_record(tag, line):
+    """
+    Parse one JSONL line, tag the record with tag and serialize it again.
+
+    Returns:
+        tuple: (JSONL output for the record, number of processed entries)
+    """
+    data = json.loads(line)
+    processed_count = tag(data)
+    # Write the updated or original data with visible Unicode characters
+    return json.dumps(data, ensure_ascii=False) + '\n', processed_count
+
+def process_translations_file(input_file, output_file, workers=None):
     """Process translations.jsonl file to add special tokens."""
+    return map_jsonl_records(partial(_tag_record, _tag_translation), input_file, output_file, workers)
+
+def _tag_translation(data):
+    """
+    Add special tokens to a record of translations.jsonl, in place.
+
+    Returns:
+        int: Number of processed entries (0 or 1)
+    """
     processed_count = 0
-    with open(input_file, 'r', encoding='utf-8') as f_in, open(output_file, 'w', encoding='utf-8') as f_out:
-        for line in tqdm(f_in, desc=f"Processing {os.path.basename(input_file)}"):
-            data = json.loads(line)
-            
-            if 'messages' in data and len(data['messages']) >= 2:
-                user_message = data['messages'][0]['content']
-                assistant_message = data['messages'][1]['content']
-                
-                # Check if this is a meaning query
-                if "mean" in user_message.lower() and "yanomami" in user_message.lower():
-                    # Extract the Yanomami word
-                    word_match = re.search(r"'([^']*)'", user_message)
-                    if word_match:
-                        yanomami_word = word_match.group(1)
-                        
-                        # Add query token to user message
-                        data['messages'][0]['content'] = f"<QUERY>What does <WORD>{yanomami_word}</WORD> mean in Yanomami?</QUERY>"
-                        
-                        # Extract meaning and POS from assistant message
-                        meaning_match = re.search(r"means '([^']*)'|in Yanomami means '([^']*)'|means \"([^\"]*)\"", assistant_message)
-                        pos_match = re.search(r"It is an? ([A-Za-z]+( [A-Za-z]+)?)\.", assistant_message)
-                        
-                        # Extract examples
-                        examples_section = ""
-                        examples_match = re.search(r"Here are some examples:(.*?)(?:Related forms:|$)", assistant_message, re.DOTALL)
-                        if examples_match:
-                            examples_section = examples_match.group(1).strip()
-                        
-                        # Extract related forms
-                        related_forms = ""
-                        related_match = re.search(r"Related forms: (.*?)$", assistant_message)
-                        if related_match:
-                            related_forms = related_match.group(1).strip()
-                        
-                        # Get meaning from different possible match groups
-                        meaning = ""
-                        if meaning_match:
-                            for group in meaning_match.groups():
-                                if group:
-                                    meaning = group
-                                    break
-                        else:
-                            # Try a more general approach if the specific patterns don't match
-                            first_sentence = assistant_message.split('.')[0]
-                            if "means" in first_sentence:
-                                meaning = first_sentence.split("means")[-1].strip(" '\".")
-                        
-                        pos = pos_match.group(1) if pos_match else ""
-                        
-                        # Create structured message
-                        new_assistant_message = f"<WORD>{yanomami_word}</WORD> "
-                        if pos:
-                            new_assistant_message += f"<POS>{pos}</POS> "
-                        new_assistant_message += f"<DEFINITION>{meaning}</DEFINITION>"
-                        
-                        # Add examples if available
-                        if examples_section:
-                            formatted_examples = ""
-                            # Process each example to add specific tags
-                            example_lines = examples_section.strip().split('\n')
-                            for i in range(0, len(example_lines), 2):
-                                if i+1 < len(example_lines):
-                                    yanomami_example = example_lines[i].strip('- ').strip()
-                                    translation = example_lines[i+1].strip().replace("Translation: ", "")
-                                    formatted_examples += f"<EXAMPLE_YANOMAMI>{yanomami_example}</EXAMPLE_YANOMAMI> <EXAMPLE_TRANSLATION>{translation}</EXAMPLE_TRANSLATION>\n"
-                            
-                            new_assistant_message += f" <EXAMPLES>{formatted_examples.strip()}</EXAMPLES>"
-                            
-                        # Add related forms if available
-                        if related_forms:
-                            new_assistant_message += f" <RELATED_FORMS>{related_forms}</RELATED_FORMS>"
-                        
-                        # Update the assistant message
-                        data['messages'][1]['content'] = new_assistant_message
-                        processed_count += 1
-            
-            # Write the updated or original data with visible Unicode characters
-            f_out.write(json.dumps(data, ensure_ascii=False) + '\n')
+    
+    if 'messages' in data and len(data['messages']) >= 2:
+        user_message = data['messages'][0]['content']
+        assistant_message = data['messages'][1]['content']
+        
+        # Check if this is a meaning query
+        if "mean" in user_message.lower() and "yanomami" in user_message.lower():
+            # Extract the Yanomami word
+            word_match = PATTERNS['single_quoted'].search(user_message)
+            if word_match:
+                yanomami_word = word_match.group(1)
+                
+                # Add query token to user message
+                data['messages'][0]['content'] = f"<QUERY>What does <WORD>{yanomami_word}</WORD> mean in Yanomami?</QUERY>"
+                
+                # Extract meaning and POS from assistant message
+                meaning_match = PATTERNS['translation_meaning'].search(assistant_message)
+                pos_match = PATTERNS['translation_pos'].search(assistant_message)
+                
+                # Extract examples
+                examples_section = ""
+                examples_match = PATTERNS['translation_examples'].search(assistant_message)
+                if examples_match:
+                    examples_section = examples_match.group(1).strip()
+                
+                # Extract related forms
+                related_forms = ""
+                related_match = PATTERNS['related_forms'].search(assistant_message)
+                if related_match:
+                    related_forms = related_match.group(1).strip()
+                
+                # Get meaning from different possible match groups
+                meaning = ""
+                if meaning_match:
+                    for group in meaning_match.groups():
+                        if group:
+                            meaning = group
+                            break
+                else:
+                    # Try a more general approach if the specific patterns don't match
+                    first_sentence = assistant_message.split('.')[0]
+                    if "means" in first_sentence:
+                        meaning = first_sentence.split("means")[-1].strip(" '\".")
+                
+                pos = pos_match.group(1) if pos_match else ""
+                
+                # Create structured message
+                new_assistant_message = f"<WORD>{yanomami_word}</WORD> "
+                if pos:
+                    new_assistant_message += f"<POS>{pos}</POS> "
+                new_assistant_message += f"<DEFINITION>{meaning}</DEFINITION>"
+                
+                # Add examples if available
+                if examples_section:
+                    formatted_examples = ""
+                    # Process each example to add specific tags
+                    example_lines = examples_section.strip().split('\n')
+                    for i in range(0, len(example_lines), 2):
+                        if i+1 < len(example_lines):
+                            yanomami_example = example_lines[i].strip('- ').strip()
+                            translation = example_lines[i+1].strip().replace("Translation: ", "")
+                            formatted_examples += f"<EXAMPLE_YANOMAMI>{yanomami_example}</EXAMPLE_YANOMAMI> <EXAMPLE_TRANSLATION>{translation}</EXAMPLE_TRANSLATION>\n"
+                    
+                    new_assistant_message += f" <EXAMPLES>{formatted_examples.strip()}</EXAMPLES>"
+                    
+                # Add related forms if available
+                if related_forms:
+                    new_assistant_message += f" <RELATED_FORMS>{related_forms}</RELATED_FORMS>"
+                
+                # Update the assistant message
+                data['messages'][1]['content'] = new_assistant_message
+                processed_count += 1
     
     return processed_count
 
-def process_yanomami_to_english_file(input_file, output_file):
+
+def process_yanomami_to_english_file(input_file, output_file, workers=None):
     """Process phrases-yanomami-to-english.jsonl file to add special tokens."""
+    return map_jsonl_records(partial(_tag_record, _tag_yanomami_to_english), input_file, output_file, workers)
+
+def _tag_yanomami_to_english(data):
+    """
+    Add special tokens to a record of phrases-yanomami-to-english.jsonl, in place.
+
+    Returns:
+        int: Number of processed entries (0 or 1)
+    """
     processed_count = 0
-    with open(input_file, 'r', encoding='utf-8') as f_in, open(output_file, 'w', encoding='utf-8') as f_out:
-        for line in tqdm(f_in, desc=f"Processing {os.path.basename(input_file)}"):
-            data = json.loads(line)
-            
-            if 'messages' in data and len(data['messages']) >= 2:
-                user_message = data['messages'][0]['content']
-                assistant_message = data['messages'][1]['content']
-                
-                # Check if this is a translation query
-                if "translate" in user_message.lower() and "yanomami" in user_message.lower():
-                    # Extract the Yanomami phrase
-                    phrase_match = re.search(r"\"([^\"]*)\"", user_message)
-                    if phrase_match:
-                        yanomami_phrase = phrase_match.group(1)
-                        
-                        # Add query token to user message
-                        data['messages'][0]['content'] = f"<QUERY>Translate this Yanomami phrase to English: <YANOMAMI>{yanomami_phrase}</YANOMAMI></QUERY>"
-                        
-                        # Extract translation
-                        translation_match = re.search(r"is '([^']*)'|is \"([^\"]*)\"", assistant_message)
-                        literal_match = re.search(r"Literal: '([^']*)'|Literal: \"([^\"]*)\"", assistant_message)
-                        
-                        translation = ""
-                        if translation_match:
-                            for group in translation_match.groups():
-                                if group:
-                                    translation = group
-                                    break
-                        
-                        literal = ""
-                        if literal_match:
-                            for group in literal_match.groups():
-                                if group:
-                                    literal = group
-                                    break
-                        
-                        # Create structured message
-                        new_assistant_message = f"<YANOMAMI>{yanomami_phrase}</YANOMAMI> <TRANSLATION>{translation}</TRANSLATION>"
-                        if literal:
-                            new_assistant_message += f" <LITERAL>{literal}</LITERAL>"
-                        
-                        # Update the assistant message
-                        data['messages'][1]['content'] = new_assistant_message
-                        processed_count += 1
-            
-            # Write the updated or original data with visible Unicode characters
-            f_out.write(json.dumps(data, ensure_ascii=False) + '\n')
+    
+    if 'messages' in data and len(data['messages']) >= 2:
+        user_message = data['messages'][0]['content']
+        assistant_message = data['messages'][1]['content']
+        
+        # Check if this is a translation query
+        if "translate" in user_message.lower() and "yanomami" in user_message.lower():
+            # Extract the Yanomami phrase
+            phrase_match = PATTERNS['double_quoted'].search(user_message)
+            if phrase_match:
+                yanomami_phrase = phrase_match.group(1)
+                
+                # Add query token to user message
+                data['messages'][0]['content'] = f"<QUERY>Translate this Yanomami phrase to English: <YANOMAMI>{yanomami_phrase}</YANOMAMI></QUERY>"
+                
+                # Extract translation
+                translation_match = PATTERNS['phrase_translation'].search(assistant_message)
+                literal_match = PATTERNS['phrase_literal'].search(assistant_message)
+                
+                translation = ""
+                if translation_match:
+                    for group in translation_match.groups():
+                        if group:
+                            translation = group
+                            break
+                
+                literal = ""
+                if literal_match:
+                    for group in literal_match.groups():
+                        if group:
+                            literal = group
+                            break
+                
+                # Create structured message
+                new_assistant_message = f"<YANOMAMI>{yanomami_phrase}</YANOMAMI> <TRANSLATION>{translation}</TRANSLATION>"
+                if literal:
+                    new_assistant_message += f" <LITERAL>{literal}</LITERAL>"
+                
+                # Update the assistant message
+                data['messages'][1]['content'] = new_assistant_message
+                processed_count += 1
     
     return processed_count
 
-def process_phrases_file(input_file, output_file):
+
+def process_phrases_file(input_file, output_file, workers=None):
     """Process phrases-english-to-yanomami.jsonl file to add special tokens."""
+    return map_jsonl_records(partial(_tag_record, _tag_phrase), input_file, output_file, workers)
+
+def _tag_phrase(data):
+    """
+    Add special tokens to a record of phrases-english-to-yanomami.jsonl, in place.
+
+    Returns:
+        int: Number of processed entries (0 or 1)
+    """
     processed_count = 0
-    with open(input_file, 'r', encoding='utf-8') as f_in, open(output_file, 'w', encoding='utf-8') as f_out:
-        for line in tqdm(f_in, desc=f"Processing {os.path.basename(input_file)}"):
-            data = json.loads(line)
+    
+    if 'messages' in data and len(data['messages']) >= 2:
+        user_message = data['messages'][0]['content']
+        assistant_message = data['messages'][1]['content']
+        
+        # Extract the English phrase - try both double and single quotes
+        phrase_match = PATTERNS['english_phrase'].search(user_message)
+        if phrase_match:
+            # Get the first non-None group
+            english_phrase = next((g for g in phrase_match.groups() if g is not None), "")
             
-            if 'messages' in data and len(data['messages']) >= 2:
-                user_message = data['messages'][0]['content']
-                assistant_message = data['messages'][1]['content']
-                
-                # Extract the English phrase - try both double and single quotes
-                phrase_match = re.search(r"\"([^\"]*)\"|\'([^\']*)\'|how do you say ([^\s]+) in", user_message)
-                if phrase_match:
-                    # Get the first non-None group
-                    english_phrase = next((g for g in phrase_match.groups() if g is not None), "")
-                    
-                    # Add query token to user message
-                    data['messages'][0]['content'] = f"<QUERY>How do you say <TRANSLATION>{english_phrase}</TRANSLATION> in Yanomami?</QUERY>"
-                    
-                    # Extract Yanomami translation with multiple patterns
-                    yanomami_phrase = ""
-                    # Try various patterns
-                    patterns = [
-                        r"In Yanomami, \"([^\"]*)\"",
-                        r"In Yanomami, '([^']*)'",
-                        r"in Yanomami is '([^']*)'",
-                        r"in Yanomami is \"([^\"]*)\"",
-                        r"The .* in Yanomami is '([^']*)'",
-                    ]
-
-                    for pattern in patterns:
-                        match = re.search(pattern, assistant_message)
-                        if match:
-                            yanomami_phrase = match.group(1)
-                            break
+            # Add query token to user message
+            data['messages'][0]['content'] = f"<QUERY>How do you say <TRANSLATION>{english_phrase}</TRANSLATION> in Yanomami?</QUERY>"
+            
+            # Extract Yanomami translation with multiple patterns
+            yanomami_phrase = ""
+            # Try various patterns
+            for pattern in PATTERNS['yanomami_phrase']:
+                match = pattern.search(assistant_message)
+                if match:
+                    yanomami_phrase = match.group(1)
+                    break
 
-                    # Last resort: just take the last word in quotes if nothing else matched
-                    if not yanomami_phrase:
-                        last_quote = re.findall(r"'([^']*)'|\"([^\"]*)\"", assistant_message)
-                        if last_quote:
-                            yanomami_phrase = last_quote[-1][0] if last_quote[-1][0] else last_quote[-1][1]
-                    # Create structured message
-                    new_assistant_message = f"<TRANSLATION>{english_phrase}</TRANSLATION> <YANOMAMI>{yanomami_phrase}</YANOMAMI>"
-                    
-                    # Extract examples section if available
-                    examples_section = ""
-                    examples_match = re.search(r"Examples?:(.*?)(?:$|\n\n)", assistant_message, re.DOTALL | re.IGNORECASE)
-                    if examples_match:
-                        examples_section = examples_match.group(1).strip()
-                    
-                    # Add examples if available
-                    if examples_section:
-                        formatted_examples = ""
-                        # Process each example to add specific tags
-                        example_lines = examples_section.strip().split('\n')
-                        for i in range(0, len(example_lines), 2):
-                            if i+1 < len(example_lines):
-                                yanomami_example = example_lines[i].strip('- ').strip()
-                                translation = example_lines[i+1].strip().replace("Translation: ", "")
-                                formatted_examples += f"<EXAMPLE_YANOMAMI>{yanomami_example}</EXAMPLE_YANOMAMI> <EXAMPLE_TRANSLATION>{translation}</EXAMPLE_TRANSLATION>\n"
-                        
-                        new_assistant_message += f" <EXAMPLES>{formatted_examples.strip()}</EXAMPLES>"
-                    
-                    # Update the assistant message
-                    data['messages'][1]['content'] = new_assistant_message
-                    processed_count += 1
+            # Last resort: just take the last word in quotes if nothing else matched
+            if not yanomami_phrase:
+                last_quote = PATTERNS['quoted'].findall(assistant_message)
+                if last_quote:
+                    yanomami_phrase = last_quote[-1][0] if last_quote[-1][0] else last_quote[-1][1]
+            # Create structured message
+            new_assistant_message = f"<TRANSLATION>{english_phrase}</TRANSLATION> <YANOMAMI>{yanomami_phrase}</YANOMAMI>"
+            
+            # Extract examples section if available
+            examples_section = ""
+            examples_match = PATTERNS['phrase_examples'].search(assistant_message)
+            if examples_match:
+                examples_section = examples_match.group(1).strip()
+            
+            # Add examples if available
+            if examples_section:
+                formatted_examples = ""
+                # Process each example to add specific tags
+                example_lines = examples_section.strip().split('\n')
+                for i in range(0, len(example_lines), 2):
+                    if i+1 < len(example_lines):
+                        yanomami_example = example_lines[i].strip('- ').strip()
+                        translation = example_lines[i+1].strip().replace("Translation: ", "")
+                        formatted_examples += f"<EXAMPLE_YANOMAMI>{yanomami_example}</EXAMPLE_YANOMAMI> <EXAMPLE_TRANSLATION>{translation}</EXAMPLE_TRANSLATION>\n"
+                
+                new_assistant_message += f" <EXAMPLES>{formatted_examples.strip()}</EXAMPLES>"
             
-            # Write the updated or original data with visible Unicode characters
-            f_out.write(json.dumps(data, ensure_ascii=False) + '\n')
+            # Update the assistant message
+            data['messages'][1]['content'] = new_assistant_message
+            processed_count += 1
     
     return processed_count
 
-def process_comparison_file(input_file, output_file):
+
+def process_comparison_file(input_file, output_file, workers=None):
     """Process comparison.jsonl file to add special tokens."""
+    return map_jsonl_records(partial(_tag_record, _tag_comparison), input_file, output_file, workers)
+
+def _tag_comparison(data):
+    """
+    Add special tokens to a record of comparison.jsonl, in place.
+
+    Returns:
+        int: Number of processed entries (0 or 1)
+    """
     processed_count = 0
-    with open(input_file, 'r', encoding='utf-8') as f_in, open(output_file, 'w', encoding='utf-8') as f_out:
-        for line in tqdm(f_in, desc=f"Processing {os.path.basename(input_file)}"):
-            data = json.loads(line)
+    
+    if 'messages' in data and len(data['messages']) >= 2:
+        user_message = data['messages'][0]['content']
+        assistant_message = data['messages'][1]['content']
+        
+        # Check if this is a comparison query
+        if "difference between" in user_message.lower() and "yanomami" in user_message.lower():
+            # Extract the words being compared - handle different formats
+            words = []
             
-            if 'messages' in data and len(data['messages']) >= 2:
-                user_message = data['messages'][0]['content']
-                assistant_message = data['messages'][1]['content']
-                
-                # Check if this is a comparison query
-                if "difference between" in user_message.lower() and "yanomami" in user_message.lower():
-                    # Extract the words being compared - handle different formats
-                    words = []
-                    
-                    # Try to find words in quotes first (both single and double quotes)
-                    quote_matches = re.findall(r"'([^']*)'|\"([^\"]*)\"", user_message)
-                    for match in quote_matches:
-                        if isinstance(match, tuple):
-                            # Get the first non-empty group
-                            word = next((g for g in match if g), "")
-                            if word:
-                                words.append(word)
-                        else:
-                            words.append(match)
-                    
-                    # If we don't have enough words with quotes, try to find them without quotes
-                    if len(words) < 2:
-                        # Try to extract words from pattern like "difference between X and Y"
-                        unquoted_match = re.search(r"difference between\s+['\"]*([^'\"]+)['\"]*\s+and\s+['\"]*([^'\"]+)['\"]*", user_message, re.IGNORECASE)
-                        if unquoted_match:
-                            words = [unquoted_match.group(1).strip(), unquoted_match.group(2).strip()]
-                    
-                    if len(words) >= 2:
-                        word1 = words[0]
-                        word2 = words[1]
-                        
-                        # Add query token to user message
-                        data['messages'][0]['content'] = f"<QUERY>What is the difference between '{word1}' and '{word2}' in Yanomami?</QUERY>"
-                        
-                        # Try to parse the response directly if it's already in a structured format
-                        if "<WORD>" in assistant_message:
-                            # The message is already formatted, keep it as is
-                            data['messages'][1]['content'] = assistant_message
-                            processed_count += 1
-                            f_out.write(json.dumps(data, ensure_ascii=False) + '\n')
-                            continue
-                        
-                        # Extract definitions with various patterns
-                        definition1 = ""
-                        definition2 = ""
-                        
-                        # Try different patterns for definitions
-                        def_patterns = [
-                            f"'{word1}' means '([^']*)'|'{word1}' means \"([^\"]*)\"",
-                            f"- '{word1}' means '([^']*)'|'{word1}' is a ([^\\n]*)",
-                            f"'{word1}' is an? ([^\\n,]*)",
-                            f"'{word1}'\\s+means\\s+([^\\n.]*)",
-                            f"{word1}\\s+means\\s+'([^']*)'|{word1}\\s+means\\s+\"([^\"]*)\"",
-                            f"{word1}\\s+means\\s+([^\\n.]*)"
-                        ]
-                        
-                        for pattern in def_patterns:
-                            def1_match = re.search(pattern, assistant_message, re.IGNORECASE)
-                            if def1_match:
-                                for group in def1_match.groups():
-                                    if group:
-                                        definition1 = group.strip()
-                                        break
-                                if definition1:
-                                    break
-                        
-                        # Same for word2
-                        def_patterns = [
-                            f"'{word2}' means '([^']*)'|'{word2}' means \"([^\"]*)\"",
-                            f"- '{word2}' means '([^']*)'|'{word2}' is a ([^\\n]*)",
-                            f"'{word2}' is an? ([^\\n,]*)",
-                            f"'{word2}'\\s+means\\s+([^\\n.]*)",
-                            f"{word2}\\s+means\\s+'([^']*)'|{word2}\\s+means\\s+\"([^\"]*)\"",
-                            f"{word2}\\s+means\\s+([^\\n.]*)"
-                        ]
-                        
-                        for pattern in def_patterns:
-                            def2_match = re.search(pattern, assistant_message, re.IGNORECASE)
-                            if def2_match:
-                                for group in def2_match.groups():
-                                    if group:
-                                        definition2 = group.strip()
-                                        break
-                                if definition2:
-                                    break
-                        
-                        # If still not found, look for patterns in the "Meaning" section
-                        if not definition1 or not definition2:
-                            meaning_section = re.search(r"1\.\s*Meaning:(.*?)(?:2\.|$)", assistant_message, re.DOTALL)
-                            if meaning_section:
-                                meaning_text = meaning_section.group(1).strip()
-                                
-                                # Look for word1 definition in meaning section
-                                if not definition1:
-                                    for pattern in def_patterns[:3]:  # Use the first 3 patterns
-                                        def1_match = re.search(pattern, meaning_text)
-                                        if def1_match:
-                                            for group in def1_match.groups():
-                                                if group:
-                                                    definition1 = group.strip()
-                                                    break
-                                            if definition1:
-                                                break
-                                    
-                                    # If still not found, try extracting from bullet points
-                                    if not definition1:
-                                        bullet_match = re.search(f"- '{word1}'[^\\n]*'([^']*)'|- '{word1}'[^\\n]*\"([^\"]*)\"", meaning_text)
-                                        if bullet_match:
-                                            for group in bullet_match.groups():
-                                                if group:
-                                                    definition1 = group.strip()
-                                                    break
-                                
-                                # Look for word2 definition in meaning section
-                                if not definition2:
-                                    for pattern in def_patterns[:3]:  # Use the first 3 patterns
-                                        def2_match = re.search(pattern, meaning_text)
-                                        if def2_match:
-                                            for group in def2_match.groups():
-                                                if group:
-                                                    definition2 = group.strip()
-                                                    break
-                                            if definition2:
-                                                break
-                                    
-                                    # If still not found, try extracting from bullet points
-                                    if not definition2:
-                                        bullet_match = re.search(f"- '{word2}'[^\\n]*'([^']*)'|- '{word2}'[^\\n]*\"([^\"]*)\"", meaning_text)
-                                        if bullet_match:
-                                            for group in bullet_match.groups():
-                                                if group:
-                                                    definition2 = group.strip()
-                                                    break
-                        
-                        # Extract grammatical categories
-                        pos1 = ""
-                        pos2 = ""
-                        
-                        # Try different patterns for POS
-                        pos_patterns = [
-                            f"'{word1}' is an? ([A-Za-z]+(?: \\([A-Za-z]+\\))?)",
-                            f"{word1} is an? ([A-Za-z]+(?: \\([A-Za-z]+\\))?)",
-                            f"- '{word1}' is an? ([A-Za-z]+(?: \\([A-Za-z]+\\))?)"
-                        ]
-                        
-                        # Check in grammatical section first
-                        grammatical_section = re.search(r"2\.\s*Grammatical category:(.*?)(?:3\.|$)", assistant_message, re.DOTALL)
-                        if grammatical_section:
-                            grammatical_text = grammatical_section.group(1).strip()
-                            
-                            for pattern in pos_patterns:
-                                pos1_match = re.search(pattern, grammatical_text, re.IGNORECASE)
-                                if pos1_match:
-                                    pos1 = pos1_match.group(1).strip()
-                                    break
-                            
-                            pos_patterns = [
-                                f"'{word2}' is an? ([A-Za-z]+(?: \\([A-Za-z]+\\))?)",
-                                f"{word2} is an? ([A-Za-z]+(?: \\([A-Za-z]+\\))?)",
-                                f"- '{word2}' is an? ([A-Za-z]+(?: \\([A-Za-z]+\\))?)"
-                            ]
-                            
-                            for pattern in pos_patterns:
-                                pos2_match = re.search(pattern, grammatical_text, re.IGNORECASE)
-                                if pos2_match:
-                                    pos2 = pos2_match.group(1).strip()
-                                    break
-                        
-                        # If not found in grammatical section, look in the whole text
-                        if not pos1:
-                            for pattern in pos_patterns:
-                                pos1_match = re.search(pattern, assistant_message, re.IGNORECASE)
-                                if pos1_match:
-                                    pos1 = pos1_match.group(1).strip()
-                                    break
-                        
-                        if not pos2:
-                            pos_patterns = [
-                                f"'{word2}' is an? ([A-Za-z]+(?: \\([A-Za-z]+\\))?)",
-                                f"{word2} is an? ([A-Za-z]+(?: \\([A-Za-z]+\\))?)",
-                                f"- '{word2}' is an? ([A-Za-z]+(?: \\([A-Za-z]+\\))?)"
-                            ]
-                            
-                            for pattern in pos_patterns:
-                                pos2_match = re.search(pattern, assistant_message, re.IGNORECASE)
-                                if pos2_match:
-                                    pos2 = pos2_match.group(1).strip()
-                                    break
-                        
-                        # Extract usage information
-                        usage1 = ""
-                        usage2 = ""
-                        
-                        usage_section = re.search(r"3\.\s*Usage:(.*?)(?:4\.|$)", assistant_message, re.DOTALL)
-                        if usage_section:
-                            usage_text = usage_section.group(1).strip()
-                            
-                            # Try different patterns for usage
-                            usage_patterns = [
-                                f"'{word1}' is used ([^\\n]*?)(?:'{word2}'|$)",
-                                f"- '{word1}' is used ([^\\n]*)",
-                                f"{word1} is used ([^\\n]*)"
-                            ]
-                            
-                            for pattern in usage_patterns:
-                                usage1_match = re.search(pattern, usage_text, re.IGNORECASE | re.DOTALL)
-                                if usage1_match:
-                                    usage1 = usage1_match.group(1).strip()
-                                    break
-                            
-                            usage_patterns = [
-                                f"'{word2}' is used ([^\\n]*)",
-                                f"- '{word2}' is used ([^\\n]*)",
-                                f"{word2} is used ([^\\n]*)"
-                            ]
-                            
-                            for pattern in usage_patterns:
-                                usage2_match = re.search(pattern, usage_text, re.IGNORECASE | re.DOTALL)
-                                if usage2_match:
-                                    usage2 = usage2_match.group(1).strip()
-                                    break
-                        
-                        # Extract examples
-                        examples_section = ""
-                        examples_match = re.search(r"4\.\s*Examples:(.*?)$", assistant_message, re.DOTALL)
-                        if examples_match:
-                            examples_section = examples_match.group(1).strip()
-                        
-                        # Create structured message
-                        new_assistant_message = f"<WORD>{word1}</WORD> "
-                        if pos1:
-                            new_assistant_message += f"<POS>{pos1}</POS> "
-                        if definition1:
-                            new_assistant_message += f"<DEFINITION>{definition1}</DEFINITION>"
-                        if usage1:
-                            new_assistant_message += f" <USAGE>{usage1}</USAGE>"
-                        
-                        new_assistant_message += f"\n<WORD>{word2}</WORD> "
-                        if pos2:
-                            new_assistant_message += f"<POS>{pos2}</POS> "
-                        if definition2:
-                            new_assistant_message += f"<DEFINITION>{definition2}</DEFINITION>"
-                        if usage2:
-                            new_assistant_message += f" <USAGE>{usage2}</USAGE>"
-                        
-                        # Add examples if available
-                        if examples_section:
-                            formatted_examples = ""
-                            
-                            # Try to find examples by word
-                            word1_examples_match = re.search(f"With '{word1}':(.*?)(?:With '{word2}':|$)", examples_section, re.DOTALL)
-                            word2_examples_match = re.search(f"With '{word2}':(.*?)$", examples_section, re.DOTALL)
-                            
-                            # Process examples for word1
-                            if word1_examples_match:
-                                word1_examples = word1_examples_match.group(1).strip()
-                                example_lines = word1_examples.split('\n')
-                                for i in range(0, len(example_lines), 2):
-                                    if i+1 < len(example_lines) and example_lines[i].strip():
-                                        yanomami_example = example_lines[i].strip('- ').strip()
-                                        translation = ""
-                                        if "Translation:" in example_lines[i+1]:
-                                            translation = example_lines[i+1].strip().replace("Translation: ", "")
-                                        else:
-                                            translation = example_lines[i+1].strip()
-                                        formatted_examples += f"<EXAMPLE_YANOMAMI>{yanomami_example}</EXAMPLE_YANOMAMI> <EXAMPLE_TRANSLATION>{translation}</EXAMPLE_TRANSLATION>\n"
-                            
-                            # Process examples for word2
-                            if word2_examples_match:
-                                word2_examples = word2_examples_match.group(1).strip()
-                                example_lines = word2_examples.split('\n')
-                                for i in range(0, len(example_lines), 2):
-                                    if i+1 < len(example_lines) and example_lines[i].strip():
-                                        yanomami_example = example_lines[i].strip('- ').strip()
-                                        translation = ""
-                                        if "Translation:" in example_lines[i+1]:
-                                            translation = example_lines[i+1].strip().replace("Translation: ", "")
-                                        else:
-                                            translation = example_lines[i+1].strip()
-                                        formatted_examples += f"<EXAMPLE_YANOMAMI>{yanomami_example}</EXAMPLE_YANOMAMI> <EXAMPLE_TRANSLATION>{translation}</EXAMPLE_TRANSLATION>\n"
-                            
-                            # If no examples found with the "With 'word':" pattern, try to extract examples directly
-                            if not formatted_examples:
-                                example_lines = examples_section.split('\n')
-                                for i in range(0, len(example_lines), 2):
-                                    if i+1 < len(example_lines) and example_lines[i].strip():
-                                        yanomami_example = example_lines[i].strip('- ').strip()
-                                        translation = ""
-                                        if i+1 < len(example_lines):
-                                            if "Translation:" in example_lines[i+1]:
-                                                translation = example_lines[i+1].strip().replace("Translation: ", "")
-                                            else:
-                                                translation = example_lines[i+1].strip()
-                                            formatted_examples += f"<EXAMPLE_YANOMAMI>{yanomami_example}</EXAMPLE_YANOMAMI> <EXAMPLE_TRANSLATION>{translation}</EXAMPLE_TRANSLATION>\n"
-                            
-                            if formatted_examples:
-                                new_assistant_message += f"\n<EXAMPLES>{formatted_examples.strip()}</EXAMPLES>"
-                        
-                        # Update the assistant message
-                        data['messages'][1]['content'] = new_assistant_message
-                        processed_count += 1
+            # Try to find words in quotes first (both single and double quotes)
+            quote_matches = PATTERNS['quoted'].findall(user_message)
+            for match in quote_matches:
+                if isinstance(match, tuple):
+                    # Get the first non-empty group
+                    word = next((g for g in match if g), "")
+                    if word:
+                        words.append(word)
+                else:
+                    words.append(match)
             
-            # Write the updated or original data with visible Unicode characters
-            f_out.write(json.dumps(data, ensure_ascii=False) + '\n')
+            # If we don't have enough words with quotes, try to find them without quotes
+            if len(words) < 2:
+                # Try to extract words from pattern like "difference between X and Y"
+                unquoted_match = PATTERNS['difference_between'].search(user_message)
+                if unquoted_match:
+                    words = [unquoted_match.group(1).strip(), unquoted_match.group(2).strip()]
+            
+            if len(words) >= 2:
+                word1 = words[0]
+                word2 = words[1]
+                
+                # Add query token to user message
+                data['messages'][0]['content'] = f"<QUERY>What is the difference between '{word1}' and '{word2}' in Yanomami?</QUERY>"
+                
+                # Try to parse the response directly if it's already in a structured format
+                if "<WORD>" in assistant_message:
+                    # The message is already formatted, keep it as is
+                    data['messages'][1]['content'] = assistant_message
+                    processed_count += 1
+                    return processed_count
+                
+                # Parse the sections of the answer
+                (entry1, entry2), other_examples = parse_comparison_answer(assistant_message, word1, word2)
+                definition1, pos1, usage1 = entry1['definition'], entry1['pos'], entry1['usage']
+                definition2, pos2, usage2 = entry2['definition'], entry2['pos'], entry2['usage']
+                
+                # Create structured message
+                new_assistant_message = f"<WORD>{word1}</WORD> "
+                if pos1:
+                    new_assistant_message += f"<POS>{pos1}</POS> "
+                if definition1:
+                    new_assistant_message += f"<DEFINITION>{definition1}</DEFINITION>"
+                if usage1:
+                    new_assistant_message += f" <USAGE>{usage1}</USAGE>"
+                
+                new_assistant_message += f"\n<WORD>{word2}</WORD> "
+                if pos2:
+                    new_assistant_message += f"<POS>{pos2}</POS> "
+                if definition2:
+                    new_assistant_message += f"<DEFINITION>{definition2}</DEFINITION>"
+                if usage2:
+                    new_assistant_message += f" <USAGE>{usage2}</USAGE>"
+                
+                # Add examples if available, those listed under each word first
+                examples = entry1['examples'] + entry2['examples'] or other_examples
+                if examples:
+                    formatted_examples = "\n".join(
+                        f"<EXAMPLE_YANOMAMI>{yanomami_example}</EXAMPLE_YANOMAMI> <EXAMPLE_TRANSLATION>{translation}</EXAMPLE_TRANSLATION>"
+                        for yanomami_example, translation in examples)
+                    new_assistant_message += f"\n<EXAMPLES>{formatted_examples}</EXAMPLES>"
+                
+                # Update the assistant message
+                data['messages'][1]['content'] = new_assistant_message
+                processed_count += 1
     
     return processed_count
 
-def process_how_to_file(input_file, output_file):
+
+def process_how_to_file(input_file, output_file, workers=None):
     """Process how-to.jsonl file to add special tokens."""
+    return map_jsonl_records(partial(_tag_record, _tag_how_to), input_file, output_file, workers)
+
+def _tag_how_to(data):
+    """
+    Add special tokens to a record of how-to.jsonl, in place.
+
+    Returns:
+        int: Number of processed entries (0 or 1)
+    """
     processed_count = 0
-    with open(input_file, 'r', encoding='utf-8') as f_in, open(output_file, 'w', encoding='utf-8') as f_out:
-        for line in tqdm(f_in, desc=f"Processing {os.path.basename(input_file)}"):
-            data = json.loads(line)
+    
+    if 'messages' in data and len(data['messages']) >= 2:
+        user_message = data['messages'][0]['content']
+        assistant_message = data['messages'][1]['content']
+        
+        # Check if this is a how-to query or a usage comparison query
+        if ("how" in user_message.lower() or "when should i use" in user_message.lower()) and "yanomami" in user_message.lower():
+            # Extract the Yanomami word if present - check for multiple patterns
+            yanomami_word = ""
             
-            if 'messages' in data and len(data['messages']) >= 2:
-                user_message = data['messages'][0]['content']
-                assistant_message = data['messages'][1]['content']
-                
-                # Check if this is a how-to query or a usage comparison query
-                if ("how" in user_message.lower() or "when should i use" in user_message.lower()) and "yanomami" in user_message.lower():
-                    # Extract the Yanomami word if present - check for multiple patterns
-                    yanomami_word = ""
-                    
-                    # Pattern 1: Word in quotes
-                    word_match = re.search(r"'([^']*)'|\"([^\"]*)\"", user_message)
-                    if word_match:
-                        yanomami_word = next((g for g in word_match.groups() if g is not None), "")
-                    
-                    # Pattern 2: Word after 'word' without quotes
-                    if not yanomami_word:
-                        word_pattern_match = re.search(r"the word ([^\s'\"]+)", user_message, re.IGNORECASE)
-                        if word_pattern_match:
-                            yanomami_word = word_pattern_match.group(1)
-                    
-                    # Pattern 3: Words in 'When should I use X instead of Y' pattern
-                    if not yanomami_word and "when should i use" in user_message.lower():
-                        usage_pattern_match = re.search(r"when should i use ['\"]*([^'\"]+)['\"]*\s+instead of\s+['\"]*([^'\"]+)['\"]*", user_message, re.IGNORECASE)
-                        if usage_pattern_match:
-                            # Get both words
-                            word1 = usage_pattern_match.group(1).strip()
-                            word2 = usage_pattern_match.group(2).strip()
-                            yanomami_word = word1  # Use the first word as the primary word
+            # Pattern 1: Word in quotes
+            word_match = PATTERNS['quoted'].search(user_message)
+            if word_match:
+                yanomami_word = next((g for g in word_match.groups() if g is not None), "")
+            
+            # Pattern 2: Word after 'word' without quotes
+            if not yanomami_word:
+                word_pattern_match = PATTERNS['the_word'].search(user_message)
+                if word_pattern_match:
+                    yanomami_word = word_pattern_match.group(1)
+            
+            # Pattern 3: Words in 'When should I use X instead of Y' pattern
+            if not yanomami_word and "when should i use" in user_message.lower():
+                usage_pattern_match = PATTERNS['when_should_i_use'].search(user_message)
+                if usage_pattern_match:
+                    # Get both words
+                    word1 = usage_pattern_match.group(1).strip()
+                    word2 = usage_pattern_match.group(2).strip()
+                    yanomami_word = word1  # Use the first word as the primary word
+            
+            # Extract the concept/question based on query type
+            if "when should i use" in user_message.lower():
+                # For 'when should I use' queries
+                usage_pattern_match = PATTERNS['when_should_i_use'].search(user_message)
+                if usage_pattern_match:
+                    word1 = usage_pattern_match.group(1).strip()
+                    word2 = usage_pattern_match.group(2).strip()
+                    data['messages'][0]['content'] = f"<QUERY>When should I use <WORD>{word1}</WORD> instead of <WORD>{word2}</WORD> in Yanomami?</QUERY>"
+                else:
+                    # If we couldn't extract both words but have yanomami_word
+                    if yanomami_word:
+                        data['messages'][0]['content'] = f"<QUERY>When should I use <WORD>{yanomami_word}</WORD> in Yanomami?</QUERY>"
+                    else:
+                        data['messages'][0]['content'] = f"<QUERY>{user_message}</QUERY>"
+            else:
+                # For 'how' queries
+                concept_match = PATTERNS['how_concept'].search(user_message)
+                if concept_match:
+                    concept = concept_match.group(2).strip()
                     
-                    # Extract the concept/question based on query type
-                    if "when should i use" in user_message.lower():
-                        # For 'when should I use' queries
-                        usage_pattern_match = re.search(r"when should i use ['\"]*([^'\"]+)['\"]*\s+instead of\s+['\"]*([^'\"]+)['\"]*", user_message, re.IGNORECASE)
-                        if usage_pattern_match:
-                            word1 = usage_pattern_match.group(1).strip()
-                            word2 = usage_pattern_match.group(2).strip()
-                            data['messages'][0]['content'] = f"<QUERY>When should I use <WORD>{word1}</WORD> instead of <WORD>{word2}</WORD> in Yanomami?</QUERY>"
-                        else:
-                            # If we couldn't extract both words but have yanomami_word
-                            if yanomami_word:
-                                data['messages'][0]['content'] = f"<QUERY>When should I use <WORD>{yanomami_word}</WORD> in Yanomami?</QUERY>"
-                            else:
-                                data['messages'][0]['content'] = f"<QUERY>{user_message}</QUERY>"
+                    # Add query token to user message with word tag if available
+                    if yanomami_word:
+                        data['messages'][0]['content'] = f"<QUERY>How {concept_match.group(1)} I use the word <WORD>{yanomami_word}</WORD> in a Yanomami sentence?</QUERY>"
                     else:
-                        # For 'how' queries
-                        concept_match = re.search(r"how (do|does|to|can|would) ([^?]*)", user_message, re.IGNORECASE)
-                        if concept_match:
-                            concept = concept_match.group(2).strip()
-                            
-                            # Add query token to user message with word tag if available
-                            if yanomami_word:
-                                data['messages'][0]['content'] = f"<QUERY>How {concept_match.group(1)} I use the word <WORD>{yanomami_word}</WORD> in a Yanomami sentence?</QUERY>"
-                            else:
-                                data['messages'][0]['content'] = f"<QUERY>How {concept_match.group(1)} {concept}?</QUERY>"
-                        
-                    # Extract examples for both query types
-                    examples_section = ""
-                    examples_match = re.search(r"Here are some examples:(.*?)$", assistant_message, re.DOTALL)
-                    if examples_match:
-                        examples_section = examples_match.group(1).strip()
+                        data['messages'][0]['content'] = f"<QUERY>How {concept_match.group(1)} {concept}?</QUERY>"
+                
+            # Extract examples for both query types
+            examples_section = ""
+            examples_match = PATTERNS['how_to_examples'].search(assistant_message)
+            if examples_match:
+                examples_section = examples_match.group(1).strip()
+            
+            # Create structured message based on query type
+            new_assistant_message = ""
+            
+            # Special handling for 'when should I use' queries
+            if "when should i use" in user_message.lower():
+                usage_pattern_match = PATTERNS['when_should_i_use'].search(user_message)
+                if usage_pattern_match:
+                    word1 = usage_pattern_match.group(1).strip()
+                    word2 = usage_pattern_match.group(2).strip()
                     
-                    # Create structured message based on query type
-                    new_assistant_message = ""
+                    # Extract meanings
+                    meaning1 = ""
+                    meaning2 = ""
                     
-                    # Special handling for 'when should I use' queries
-                    if "when should i use" in user_message.lower():
-                        usage_pattern_match = re.search(r"when should i use ['\"]*([^'\"]+)['\"]*\s+instead of\s+['\"]*([^'\"]+)['\"]*", user_message, re.IGNORECASE)
-                        if usage_pattern_match:
-                            word1 = usage_pattern_match.group(1).strip()
-                            word2 = usage_pattern_match.group(2).strip()
-                            
-                            # Extract meanings
-                            meaning1 = ""
-                            meaning2 = ""
-                            
-                            # Try to extract meanings with various patterns
-                            meaning_patterns = [
-                                f"'{word1}' means ['\"]*([^'\"]+)['\"]*",
-                                f"{word1} means ['\"]*([^'\"]+)['\"]*",
-                                f"'{word1}' is used to ([^\\n,\.]*)",
-                                f"{word1} is used to ([^\\n,\.]*)",
-                                f"'{word1}' is an? ([^\\n,\.]*)",
-                                f"{word1} is an? ([^\\n,\.]*)"
-                            ]
-                            
-                            for pattern in meaning_patterns:
-                                meaning_match = re.search(pattern, assistant_message, re.IGNORECASE)
-                                if meaning_match:
-                                    meaning1 = meaning_match.group(1).strip()
+                    # Try to extract meanings with various patterns
+                    meaning_match = _search_words(HOW_TO_MEANING, assistant_message, word1)
+                    if meaning_match:
+                        meaning1 = meaning_match[0].strip()
+                    
+                    # If we still don't have a meaning, try a more general pattern
+                    if not meaning1:
+                        sections = assistant_message.split('\n')
+                        for section in sections:
+                            if word1.lower() in section.lower() and 'means' in section.lower():
+                                parts = section.split('means')
+                                if len(parts) > 1:
+                                    meaning1 = parts[1].strip().strip('\'",.').strip()
                                     break
+                    
+                    meaning_match = _search_words(HOW_TO_MEANING, assistant_message, word2)
+                    if meaning_match:
+                        meaning2 = meaning_match[0].strip()
                             
-                            # If we still don't have a meaning, try a more general pattern
-                            if not meaning1:
-                                sections = assistant_message.split('\n')
-                                for section in sections:
-                                    if word1.lower() in section.lower() and 'means' in section.lower():
-                                        parts = section.split('means')
-                                        if len(parts) > 1:
-                                            meaning1 = parts[1].strip().strip('\'",.').strip()
-                                            break
-                            
-                            meaning_patterns = [
-                                f"'{word2}' means ['\"]*([^'\"]+)['\"]*",
-                                f"{word2} means ['\"]*([^'\"]+)['\"]*",
-                                f"'{word2}' is used to ([^\\n,\.]*)",
-                                f"{word2} is used to ([^\\n,\.]*)",
-                                f"'{word2}' is an? ([^\\n,\.]*)",
-                                f"{word2} is an? ([^\\n,\.]*)"
-                            ]
-                            
-                            for pattern in meaning_patterns:
-                                meaning_match = re.search(pattern, assistant_message, re.IGNORECASE)
-                                if meaning_match:
-                                    meaning2 = meaning_match.group(1).strip()
+                    # If we still don't have a meaning, try a more general pattern
+                    if not meaning2:
+                        sections = assistant_message.split('\n')
+                        for section in sections:
+                            if word2.lower() in section.lower() and 'means' in section.lower():
+                                parts = section.split('means')
+                                if len(parts) > 1:
+                                    meaning2 = parts[1].strip().strip('\'",.').strip()
                                     break
-                                    
-                            # If we still don't have a meaning, try a more general pattern
-                            if not meaning2:
-                                sections = assistant_message.split('\n')
-                                for section in sections:
-                                    if word2.lower() in section.lower() and 'means' in section.lower():
-                                        parts = section.split('means')
-                                        if len(parts) > 1:
-                                            meaning2 = parts[1].strip().strip('\'",.').strip()
-                                            break
-                            
-                            # Extract usage context
-                            usage_context = ""
-                            context_match = re.search(r"You should use ['\"]*([^'\"]+)['\"]*\s+when\s+([^\\n\.]*)", assistant_message, re.IGNORECASE)
-                            if context_match:
-                                usage_context = context_match.group(2).strip()
-                            
-                            # Create structured message with proper formatting
-                            new_assistant_message = "When deciding between these words in Yanomami:\n\n"
-                            
-                            # Add first word with definition
-                            new_assistant_message += f"<WORD>{word1}</WORD> "
-                            if meaning1:
-                                new_assistant_message += f"<DEFINITION>{meaning1}</DEFINITION>\n\n"
-                            else:
-                                new_assistant_message += "\n\n"
-                            
-                            # Add second word with definition
-                            new_assistant_message += f"<WORD>{word2}</WORD> "
-                            if meaning2:
-                                new_assistant_message += f"<DEFINITION>{meaning2}</DEFINITION>\n\n"
-                            else:
-                                new_assistant_message += "\n\n"
-                            
-                            # Add usage guidance
-                            if usage_context:
-                                new_assistant_message += f"<USAGE>{usage_context}</USAGE>\n"
-                            else:
-                                # Add generic usage guidance
-                                new_assistant_message += f"<USAGE>Use {word1} when referring to {meaning1 or 'its meaning'}. Use {word2} when referring to {meaning2 or 'its meaning'}.</USAGE>\n"
-                        else:
-                            # If we couldn't extract both words but have yanomami_word
-                            if yanomami_word:
-                                new_assistant_message = f"<WORD>{yanomami_word}</WORD> "
-                                
-                                # Try to extract meaning
-                                meaning_match = re.search(f"'{yanomami_word}' means ['\"]*([^'\"]+)['\"]*|{yanomami_word} means ['\"]*([^'\"]+)['\"]*", assistant_message, re.IGNORECASE)
-                                if meaning_match:
-                                    meaning = next((g for g in meaning_match.groups() if g is not None), "")
-                                    new_assistant_message += f"<DEFINITION>{meaning}</DEFINITION> "
-                                
-                                # Try to extract usage context
-                                context_match = re.search(f"You should use ['\"]*{yanomami_word}['\"]*\s+when\s+([^\\n\.]*)", assistant_message, re.IGNORECASE)
-                                if context_match:
-                                    usage_context = context_match.group(1).strip()
-                                    new_assistant_message += f"<USAGE>{usage_context}</USAGE> "
+                    
+                    # Extract usage context
+                    usage_context = ""
+                    context_match = PATTERNS['you_should_use_when'].search(assistant_message)
+                    if context_match:
+                        usage_context = context_match.group(2).strip()
+                    
+                    # Create structured message with proper formatting
+                    new_assistant_message = "When deciding between these words in Yanomami:\n\n"
+                    
+                    # Add first word with definition
+                    new_assistant_message += f"<WORD>{word1}</WORD> "
+                    if meaning1:
+                        new_assistant_message += f"<DEFINITION>{meaning1}</DEFINITION>\n\n"
                     else:
-                        # Standard how-to query handling
-                        # Create structured message with the word
-                        if yanomami_word:
-                            new_assistant_message = f"<WORD>{yanomami_word}</WORD>"  # Use the extracted word
-                        else:
-                            # Try to extract Yanomami word from assistant response
-                            # Pattern 1: Word in quotes in the first line
-                            yanomami_in_response = re.search(r"'([^']*)'|\"([^\"]*)\"", assistant_message.split('\n')[0])
-                            if yanomami_in_response:
-                                extracted_word = next((g for g in yanomami_in_response.groups() if g is not None), "")
-                                new_assistant_message = f"<WORD>{extracted_word}</WORD>"  # Use word from response
-                            else:
-                                # Pattern 2: Word after "the word" in the response
-                                word_pattern_match = re.search(r"the word '([^']*)'|the word \"([^\"]*)\"|(The word '[^']*')", assistant_message)
-                                if word_pattern_match:
-                                    extracted_word = next((g for g in word_pattern_match.groups() if g is not None), "")
-                                    # Clean up any extra text
-                                    if extracted_word.startswith("The word '"):
-                                        extracted_word = re.search(r"The word '([^']*)'|The word \"([^\"]*)\"|", extracted_word).group(1)
-                                    new_assistant_message = f"<WORD>{extracted_word}</WORD>"  # Use word from response
-                                else:
-                                    # Last resort: Try to find the word in the meaning section
-                                    meaning_match = re.search(r"The word '([^']*)' means|The word \"([^\"]*)\" means", assistant_message)
-                                    if meaning_match:
-                                        extracted_word = next((g for g in meaning_match.groups() if g is not None), "")
-                                        new_assistant_message = f"<WORD>{extracted_word}</WORD>"  # Use word from meaning section
-                                    else:
-                                        if 'concept' in locals():
-                                            new_assistant_message = f"<WORD>{concept}</WORD>"  # Fallback to concept
-                                        else:
-                                            new_assistant_message = "<RESPONSE>"  # Generic fallback
-                        
-                        # Extract grammatical information and part of speech if available
-                        grammatical_info = ""
-                        
-                        # Try to extract part of speech
-                        pos_info = ""
-                        pos_match = re.search(r"is an? ([A-Za-z]+( \([A-Za-z]+\))?)", assistant_message)
-                        if pos_match:
-                            pos_info = pos_match.group(1).strip()
-                            new_assistant_message += f" <POS>{pos_info}</POS>"
-                        
-                        # Try to extract definition/meaning
-                        definition = ""
-                        def_match = re.search(r"means '([^']*)'|means \"([^\"]*)\"|\'([^']*)\'\s+and is an?|\"([^\"]*)\"\s+and is an?", assistant_message)
-                        if def_match:
-                            definition = next((g for g in def_match.groups() if g is not None), "")
-                            new_assistant_message += f" <DEFINITION>{definition}</DEFINITION>"
-                        
-                        # Extract grammatical information
-                        grammar_match = re.search(r"In Yanomami grammar,(.*?)(?:Here are some examples:|$)", assistant_message, re.DOTALL)
-                        if grammar_match:
-                            grammatical_info = grammar_match.group(1).strip()
-                            new_assistant_message += f" <GRAMMATICAL>{grammatical_info}</GRAMMATICAL>"
+                        new_assistant_message += "\n\n"
+                    
+                    # Add second word with definition
+                    new_assistant_message += f"<WORD>{word2}</WORD> "
+                    if meaning2:
+                        new_assistant_message += f"<DEFINITION>{meaning2}</DEFINITION>\n\n"
+                    else:
+                        new_assistant_message += "\n\n"
+                    
+                    # Add usage guidance
+                    if usage_context:
+                        new_assistant_message += f"<USAGE>{usage_context}</USAGE>\n"
+                    else:
+                        # Add generic usage guidance
+                        new_assistant_message += f"<USAGE>Use {word1} when referring to {meaning1 or 'its meaning'}. Use {word2} when referring to {meaning2 or 'its meaning'}.</USAGE>\n"
+                else:
+                    # If we couldn't extract both words but have yanomami_word
+                    if yanomami_word:
+                        new_assistant_message = f"<WORD>{yanomami_word}</WORD> "
                         
-                        # Try to extract usage information
-                        usage_info = ""
-                        usage_match = re.search(r"When using this (verb|word), remember that ([^.]*)\.", assistant_message)
-                        if usage_match:
-                            usage_info = usage_match.group(2).strip()
-                            new_assistant_message += f" <USAGE>{usage_info}</USAGE>"
+                        # Try to extract meaning
+                        matches = [match for match in (pattern.search(assistant_message, yanomami_word)
+                                                       for pattern in HOW_TO_WORD_MEANING) if match]
+                        if matches:
+                            meaning = min(matches)[1][0]
+                            new_assistant_message += f"<DEFINITION>{meaning}</DEFINITION> "
                         
-                        # Add examples if available
-                        if examples_section:
-                            formatted_examples = ""
-                            # Process each example to add specific tags
-                            example_lines = examples_section.strip().split('\n')
-                            for i in range(0, len(example_lines), 2):
-                                if i+1 < len(example_lines) and example_lines[i].strip():
-                                    yanomami_example = example_lines[i].strip('- ').strip()
-                                    translation = example_lines[i+1].strip().replace("Translation: ", "")
-                                    formatted_examples += f"<EXAMPLE_YANOMAMI>{yanomami_example}</EXAMPLE_YANOMAMI> <EXAMPLE_TRANSLATION>{translation}</EXAMPLE_TRANSLATION>\n"
-                            
-                            if formatted_examples:
-                                new_assistant_message += f" <EXAMPLES>{formatted_examples.strip()}</EXAMPLES>"
+                        # Try to extract usage context
+                        usage_context = _search_you_should_use(assistant_message, yanomami_word)
+                        if usage_context is not None:
+                            usage_context = usage_context.strip()
+                            new_assistant_message += f"<USAGE>{usage_context}</USAGE> "
+            else:
+                # Standard how-to query handling
+                # Create structured message with the word
+                if yanomami_word:
+                    new_assistant_message = f"<WORD>{yanomami_word}</WORD>"  # Use the extracted word
+                else:
+                    # Try to extract Yanomami word from assistant response
+                    # Pattern 1: Word in quotes in the first line
+                    yanomami_in_response = PATTERNS['quoted'].search(assistant_message.split('\n')[0])
+                    if yanomami_in_response:
+                        extracted_word = next((g for g in yanomami_in_response.groups() if g is not None), "")
+                        new_assistant_message = f"<WORD>{extracted_word}</WORD>"  # Use word from response
+                    else:
+                        # Pattern 2: Word after "the word" in the response
+                        word_pattern_match = PATTERNS['response_word'].search(assistant_message)
+                        if word_pattern_match:
+                            extracted_word = next((g for g in word_pattern_match.groups() if g is not None), "")
+                            # Clean up any extra text
+                            if extracted_word.startswith("The word '"):
+                                extracted_word = PATTERNS['response_word_cleanup'].search(extracted_word).group(1)
+                            new_assistant_message = f"<WORD>{extracted_word}</WORD>"  # Use word from response
+                        else:
+                            # Last resort: Try to find the word in the meaning section
+                            meaning_match = PATTERNS['response_word_means'].search(assistant_message)
+                            if meaning_match:
+                                extracted_word = next((g for g in meaning_match.groups() if g is not None), "")
+                                new_assistant_message = f"<WORD>{extracted_word}</WORD>"  # Use word from meaning section
                             else:
-                                # If no structured examples found, use the whole response as examples
-                                new_assistant_message += f" <EXAMPLES>{assistant_message}</EXAMPLES>"
-                        
-                        # Update the assistant message
-                        data['messages'][1]['content'] = new_assistant_message
-                        processed_count += 1
-            
-            # Write the updated or original data with visible Unicode characters
-            f_out.write(json.dumps(data, ensure_ascii=False) + '\n')
-    
-    return processed_count
-
-def process_grammar_file(input_file, output_file):
-    """Process grammar.jsonl file to add special tokens."""
-    processed_count = 0
-    with open(input_file, 'r', encoding='utf-8') as f_in, open(output_file, 'w', encoding='utf-8') as f_out:
-        for line in tqdm(f_in, desc=f"Processing {os.path.basename(input_file)}"):
-            data = json.loads(line)
-            
-            if 'messages' in data and len(data['messages']) >= 2:
-                user_message = data['messages'][0]['content']
-                assistant_message = data['messages'][1]['content']
+                                if 'concept' in locals():
+                                    new_assistant_message = f"<WORD>{concept}</WORD>"  # Fallback to concept
+                                else:
+                                    new_assistant_message = "<RESPONSE>"  # Generic fallback
                 
-                # Extract Yanomami word if present
-                yanomami_word = ""
-                word_match = re.search(r"'([^']*)'|\"([^\"]*)\"", user_message)
-                if word_match:
-                    yanomami_word = next((g for g in word_match.groups() if g is not None), "")
+                # Extract grammatical information and part of speech if available
+                grammatical_info = ""
                 
-                # Add query token to user message
-                data['messages'][0]['content'] = f"<QUERY>{user_message}</QUERY>"
+                # Try to extract part of speech
+                pos_info = ""
+                pos_match = PATTERNS['how_to_pos'].search(assistant_message)
+                if pos_match:
+                    pos_info = pos_match.group(1).strip()
+                    new_assistant_message += f" <POS>{pos_info}</POS>"
                 
-                # Extract examples if available
-                examples_section = ""
-                examples_match = re.search(r"Here are some examples:(.*?)$", assistant_message, re.DOTALL)
-                if examples_match:
-                    examples_section = examples_match.group(1).strip()
+                # Try to extract definition/meaning
+                definition = ""
+                def_match = PATTERNS['how_to_definition'].search(assistant_message)
+                if def_match:
+                    definition = next((g for g in def_match.groups() if g is not None), "")
+                    new_assistant_message += f" <DEFINITION>{definition}</DEFINITION>"
                 
-                # Create structured message based on query type
-                new_assistant_message = ""
+                # Extract grammatical information
+                grammar_match = PATTERNS['yanomami_grammar'].search(assistant_message)
+                if grammar_match:
+                    grammatical_info = grammar_match.group(1).strip()
+                    new_assistant_message += f" <GRAMMATICAL>{grammatical_info}</GRAMMATICAL>"
                 
-                # Check if this is a plural formation query
-                if "plural" in user_message.lower():
-                    # Extract singular and plural forms
-                    singular_match = re.search(r"Singular:\s*([^\n]+)", assistant_message)
-                    plural_match = re.search(r"Plural:\s*([^\n]+)", assistant_message)
-                    
-                    if singular_match and plural_match:
-                        singular = singular_match.group(1).strip()
-                        plural = plural_match.group(1).strip()
-                        
-                        # Add word tags if we have a word
-                        if yanomami_word:
-                            new_assistant_message = f"<WORD>{yanomami_word}</WORD> "
-                        
-                        # Add grammatical explanation
-                        explanation = assistant_message
-                        if singular_match and plural_match:
-                            # Extract just the explanation part
-                            explanation_match = re.search(r"^(.*?)(?:Singular:|$)", assistant_message, re.DOTALL)
-                            if explanation_match:
-                                explanation = explanation_match.group(1).strip()
-                        
-                        new_assistant_message += f"<GRAMMATICAL>{explanation}</GRAMMATICAL>"
-                        
-                        # Add examples section with singular and plural forms
-                        if singular and plural:
-                            new_assistant_message += f" <EXAMPLES><EXAMPLE_YANOMAMI>{singular}</EXAMPLE_YANOMAMI> <EXAMPLE_TRANSLATION>{plural}</EXAMPLE_TRANSLATION></EXAMPLES>"
-                    else:
-                        # If we couldn't extract specific forms, use the whole response
-                        new_assistant_message = f"<GRAMMATICAL>{assistant_message}</GRAMMATICAL>"
-                
-                # Check if this is a verb conjugation query
-                elif "conjugated" in user_message.lower() or "conjugation" in user_message.lower():
-                    # Try to extract the verb
-                    verb = ""
-                    verb_match = re.search(r"verb '([^']*)'|verb \"([^\"]*)\"|", user_message)
-                    if verb_match:
-                        verb = next((g for g in verb_match.groups() if g is not None), "")
-                    
-                    # Add word tag if we have a verb
-                    if verb:
-                        new_assistant_message = f"<WORD>{verb}</WORD> "
-                    
-                    # Check if it's actually a verb
-                    if "not a verb" in assistant_message.lower() or "is an adverb" in assistant_message.lower():
-                        # Extract part of speech
-                        pos = ""
-                        pos_match = re.search(r"it is an? ([^,.]+)", assistant_message.lower())
-                        if pos_match:
-                            pos = pos_match.group(1).strip()
-                            new_assistant_message += f"<POS>{pos}</POS> "
-                    
-                    # Add grammatical explanation
-                    new_assistant_message += f"<GRAMMATICAL>{assistant_message}</GRAMMATICAL>"
-                
-                # Default case for other grammar queries
-                else:
-                    # Remove examples section from grammatical content if it exists
-                    grammatical_content = assistant_message
-                    if examples_section:
-                        grammatical_content = assistant_message.replace(f"Here are some examples:{examples_section}", "").strip()
-                    
-                    new_assistant_message = f"<GRAMMATICAL>{grammatical_content}</GRAMMATICAL>"
+                # Try to extract usage information
+                usage_info = ""
+                usage_match = PATTERNS['when_using_this'].search(assistant_message)
+                if usage_match:
+                    usage_info = usage_match.group(2).strip()
+                    new_assistant_message += f" <USAGE>{usage_info}</USAGE>"
                 
                 # Add examples if available
                 if examples_section:
@@ -932,90 +901,250 @@ def process_grammar_file(input_file, output_file):
                     for i in range(0, len(example_lines), 2):
                         if i+1 < len(example_lines) and example_lines[i].strip():
                             yanomami_example = example_lines[i].strip('- ').strip()
-                            translation = ""
-                            if "Translation:" in example_lines[i+1]:
-                                translation = example_lines[i+1].strip().replace("Translation: ", "")
-                            else:
-                                translation = example_lines[i+1].strip()
+                            translation = example_lines[i+1].strip().replace("Translation: ", "")
                             formatted_examples += f"<EXAMPLE_YANOMAMI>{yanomami_example}</EXAMPLE_YANOMAMI> <EXAMPLE_TRANSLATION>{translation}</EXAMPLE_TRANSLATION>\n"
                     
                     if formatted_examples:
                         new_assistant_message += f" <EXAMPLES>{formatted_examples.strip()}</EXAMPLES>"
+                    else:
+                        # If no structured examples found, use the whole response as examples
+                        new_assistant_message += f" <EXAMPLES>{assistant_message}</EXAMPLES>"
                 
                 # Update the assistant message
                 data['messages'][1]['content'] = new_assistant_message
                 processed_count += 1
+    
+    return processed_count
+
+
+def process_grammar_file(input_file, output_file, workers=None):
+    """Process grammar.jsonl file to add special tokens."""
+    return map_jsonl_records(partial(_tag_record, _tag_grammar), input_file, output_file, workers)
+
+def _tag_grammar(data):
+    """
+    Add special tokens to a record of grammar.jsonl, in place.
+
+    Returns:
+        int: Number of processed entries (0 or 1)
+    """
+    processed_count = 0
+    
+    if 'messages' in data and len(data['messages']) >= 2:
+        user_message = data['messages'][0]['content']
+        assistant_message = data['messages'][1]['content']
+        
+        # Extract Yanomami word if present
+        yanomami_word = ""
+        word_match = PATTERNS['quoted'].search(user_message)
+        if word_match:
+            yanomami_word = next((g for g in word_match.groups() if g is not None), "")
+        
+        # Add query token to user message
+        data['messages'][0]['content'] = f"<QUERY>{user_message}</QUERY>"
+        
+        # Extract examples if available
+        examples_section = ""
+        examples_match = PATTERNS['how_to_examples'].search(assistant_message)
+        if examples_match:
+            examples_section = examples_match.group(1).strip()
+        
+        # Create structured message based on query type
+        new_assistant_message = ""
+        
+        # Check if this is a plural formation query
+        if "plural" in user_message.lower():
+            # Extract singular and plural forms
+            singular_match = PATTERNS['singular'].search(assistant_message)
+            plural_match = PATTERNS['plural'].search(assistant_message)
+            
+            if singular_match and plural_match:
+                singular = singular_match.group(1).strip()
+                plural = plural_match.group(1).strip()
+                
+                # Add word tags if we have a word
+                if yanomami_word:
+                    new_assistant_message = f"<WORD>{yanomami_word}</WORD> "
+                
+                # Add grammatical explanation
+                explanation = assistant_message
+                if singular_match and plural_match:
+                    # Extract just the explanation part
+                    explanation_match = PATTERNS['before_singular'].search(assistant_message)
+                    if explanation_match:
+                        explanation = explanation_match.group(1).strip()
+                
+                new_assistant_message += f"<GRAMMATICAL>{explanation}</GRAMMATICAL>"
+                
+                # Add examples section with singular and plural forms
+                if singular and plural:
+                    new_assistant_message += f" <EXAMPLES><EXAMPLE_YANOMAMI>{singular}</EXAMPLE_YANOMAMI> <EXAMPLE_TRANSLATION>{plural}</EXAMPLE_TRANSLATION></EXAMPLES>"
+            else:
+                # If we couldn't extract specific forms, use the whole response
+                new_assistant_message = f"<GRAMMATICAL>{assistant_message}</GRAMMATICAL>"
+        
+        # Check if this is a verb conjugation query
+        elif "conjugated" in user_message.lower() or "conjugation" in user_message.lower():
+            # Try to extract the verb
+            verb = ""
+            verb_match = PATTERNS['verb'].search(user_message)
+            if verb_match:
+                verb = next((g for g in verb_match.groups() if g is not None), "")
+            
+            # Add word tag if we have a verb
+            if verb:
+                new_assistant_message = f"<WORD>{verb}</WORD> "
+            
+            # Check if it's actually a verb
+            if "not a verb" in assistant_message.lower() or "is an adverb" in assistant_message.lower():
+                # Extract part of speech
+                pos = ""
+                pos_match = PATTERNS['it_is_a'].search(assistant_message.lower())
+                if pos_match:
+                    pos = pos_match.group(1).strip()
+                    new_assistant_message += f"<POS>{pos}</POS> "
+            
+            # Add grammatical explanation
+            new_assistant_message += f"<GRAMMATICAL>{assistant_message}</GRAMMATICAL>"
+        
+        # Default case for other grammar queries
+        else:
+            # Remove examples section from grammatical content if it exists
+            grammatical_content = assistant_message
+            if examples_section:
+                grammatical_content = assistant_message.replace(f"Here are some examples:{examples_section}", "").strip()
+            
+            new_assistant_message = f"<GRAMMATICAL>{grammatical_content}</GRAMMATICAL>"
+        
+        # Add examples if available
+        if examples_section:
+            formatted_examples = ""
+            # Process each example to add specific tags
+            example_lines = examples_section.strip().split('\n')
+            for i in range(0, len(example_lines), 2):
+                if i+1 < len(example_lines) and example_lines[i].strip():
+                    yanomami_example = example_lines[i].strip('- ').strip()
+                    translation = ""
+                    if "Translation:" in example_lines[i+1]:
+                        translation = example_lines[i+1].strip().replace("Translation: ", "")
+                    else:
+                        translation = example_lines[i+1].strip()
+                    formatted_examples += f"<EXAMPLE_YANOMAMI>{yanomami_example}</EXAMPLE_YANOMAMI> <EXAMPLE_TRANSLATION>{translation}</EXAMPLE_TRANSLATION>\n"
             
-            # Write the updated or original data with visible Unicode characters
-            f_out.write(json.dumps(data, ensure_ascii=False) + '\n')
+            if formatted_examples:
+                new_assistant_message += f" <EXAMPLES>{formatted_examples.strip()}</EXAMPLES>"
+        
+        # Update the assistant message
+        data['messages'][1]['content'] = new_assistant_message
+        processed_count += 1
     
     return processed_count
 
+
+# Record types, tried in order: the first handler whose classifier accepts the
+# lowercased user prompt tags the record. A classifier is a tuple of keyword
+# groups, and it accepts a prompt that contains a keyword of every group. The
+# fixed prompts of the phrase datasets come first, since the quoted phrase may
+# contain the keywords of another type.
+# Record types in routing order. Files named after a type ('file_name') are
+# processed with its handler alone; records of other files are routed by the
+# keyword groups of 'classifier', each of which must occur in the user prompt
+RECORD_HANDLERS = [
+    {'name': 'phrase', 'tag': _tag_phrase, 'file_name': 'phrases-english-to-yanomami.jsonl',
+     'classifier': (('how do you say',),)},
+    {'name': 'yanomami_to_english', 'tag': _tag_yanomami_to_english, 'file_name': 'phrases-yanomami-to-english.jsonl',
+     'classifier': (('translate',), ('yanomami',))},
+    {'name': 'comparison', 'tag': _tag_comparison, 'file_name': 'comparison.jsonl',
+     'classifier': (('difference between',), ('yanomami',))},
+    {'name': 'grammar', 'tag': _tag_grammar, 'file_name': 'grammar.jsonl',
+     'classifier': (('plural', 'conjugated', 'conjugation', 'grammar'), ('yanomami',))},
+    {'name': 'translation', 'tag': _tag_translation, 'file_name': 'translations.jsonl',
+     'classifier': (('mean',), ('yanomami',))},
+    {'name': 'how_to', 'tag': _tag_how_to, 'file_name': 'how-to.jsonl',
+     'classifier': (('how', 'when should i use'), ('yanomami',))},
+]
+RECORD_KEYWORDS = KeywordAutomaton(keyword for handler in RECORD_HANDLERS
+                                   for group in handler['classifier'] for keyword in group)
+
+def route_record(data):
+    """
+    Find the handler for a record from its user prompt, scanned once by
+    RECORD_KEYWORDS.
+
+    Returns:
+        dict: The entry of RECORD_HANDLERS, or None if no handler accepts the
+            record (or it has no user and assistant messages)
+    """
+    messages = data.get('messages') if isinstance(data, dict) else None
+    if not messages or len(messages) < 2:
+        return None
+    found = RECORD_KEYWORDS.find(messages[0]['content'].lower())
+    for handler in RECORD_HANDLERS:
+        if all(not found.isdisjoint(group) for group in handler['classifier']):
+            return handler
+    return None
+
+def _tag_routed(data):
+    """Tag a record of any type with the handler route_record picks for it."""
+    handler = route_record(data)
+    return handler['tag'](data) if handler else 0
+
+def process_mixed_file(input_file, output_file, workers=None):
+    """Process a JSONL file with records of any type, routing each record to its handler."""
+    return map_jsonl_records(partial(_tag_record, _tag_routed), input_file, output_file, workers)
+
+def file_tagger(input_file):
+    """
+    The record tagger for an input file: the handler of its type for a file
+    named after one (every record is tagged by it, as the per-type processors
+    do), otherwise routing record by record.
+
+    Returns:
+        callable: Tags one record in place and returns the processed count
+    """
+    file_name = os.path.basename(input_file)
+    for handler in RECORD_HANDLERS:
+        if handler['file_name'] == file_name:
+            return handler['tag']
+    return _tag_routed
+
+
 def main():
     """Main function to process all dataset files."""
     parser = argparse.ArgumentParser(description='Add special tokens to Yanomami dataset files.')
     parser.add_argument('--input_dir', type=str, default='yanomami_dataset', 
-                        help='Directory containing the original dataset files')
+                        help='Directory containing the original dataset files; every .jsonl file is processed')
     parser.add_argument('--output_dir', type=str, default='yanomami_dataset_with_tokens', 
                         help='Directory to save the processed dataset files')
+    parser.add_argument('--input_file', type=str, default=None,
+                        help='Process this JSONL file instead of --input_dir; records of a file not named after a dataset type are routed by their prompt')
+    parser.add_argument('--output_file', type=str, default=None,
+                        help='Where to save the processed --input_file (defaults to the same name in --output_dir)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of worker processes; files and byte ranges of each file are processed in parallel')
     args = parser.parse_args()
     
-    # Create output directory if it doesn't exist
-    os.makedirs(args.output_dir, exist_ok=True)
+    # Input and output file of each job; records of files of unknown type are routed by their prompt
+    if args.input_file:
+        files = [(args.input_file, args.output_file or os.path.join(args.output_dir, os.path.basename(args.input_file)))]
+    else:
+        files = [(os.path.join(args.input_dir, file_name), os.path.join(args.output_dir, file_name))
+                 for file_name in sorted(os.listdir(args.input_dir)) if file_name.endswith('.jsonl')]
     
-    # Process each file type
-    total_processed = 0
+    # Create output directories if they don't exist
+    for _, output_file in files:
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
     
-    # Process translations.jsonl
-    input_file = os.path.join(args.input_dir, 'translations.jsonl')
-    output_file = os.path.join(args.output_dir, 'translations.jsonl')
-    if os.path.exists(input_file):
-        processed = process_translations_file(input_file, output_file)
-        logger.info(f"Processed {processed} entries in {os.path.basename(input_file)}")
-        total_processed += processed
-    
-    # Process yanomami-to-english.jsonl
-    input_file = os.path.join(args.input_dir, 'phrases-yanomami-to-english.jsonl')
-    output_file = os.path.join(args.output_dir, 'phrases-yanomami-to-english.jsonl')
-    if os.path.exists(input_file):
-        processed = process_yanomami_to_english_file(input_file, output_file)
-        logger.info(f"Processed {processed} entries in {os.path.basename(input_file)}")
-        total_processed += processed
-    
-    # Process phrases.jsonl
-    input_file = os.path.join(args.input_dir, 'phrases-english-to-yanomami.jsonl')
-    output_file = os.path.join(args.output_dir, 'phrases-english-to-yanomami.jsonl')
-    if os.path.exists(input_file):
-        processed = process_phrases_file(input_file, output_file)
-        logger.info(f"Processed {processed} entries in {os.path.basename(input_file)}")
-        total_processed += processed
-    
-    # Process comparison.jsonl
-    input_file = os.path.join(args.input_dir, 'comparison.jsonl')
-    output_file = os.path.join(args.output_dir, 'comparison.jsonl')
-    if os.path.exists(input_file):
-        processed = process_comparison_file(input_file, output_file)
-        logger.info(f"Processed {processed} entries in {os.path.basename(input_file)}")
-        total_processed += processed
-    
-    # Process how-to.jsonl
-    input_file = os.path.join(args.input_dir, 'how-to.jsonl')
-    output_file = os.path.join(args.output_dir, 'how-to.jsonl')
-    if os.path.exists(input_file):
-        processed = process_how_to_file(input_file, output_file)
-        logger.info(f"Processed {processed} entries in {os.path.basename(input_file)}")
-        total_processed += processed
+    jobs = [(partial(_tag_record, file_tagger(input_file)), input_file, output_file) for input_file, output_file in files]
     
-    # Process grammar.jsonl
-    input_file = os.path.join(args.input_dir, 'grammar.jsonl')
-    output_file = os.path.join(args.output_dir, 'grammar.jsonl')
-    if os.path.exists(input_file):
-        processed = process_grammar_file(input_file, output_file)
+    # Process every file in one streaming pass, all files at once when running with several workers
+    processed_counts = map_jsonl_files(jobs, args.workers)
+    for (_, input_file, _), processed in zip(jobs, processed_counts):
         logger.info(f"Processed {processed} entries in {os.path.basename(input_file)}")
-        total_processed += processed
+    total_processed = sum(processed_counts)
     
     logger.info(f"Total processed entries: {total_processed}")
-    logger.info(f"Processed dataset saved to {args.output_dir}")
+    logger.info(f"Processed dataset saved to {args.output_file or args.output_dir}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file